@@ -1,26 +1,45 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from flask_session import Session
 from flask_cors import CORS, cross_origin
+import hmac
 import json
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+import threading
 import traceback
+import uuid
 
 from models.recommendation_engine import RecommendationEngine
 from models.chatbot import TourismChatbot
+from models.model_server import ModelServerClient
+from models.occupancy_store import OccupancyStore, read_csv
+from models.search_index import HotelSearchIndex
+from models.spatial_index import HotelMapIndex, parse_bbox
 from models.analytics import AnalyticsEngine
+from models.analytics_cube import EXPORT_TABLES, cell_matches, hotel_cell, parse_slice
+from models.gazetteer import GAZETTEER
 from utils.data_loader import DataLoader
+from utils.helpers import HOTEL_SUMMARY_FIELDS, build_id_index, parse_fields, project_fields
+from utils.export import EXPORT_FORMATS, csv_columns, export_stream
+from utils.inference_pool import InferencePool, InferencePoolFull, InferenceTimeout
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
 
 # CORS configuration
 CORS(app, resources={
+    # Occupancy ingest (POST) is admin-only, so only reads are exposed cross-origin
+    r"/api/occupancy": {
+        "origins": ["*"],
+        "methods": ["GET", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Authorization", "Accept"]
+    },
     r"/api/*": {
         "origins": ["*"],  # For development, you can restrict this later
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        # PUT is deliberately not exposed cross-origin: hotel edits are admin-only
+        "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization", "Accept"]
     }
 })
@@ -32,12 +51,44 @@ Session(app)
 print("Loading tourism data...")
 data_loader = DataLoader()
 hotels_data = data_loader.load_data()
+hotels_by_id = build_id_index(hotels_data)
+# Serializes edits to the shared hotel records and everything derived from them
+hotels_lock = threading.Lock()
 
 # Initialize AI models
 print("Initializing AI models...")
-recommendation_engine = RecommendationEngine(hotels_data)
-chatbot = TourismChatbot(hotels_data)
-analytics_engine = AnalyticsEngine(hotels_data)
+recommendation_engine = RecommendationEngine(
+    hotels_data,
+    ranker=app.config['RECOMMENDATION_RANKER'],
+    shadow_ranker=app.config['SHADOW_RANKER'],
+    shadow_sample_rate=app.config['SHADOW_SAMPLE_RATE'],
+    query_log_path=app.config['RANKER_QUERY_LOG']
+)
+occupancy_store = OccupancyStore(app.config['OCCUPANCY_STORE_DIR'])
+analytics_engine = AnalyticsEngine(hotels_data, occupancy_store=occupancy_store)
+map_index = HotelMapIndex(
+    hotels_data,
+    max_cluster_zoom=app.config['MAP_CLUSTER_MAX_ZOOM'],
+    max_points=app.config['MAP_MAX_POINTS']
+)
+search_index = HotelSearchIndex(hotels_data)
+chatbot = TourismChatbot.from_config(
+    hotels_data,
+    app.config,
+    analytics_engine=analytics_engine,
+    model_server=ModelServerClient(
+        app.config['CHAT_MODEL_SERVER'],
+        authkey=app.config['CHAT_MODEL_SERVER_AUTHKEY'],
+        timeout=app.config['CHAT_MODEL_SERVER_TIMEOUT']
+    ) if app.config['CHAT_MODEL_SERVER'] else None
+)
+
+# Chat inference runs here rather than on the request threads serving every other route
+inference_pool = InferencePool(
+    max_workers=app.config['CHAT_POOL_WORKERS'],
+    max_queue=app.config['CHAT_POOL_QUEUE'],
+    timeout_seconds=app.config['CHAT_REQUEST_TIMEOUT']
+)
 
 print("AI models initialized successfully!")
 
@@ -69,6 +120,19 @@ def analytics():
     return render_template('analytics.html', data=analytics_data)
 
 # API Routes
+@app.route('/api/health')
+@cross_origin()
+def health():
+    """Service health and chatbot model readiness"""
+    return jsonify({
+        'success': True,
+        'status': 'ok',
+        'hotels_loaded': len(hotels_data),
+        'chatbot': chatbot.get_status(),
+        'inference_pool': inference_pool.get_stats(),
+        'search_index': search_index.get_stats()
+    })
+
 @app.route('/api/recommend/hotels', methods=['POST'])
 @cross_origin()
 def recommend_hotels():
@@ -81,7 +145,8 @@ def recommend_hotels():
             interests=user_data.get('interests', []),
             facilities=user_data.get('facilities', []),
             group_size=user_data.get('group_size', 2),
-            duration=user_data.get('duration', 3)
+            duration=user_data.get('duration', 3),
+            fields=parse_fields(request.args.get('fields') or user_data.get('fields'), HOTEL_SUMMARY_FIELDS)
         )
         
         return jsonify({
@@ -94,6 +159,17 @@ def recommend_hotels():
             'error': str(e)
         }), 500
 
+@app.route('/api/recommend/shadow-stats')
+@cross_origin()
+def get_shadow_stats():
+    """Live comparison of the shadow ranker against the primary ranker"""
+    shadow = recommendation_engine.shadow
+    return jsonify({
+        'success': True,
+        'ranker': recommendation_engine.ranker.name,
+        'shadow': shadow.get_stats() if shadow else None
+    })
+
 @app.route('/api/recommend/itinerary', methods=['POST'])
 @cross_origin()
 def recommend_itinerary():
@@ -105,7 +181,8 @@ def recommend_itinerary():
             duration=user_data.get('duration', 5),
             budget=user_data.get('budget', 'medium'),
             interests=user_data.get('interests', []),
-            pace=user_data.get('pace', 'moderate')
+            pace=user_data.get('pace', 'moderate'),
+            fields=parse_fields(request.args.get('fields') or user_data.get('fields'), HOTEL_SUMMARY_FIELDS)
         )
         
         return jsonify({
@@ -142,28 +219,148 @@ def estimate_expenses():
             'error': str(e)
         }), 500
 
+def _chat_session_id(payload):
+    """Conversation id from the request, falling back to the browser session"""
+    session_id = payload.get('session_id')
+    if session_id:
+        return str(session_id)
+    if 'chat_session_id' not in session:
+        session['chat_session_id'] = uuid.uuid4().hex
+    return session['chat_session_id']
+
+def _latency_budget(payload):
+    """Optional per-request reply budget in milliseconds (None uses the default)"""
+    value = payload.get('latency_budget_ms')
+    if value is None or value == '':
+        return None
+    if isinstance(value, str) and value.strip().isdecimal():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('latency_budget_ms must be a non-negative integer')
+    return value
+
+def _pooled_budget(latency_budget_ms, deadline):
+    """Reply budget for a pooled chat job, cut to what is left of the request timeout"""
+    remaining_ms = inference_pool.remaining_ms(deadline)
+    return min(latency_budget_ms or app.config['CHAT_LATENCY_BUDGET_MS'] or remaining_ms, remaining_ms)
+
+def _chat_reply(user_message, chat_history, session_id, latency_budget_ms, deadline):
+    return chatbot.get_response(
+        user_message, chat_history, session_id=session_id,
+        latency_budget_ms=_pooled_budget(latency_budget_ms, deadline)
+    )
+
+def _chat_events(user_message, chat_history, session_id, latency_budget_ms, deadline):
+    return chatbot.stream_response(
+        user_message, chat_history, session_id=session_id,
+        latency_budget_ms=_pooled_budget(latency_budget_ms, deadline)
+    )
+
+def _chat_busy(e):
+    response = jsonify({'success': False, 'error': str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @app.route('/api/chat', methods=['POST'])
 @cross_origin()
 def chat():
     try:
         user_message = request.json.get('message', '')
         chat_history = request.json.get('history', [])
-        response = chatbot.get_response(user_message, chat_history)
-        return jsonify({'success': True, 'response': response})
+        session_id = _chat_session_id(request.json)
+        try:
+            latency_budget_ms = _latency_budget(request.json)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        deadline = inference_pool.deadline()
+        response = inference_pool.run(
+            _chat_reply, user_message, chat_history, session_id, latency_budget_ms, deadline,
+            deadline=deadline
+        )
+        return jsonify({'success': True, 'response': response, 'session_id': session_id})
+    except InferencePoolFull as e:
+        return _chat_busy(e)
+    except InferenceTimeout as e:
+        return jsonify({'success': False, 'error': str(e)}), 504
     except Exception as e:
         app.logger.error("Exception in /api/chat:\n" + traceback.format_exc())
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/chat/stream', methods=['GET', 'POST'])
+@cross_origin()
+def chat_stream():
+    """Server-sent events variant of /api/chat"""
+    payload = request.get_json(silent=True) or request.args
+    user_message = payload.get('message', '')
+    chat_history = payload.get('history', []) if request.method == 'POST' else []
+    session_id = _chat_session_id(payload)
+    try:
+        latency_budget_ms = _latency_budget(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    deadline = inference_pool.deadline()
+    try:
+        chat_events = inference_pool.stream(
+            _chat_events, user_message, chat_history, session_id, latency_budget_ms, deadline,
+            deadline=deadline
+        )
+    except InferencePoolFull as e:
+        return _chat_busy(e)
+
+    def events():
+        try:
+            for event in chat_events:
+                yield f"data: {json.dumps(event)}\n\n"
+            yield f"data: {json.dumps({'type': 'done', 'session_id': session_id})}\n\n"
+        except Exception as e:
+            app.logger.error("Exception in /api/chat/stream:\n" + traceback.format_exc())
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _describe_filters(filters):
+    """Cube slice filters as JSON lists (empty for the overall totals)"""
+    return {dimension: sorted(values) for dimension, values in filters.items()}
+
+@app.route('/api/analytics/sections')
+@cross_origin()
+def get_analytics_sections():
+    """Data version and per-section compute timings of the analytics cache"""
+    return jsonify({
+        'success': True,
+        'data': analytics_engine.get_section_stats()
+    })
+
+@app.route('/api/analytics/dimensions')
+@cross_origin()
+def get_analytics_dimensions():
+    """Values accepted by the location/type/budget/size analytics filters"""
+    return jsonify({
+        'success': True,
+        'data': analytics_engine.get_cube_dimensions()
+    })
+
 @app.route('/api/analytics/demographics')
 @cross_origin()
 def get_demographics():
     """Tourist demographics analytics"""
     try:
-        demographics = analytics_engine.get_tourist_demographics()
+        filters = parse_slice(request.args)
+        demographics = analytics_engine.get_tourist_demographics(filters)
         return jsonify({
             'success': True,
-            'data': demographics
+            'data': demographics,
+            'filters': _describe_filters(filters)
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -175,11 +372,18 @@ def get_demographics():
 def get_popular_places():
     """Popular places analytics"""
     try:
-        popular_places = analytics_engine.get_popular_places_analysis()
+        filters = parse_slice(request.args)
+        popular_places = analytics_engine.get_popular_places_analysis(filters)
         return jsonify({
             'success': True,
-            'data': popular_places
+            'data': popular_places,
+            'filters': _describe_filters(filters)
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -191,11 +395,159 @@ def get_popular_places():
 def get_facilities_analysis():
     """Facilities analysis"""
     try:
-        facilities = analytics_engine.get_facilities_analysis()
+        filters = parse_slice(request.args)
+        facilities = analytics_engine.get_facilities_analysis(filters)
         return jsonify({
             'success': True,
-            'data': facilities
+            'data': facilities,
+            'filters': _describe_filters(filters)
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/analytics/distributions')
+@cross_origin()
+def get_distributions():
+    """Histograms and percentiles of rooms, occupancy and stay duration"""
+    try:
+        bins = min(max(request.args.get('bins', 10, type=int), 1), 100)
+        return jsonify({
+            'success': True,
+            'data': analytics_engine.get_distribution_stats(bins)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/analytics/chat-trends')
+@cross_origin()
+def get_chat_trends():
+    """Trending places, hotels, facilities and intents in chat traffic"""
+    try:
+        order = request.args.get('order', 'score')
+        if order not in ('score', 'growth'):
+            return jsonify({
+                'success': False,
+                'error': "order must be 'score' or 'growth'"
+            }), 400
+
+        trends = chatbot.get_chat_trends(
+            category=request.args.get('category'),
+            limit=request.args.get('limit', 10, type=int),
+            window_buckets=request.args.get('window', 1, type=int),
+            order=order
+        )
+        return jsonify({
+            'success': True,
+            'data': trends
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _is_hotel_admin():
+    """Whether the request carries the configured HOTEL_ADMIN_TOKEN bearer token"""
+    token = app.config.get('HOTEL_ADMIN_TOKEN')
+    supplied = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {token}".encode('utf-8'))
+
+def _admin_denied(action):
+    """403/401 response for an admin-only route, or None when the request may proceed"""
+    if not app.config.get('HOTEL_ADMIN_TOKEN'):
+        return jsonify({
+            'success': False,
+            'error': f'{action} is disabled; set HOTEL_ADMIN_TOKEN to enable it'
+        }), 403
+    if not _is_hotel_admin():
+        return jsonify({
+            'success': False,
+            'error': 'A valid admin bearer token is required'
+        }), 401
+    return None
+
+@app.route('/api/occupancy', methods=['POST'])
+def ingest_occupancy():
+    """Append dated occupancy/arrival observations (JSON or CSV)"""
+    denied = _admin_denied('Occupancy ingest')
+    if denied:
+        return denied
+
+    try:
+        if 'file' in request.files:
+            observations = read_csv(request.files['file'].read().decode('utf-8'))
+        elif request.mimetype == 'text/csv':
+            observations = read_csv(request.get_data(as_text=True))
+        else:
+            body = request.get_json(silent=True) or {}
+            observations = body.get('observations', []) if isinstance(body, dict) else None
+            if not isinstance(observations, list) or not all(isinstance(o, dict) for o in observations):
+                return jsonify({
+                    'success': False,
+                    'error': "'observations' must be a list of objects"
+                }), 400
+
+        unknown = sorted({str(o.get('hotel_id')) for o in observations} - set(hotels_by_id))
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown hotel id(s): {', '.join(unknown[:10])}"
+            }), 400
+
+        stored = occupancy_store.ingest(observations)
+        analytics_engine.observations_changed()
+        return jsonify({
+            'success': True,
+            'stored': stored,
+            'store': occupancy_store.stats()
+        })
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f"Invalid observation: {e}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/occupancy')
+@cross_origin(methods=['GET'])
+def get_occupancy():
+    """Occupancy and arrivals per day/week/month over a date range"""
+    try:
+        if not request.args.get('start') or not request.args.get('end'):
+            return jsonify({
+                'success': False,
+                'error': 'start and end dates (YYYY-MM-DD) are required'
+            }), 400
+        series = occupancy_store.series(
+            request.args['start'],
+            request.args['end'],
+            level=request.args.get('level', 'auto'),
+            hotel_id=request.args.get('hotel_id')
+        )
+        return jsonify({
+            'success': True,
+            'data': series
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -205,26 +557,29 @@ def get_facilities_analysis():
 @app.route('/api/hotels/locations')
 @cross_origin()
 def get_hotel_locations():
-    """Get hotel locations for mapping"""
+    """Get hotel locations for mapping
+
+    With ``bbox`` (west,south,east,north) and ``zoom`` only the clusters and
+    markers inside the viewport are returned.
+    """
     try:
-        locations = []
-        for hotel in hotels_data:
-            locations.append({
-                'name': hotel['hotelGuestHouseName'],
-                'lat': hotel['location']['latitude'],
-                'lng': hotel['location']['longitude'],
-                'address': hotel['fullAddress'],
-                'type': 'hotel' if hotel['type']['hotel'] else 'guest_house',
-                'rooms': hotel['facilities']['rooms']['numberOfRooms'],
-                'tourists': hotel['touristDemographics']['totalTouristsRecorded'],
-                'has_wifi': hotel['facilities']['wifiInternet'],
-                'has_restaurant': hotel['facilities']['restaurantDining'],
-                'has_transport': hotel['facilities']['transportArrangement'] or hotel.get('hasOwnTransport', False),
-                'phone_numbers': hotel.get('phoneNumbers', [])
+        if not request.args.get('bbox'):
+            return jsonify({
+                'success': True,
+                'locations': map_index.all_locations()
             })
+
+        try:
+            bbox = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        zoom = min(max(request.args.get('zoom', 10, type=int), 0), 22)
         return jsonify({
             'success': True,
-            'locations': locations
+            **map_index.query(bbox, zoom)
         })
     except Exception as e:
         return jsonify({
@@ -232,6 +587,16 @@ def get_hotel_locations():
             'error': str(e)
         }), 500
 
+def _search_op():
+    op = request.args.get('op', 'and').lower()
+    if op not in ('and', 'or'):
+        raise ValueError("op must be 'and' or 'or'")
+    return op
+
+def _text_search(query, op):
+    """Hotels matching a full-text query, most relevant first"""
+    return [hotels_by_id[hotel_id] for hotel_id, _ in search_index.search(query, op) if hotel_id in hotels_by_id]
+
 @app.route('/api/hotels/search')
 @cross_origin()
 def search_hotels():
@@ -240,16 +605,14 @@ def search_hotels():
         query = request.args.get('q', '')
         budget = request.args.get('budget', 'all')
         facilities = request.args.getlist('facilities')
+        fields = parse_fields(request.args.get('fields'))
+        op = _search_op()
         
         filtered_hotels = hotels_data
         
-        # Text search
+        # Text search over names, addresses, places, meals and other facilities, ranked by BM25
         if query:
-            filtered_hotels = [
-                h for h in filtered_hotels 
-                if query.lower() in h['hotelGuestHouseName'].lower()
-                or query.lower() in h['fullAddress'].lower()
-            ]
+            filtered_hotels = _text_search(query, op)
         
         # Budget filter
         if budget != 'all':
@@ -260,16 +623,21 @@ def search_hotels():
         if facilities:
             filtered_hotels = [
                 h for h in filtered_hotels
-                if ('wifi' not in facilities or h['facilities']['wifiInternet'])
-                and ('restaurant' not in facilities or h['facilities']['restaurantDining'])
-                and ('transport' not in facilities or h['facilities']['transportArrangement'] or h.get('hasOwnTransport', False))
+                if ('wifi' not in facilities or h.get('facilities', {}).get('wifiInternet'))
+                and ('restaurant' not in facilities or h.get('facilities', {}).get('restaurantDining'))
+                and ('transport' not in facilities or h.get('facilities', {}).get('transportArrangement') or h.get('hasOwnTransport', False))
             ]
         
         return jsonify({
             'success': True,
-            'hotels': filtered_hotels,
+            'hotels': [project_fields(h, fields) for h in filtered_hotels],
             'total': len(filtered_hotels)
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -284,14 +652,12 @@ def get_hotels():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         search = request.args.get('search', '')
+        fields = parse_fields(request.args.get('fields'))
+        op = _search_op()
         
         filtered_hotels = hotels_data
         if search:
-            filtered_hotels = [
-                h for h in hotels_data 
-                if search.lower() in h['hotelGuestHouseName'].lower()
-                or search.lower() in h['fullAddress'].lower()
-            ]
+            filtered_hotels = _text_search(search, op)
         
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
@@ -299,11 +665,174 @@ def get_hotels():
         
         return jsonify({
             'success': True,
-            'hotels': paginated_hotels,
+            'hotels': [project_fields(h, fields) for h in paginated_hotels],
             'total': len(filtered_hotels),
             'page': page,
             'per_page': per_page
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/hotels/<hotel_id>')
+@cross_origin(methods=['GET'])
+def get_hotel(hotel_id):
+    """Get a single hotel by its id"""
+    hotel = hotels_by_id.get(hotel_id)
+    if hotel is None:
+        return jsonify({
+            'success': False,
+            'error': f"Hotel '{hotel_id}' not found"
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'hotel': project_fields(hotel, parse_fields(request.args.get('fields')))
+    })
+
+def _swap_hotel(hotel_id, position, hotel):
+    hotels_data[position] = hotel
+    hotels_by_id[hotel_id] = hotel
+    recommendation_engine.refresh()
+    chatbot.refresh_hotels()
+
+def _replace_hotel(hotel_id, old_hotel, new_hotel):
+    """Swap a hotel record in place and apply the change to the derived indexes
+
+    The incremental indexes are updated first; if any step fails, the ones
+    already updated are reverted and the old record is put back.
+    """
+    with hotels_lock:
+        position = next(i for i, hotel in enumerate(hotels_data) if hotel is old_hotel)
+        updated = []
+        try:
+            for index in (analytics_engine, map_index, search_index):
+                index.update_hotel(old_hotel, new_hotel)
+                updated.append(index)
+            _swap_hotel(hotel_id, position, new_hotel)
+        except Exception:
+            for index in reversed(updated):
+                index.update_hotel(new_hotel, old_hotel)
+            _swap_hotel(hotel_id, position, old_hotel)
+            raise
+
+@app.route('/api/hotels/<hotel_id>', methods=['PUT'])
+def update_hotel(hotel_id):
+    """Replace a hotel record; analytics reflect the change immediately"""
+    denied = _admin_denied('Hotel editing')
+    if denied:
+        return denied
+
+    old_hotel = hotels_by_id.get(hotel_id)
+    if old_hotel is None:
+        return jsonify({
+            'success': False,
+            'error': f"Hotel '{hotel_id}' not found"
+        }), 404
+
+    new_hotel = request.get_json(silent=True)
+    if not isinstance(new_hotel, dict):
+        return jsonify({
+            'success': False,
+            'error': 'Request body must be a JSON hotel record'
+        }), 400
+    try:
+        new_hotel = data_loader.clean_record({**new_hotel, 'id': hotel_id})
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        GAZETTEER.annotate([new_hotel])
+        _replace_hotel(hotel_id, old_hotel, new_hotel)
+        return jsonify({
+            'success': True,
+            'hotel': new_hotel
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _export_hotels(filters, fields):
+    """Projected hotel records in a cube slice, generated one at a time"""
+    for hotel in hotels_data:
+        if filters and not cell_matches(hotel_cell(hotel), filters):
+            continue
+        yield project_fields(hotel, fields)
+
+def _export_response(records, fmt, filename, columns=None):
+    """Stream records as NDJSON/CSV; ``gzip=1`` compresses on the fly"""
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}.{fmt}"',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(
+        stream_with_context(export_stream(records, fmt, columns, compress)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers=headers
+    )
+
+def _export_format():
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+@app.route('/api/export/hotels')
+@cross_origin()
+def export_hotels():
+    """Stream every hotel (optionally a slice and a subset of fields) as NDJSON or CSV"""
+    try:
+        fmt = _export_format()
+        filters = parse_slice(request.args)
+        fields = parse_fields(request.args.get('fields'))
+        # CSV needs its header first: a pass that keeps only the column names
+        columns = csv_columns(_export_hotels(filters, fields)) if fmt == 'csv' else None
+        return _export_response(_export_hotels(filters, fields), fmt, 'hotels', columns)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/export/analytics')
+@cross_origin()
+def export_analytics():
+    """Stream per-cell analytics (cells, origins, foreign_countries or places) as NDJSON or CSV"""
+    try:
+        fmt = _export_format()
+        table = request.args.get('table', 'cells')
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table '{table}'; expected one of {', '.join(EXPORT_TABLES)}")
+        filters = parse_slice(request.args)
+        return _export_response(
+            analytics_engine.iter_export_rows(table, filters), fmt, f'analytics_{table}', EXPORT_TABLES[table]
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -13,3 +13,71 @@ MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
 # CORS configuration
 CORS_HEADERS = 'Content-Type'
+
+# Recommendation ranking configuration
+RECOMMENDATION_RANKER = os.environ.get('RECOMMENDATION_RANKER', 'tfidf_knn')
+SHADOW_RANKER = os.environ.get('SHADOW_RANKER') or None
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1'))
+RANKER_QUERY_LOG = os.environ.get('RANKER_QUERY_LOG') or None
+
+# Chatbot model loading: "background" (default), "lazy" (on first chat) or "eager"
+CHATBOT_MODEL_LOADING = os.environ.get('CHATBOT_MODEL_LOADING', 'background')
+
+# Chat session state
+CHAT_MAX_SESSIONS = int(os.environ.get('CHAT_MAX_SESSIONS', '1000'))
+CHAT_SESSION_TTL = int(os.environ.get('CHAT_SESSION_TTL', '1800'))  # seconds
+CHAT_HISTORY_TOKEN_WINDOW = int(os.environ.get('CHAT_HISTORY_TOKEN_WINDOW', '256'))
+
+# DialoGPT generation and request batching
+CHAT_MAX_NEW_TOKENS = int(os.environ.get('CHAT_MAX_NEW_TOKENS', '128'))
+CHAT_BATCH_MAX_SIZE = int(os.environ.get('CHAT_BATCH_MAX_SIZE', '8'))  # 1 disables batching
+CHAT_BATCH_MAX_WAIT_MS = float(os.environ.get('CHAT_BATCH_MAX_WAIT_MS', '5'))
+
+# Chat retrieval grounding: "sentence_transformer" or "hashing" (offline, no model)
+CHAT_EMBEDDING_BACKEND = os.environ.get('CHAT_EMBEDDING_BACKEND', 'sentence_transformer')
+CHAT_RETRIEVAL_INDEX_DIR = os.environ.get('CHAT_RETRIEVAL_INDEX_DIR', 'instance/retrieval_index')
+CHAT_RETRIEVAL_MIN_SCORE = float(os.environ['CHAT_RETRIEVAL_MIN_SCORE']) if os.environ.get('CHAT_RETRIEVAL_MIN_SCORE') else None
+
+# DialoGPT CPU inference: "fp32" or "int8" (dynamic quantization); 0 threads keeps the torch default
+CHAT_INFERENCE_MODE = os.environ.get('CHAT_INFERENCE_MODE', 'fp32')
+CHAT_TORCH_THREADS = int(os.environ.get('CHAT_TORCH_THREADS', '0'))
+
+# Cache for deterministic intent replies (0 disables)
+CHAT_RESPONSE_CACHE_SIZE = int(os.environ.get('CHAT_RESPONSE_CACHE_SIZE', '1024'))
+CHAT_RESPONSE_CACHE_TTL = int(os.environ.get('CHAT_RESPONSE_CACHE_TTL', '3600'))
+
+# Optional shared model server ("unix:/path.sock", or "host:port" which requires the authkey);
+# unset keeps models in each worker
+CHAT_MODEL_SERVER = os.environ.get('CHAT_MODEL_SERVER') or None
+CHAT_MODEL_SERVER_AUTHKEY = os.environ.get('CHAT_MODEL_SERVER_AUTHKEY') or None
+CHAT_MODEL_SERVER_TIMEOUT = float(os.environ.get('CHAT_MODEL_SERVER_TIMEOUT', '10'))
+CHAT_MODEL_SERVER_MAX_PENDING = int(os.environ.get('CHAT_MODEL_SERVER_MAX_PENDING', '32'))
+
+# Default wall-clock budget for a chat reply (0 disables); requests may pass latency_budget_ms
+CHAT_LATENCY_BUDGET_MS = int(os.environ.get('CHAT_LATENCY_BUDGET_MS', '2000'))
+
+# Sessions whose DialoGPT key/value cache is kept between turns. Cached turns only run
+# the new message but are generated one at a time, outside the micro-batching scheduler,
+# so 0 (the default) batches every turn; raise it when long conversations outweigh
+# concurrent traffic
+CHAT_KV_CACHE_SESSIONS = int(os.environ.get('CHAT_KV_CACHE_SESSIONS', '0'))
+
+# Chat trend sketches: time bucket size, buckets kept and heavy hitters tracked per category
+CHAT_TRENDS_BUCKET_SECONDS = int(os.environ.get('CHAT_TRENDS_BUCKET_SECONDS', '3600'))
+CHAT_TRENDS_BUCKETS = int(os.environ.get('CHAT_TRENDS_BUCKETS', '24'))
+CHAT_TRENDS_TOP_K = int(os.environ.get('CHAT_TRENDS_TOP_K', '64'))
+
+# Chat inference pool: worker threads, requests allowed to wait (503 beyond) and per-request timeout in seconds
+CHAT_POOL_WORKERS = int(os.environ.get('CHAT_POOL_WORKERS', '4'))
+CHAT_POOL_QUEUE = int(os.environ.get('CHAT_POOL_QUEUE', '16'))
+CHAT_REQUEST_TIMEOUT = float(os.environ.get('CHAT_REQUEST_TIMEOUT', '15'))
+
+# Hotel map: zoom levels with precomputed clusters and markers returned per viewport
+MAP_CLUSTER_MAX_ZOOM = int(os.environ.get('MAP_CLUSTER_MAX_ZOOM', '14'))
+MAP_MAX_POINTS = int(os.environ.get('MAP_MAX_POINTS', '500'))
+
+# Append-only store of dated occupancy/arrival observations and their day/week/month rollups
+OCCUPANCY_STORE_DIR = os.environ.get('OCCUPANCY_STORE_DIR', 'instance/occupancy')
+
+# Bearer token required by PUT /api/hotels/<id> and POST /api/occupancy; both are disabled when unset
+HOTEL_ADMIN_TOKEN = os.environ.get('HOTEL_ADMIN_TOKEN') or None
@@ -1,188 +1,211 @@
 import numpy as np
-import pandas as pd
-from collections import Counter
-import json
+import threading
+
+from models.analytics_cube import (
+    FACILITY_KEYS, AggregationCube, HotelAggregate, cell_rows, hotel_cell, hotel_delta
+)
+from models.analytics_frames import aggregate_frames, distribution_stats, flatten_hotels
+from utils.cache import VersionedCache
+
 
 class AnalyticsEngine:
-    def __init__(self, hotels_data):
+    """Dashboard analytics kept as mergeable accumulators
+
+    Every hotel contributes sums and keyed counts to the overall
+    ``HotelAggregate`` and to one cell of an ``AggregationCube`` over
+    location, type, budget and size. ``add_hotel``, ``remove_hotel`` and
+    ``update_hotel`` apply one record's delta to both and swap in a fresh
+    ``analytics_cache``, so an edit costs the size of the record plus the
+    number of distinct places and origins, never a pass over all hotels. The
+    initial build flattens the records into DataFrames once and seeds the
+    accumulators with vectorized groupbys.
+
+    Derived sections (summary, revenue, competitor analysis, distributions,
+    ...) are cached per ``data_version``. After an edit the old value is
+    served while a background thread recomputes it, so page views never wait
+    for a recomputation.
+    """
+
+    def __init__(self, hotels_data, occupancy_store=None):
         self.hotels_data = hotels_data
+        self.occupancy_store = occupancy_store
+        self._lock = threading.Lock()
+        self.data_version = 0
+        self.sections = VersionedCache(lambda: self.data_version)
         self._precompute_analytics()
+        # Warm every derived section at load
+        self.get_comprehensive_analytics()
+        self.get_distribution_stats()
 
     def _precompute_analytics(self):
         """Precompute analytics data for fast retrieval"""
-        self.analytics_cache = {
-            'demographics': self._compute_demographics(),
-            'facilities': self._compute_facilities_stats(),
-            'popular_places': self._compute_popular_places(),
-            'geographic': self._compute_geographic_stats(),
-            'temporal': self._compute_temporal_stats()
+        with self._lock:
+            frames = flatten_hotels(self.hotels_data)
+            self.overall = HotelAggregate(aggregate_frames(frames, FACILITY_KEYS))
+            self.cube = AggregationCube({
+                cell: HotelAggregate(aggregates)
+                for cell, aggregates in aggregate_frames(frames, FACILITY_KEYS, by='cell').items()
+            })
+            self._refresh_cache()
+            self._hotels_frame = frames.hotels
+        self.sections.refresh()
+
+    def add_hotel(self, hotel):
+        """Fold a new hotel record into the aggregates"""
+        change = self._change(hotel)
+        with self._lock:
+            self._apply(change, 1)
+            self._refresh_cache()
+        self.sections.refresh()
+
+    def remove_hotel(self, hotel):
+        """Take a previously added hotel record back out of the aggregates"""
+        change = self._change(hotel)
+        with self._lock:
+            self._apply(change, -1)
+            self._refresh_cache()
+        self.sections.refresh()
+
+    def update_hotel(self, old_hotel, new_hotel):
+        """Replace one hotel's contribution with its edited record
+
+        Both deltas are computed before anything is touched, and the old
+        contribution is restored if the new one cannot be applied.
+        """
+        old_change = self._change(old_hotel)
+        new_change = self._change(new_hotel)
+        with self._lock:
+            self._apply(old_change, -1)
+            try:
+                self._apply(new_change, 1)
+            except Exception:
+                self._apply(old_change, 1)
+                raise
+            self._refresh_cache()
+        self.sections.refresh()
+
+    def observations_changed(self):
+        """New occupancy observations: recompute the sections derived from them"""
+        with self._lock:
+            self.data_version += 1
+        self.sections.refresh()
+
+    def _change(self, hotel):
+        """(cube cell, delta) of a hotel; raises before any accumulator is touched"""
+        return hotel_cell(hotel), hotel_delta(hotel)
+
+    def _apply(self, change, sign):
+        cell, delta = change
+        self.overall.apply(delta, sign)
+        self.cube.apply(cell, delta, sign)
+
+    def get_distribution_stats(self, bins=10):
+        """Histograms and percentiles of rooms, occupancy and stay duration"""
+        return self._section(f'distributions_{bins}', lambda: distribution_stats(self._hotels(), bins))
+
+    def _hotels(self):
+        if self._hotels_frame is None:
+            self._hotels_frame = flatten_hotels(self.hotels_data).hotels
+        return self._hotels_frame
+
+    def _refresh_cache(self):
+        """Swap in a new analytics_cache so readers never see a half-applied delta"""
+        self.analytics_cache = self._sections(self.overall)
+        self.data_version += 1
+        # Distributions need every value, so the frame is rebuilt by the background refresh
+        self._hotels_frame = None
+
+    def _section(self, name, compute):
+        """A derived section for the current data version, or its stale value while it refreshes"""
+        def locked_compute():
+            with self._lock:
+                return compute()
+        return self.sections.get(name, locked_compute)
+
+    def get_section_stats(self):
+        """Data version plus version, timing and hit counts of every cached section"""
+        return {
+            'data_version': self.data_version,
+            'sections': self.sections.stats()
+        }
+
+    def _sections(self, aggregate):
+        return {
+            'demographics': aggregate.demographics(),
+            'facilities': aggregate.facilities(),
+            'popular_places': aggregate.popular_places(),
+            'geographic': aggregate.geographic(),
+            'temporal': aggregate.temporal()
         }
 
+    def get_slice(self, filters):
+        """analytics_cache sections for the hotels matching cube ``filters``
+
+        ``filters`` maps location / type / budget / size to a set of values
+        (see ``parse_slice``); no filters returns the precomputed totals.
+        """
+        if not filters:
+            return self.analytics_cache
+        with self._lock:
+            aggregate = self.cube.slice(filters)
+        return {**self._sections(aggregate), 'hotels': aggregate.hotels}
+
+    def iter_export_rows(self, table, filters=None):
+        """Rows of an EXPORT_TABLES table for the cells matching ``filters``
+
+        Rows are built one cell at a time under the lock, so a long export
+        never holds the lock or more than one cell's rows.
+        """
+        with self._lock:
+            cells = self.cube.matching_cells(filters or {})
+        for cell in cells:
+            with self._lock:
+                aggregate = self.cube.cells.get(cell)
+                rows = cell_rows(cell, aggregate, table) if aggregate is not None else []
+            yield from rows
+
+    def get_cube_dimensions(self):
+        """Values each cube dimension currently takes"""
+        with self._lock:
+            return self.cube.dimension_values()
+
     def get_dashboard_data(self):
         """Get comprehensive dashboard data"""
         return {
-            'summary_stats': self._get_summary_stats(),
+            'summary_stats': self._section('summary_stats', self._get_summary_stats),
             'demographics': self.analytics_cache['demographics'],
             'facilities': self.analytics_cache['facilities'],
             'popular_places': self.analytics_cache['popular_places'],
             'geographic_distribution': self.analytics_cache['geographic'],
-            'revenue_estimates': self._estimate_revenue()
+            'revenue_estimates': self._section('revenue_estimates', self._estimate_revenue)
         }
 
     def get_comprehensive_analytics(self):
         """Get detailed analytics for advanced dashboard"""
         return {
             **self.get_dashboard_data(),
-            'seasonal_trends': self._analyze_seasonal_trends(),
-            'competitor_analysis': self._competitor_analysis(),
-            'market_gaps': self._identify_market_gaps(),
-            'growth_opportunities': self._identify_growth_opportunities()
+            'seasonal_trends': self._section('seasonal_trends', self._analyze_seasonal_trends),
+            'competitor_analysis': self._section('competitor_analysis', self._competitor_analysis),
+            'market_gaps': self._section('market_gaps', self._identify_market_gaps),
+            'growth_opportunities': self._section('growth_opportunities', self._identify_growth_opportunities)
         }
 
-    def get_tourist_demographics(self):
+    def get_tourist_demographics(self, filters=None):
         """Get tourist demographics analysis"""
-        return self.analytics_cache['demographics']
+        return self.get_slice(filters)['demographics']
 
-    def get_popular_places_analysis(self):
+    def get_popular_places_analysis(self, filters=None):
         """Get popular places analysis"""
-        return self.analytics_cache['popular_places']
+        return self.get_slice(filters)['popular_places']
 
-    def get_facilities_analysis(self):
+    def get_facilities_analysis(self, filters=None):
         """Get facilities analysis"""
-        return self.analytics_cache['facilities']
-
-    def _compute_demographics(self):
-        """Compute tourist demographics"""
-        demographics = {
-            'total_tourists': 0,
-            'pakistani_tourists': 0,
-            'foreign_tourists': 0,
-            'breakdown_by_origin': {},
-            'breakdown_by_foreign_country': {},
-            'local_vs_nonlocal': {'local': 0, 'non_local': 0}
-        }
-
-        for hotel in self.hotels_data:
-            demo = hotel.get('touristDemographics', {})
-            
-            # Total tourists
-            total = demo.get('totalTouristsRecorded', 0)
-            demographics['total_tourists'] += total
-            
-            # Pakistani tourists
-            pak_tourists = demo.get('pakistaniTourists', {})
-            pak_count = pak_tourists.get('count', 0)
-            demographics['pakistani_tourists'] += pak_count
-            
-            # Foreign tourists
-            foreign_count = demo.get('foreignTourists', 0)
-            demographics['foreign_tourists'] += foreign_count
-            
-            # Local vs non-local
-            local_count = pak_tourists.get('local', 0)
-            non_local_count = pak_tourists.get('nonLocal', 0)
-            demographics['local_vs_nonlocal']['local'] += local_count
-            demographics['local_vs_nonlocal']['non_local'] += non_local_count
-            
-            # Breakdown by origin
-            for origin in pak_tourists.get('breakdownByOrigin', []):
-                origin_name = origin.get('origin', 'Unknown')
-                count = origin.get('count', 0)
-                demographics['breakdown_by_origin'][origin_name] = \
-                    demographics['breakdown_by_origin'].get(origin_name, 0) + count
-            
-            # Breakdown by foreign country
-            for country in demo.get('breakdownByForeignCountry', []):
-                country_name = country.get('country', 'Unknown')
-                count = country.get('count', 0)
-                demographics['breakdown_by_foreign_country'][country_name] = \
-                    demographics['breakdown_by_foreign_country'].get(country_name, 0) + count
-
-        return demographics
-
-    def _compute_facilities_stats(self):
-        """Compute facilities statistics"""
-        facilities = {
-            'wifi': 0,
-            'guide_services': 0,
-            'transport': 0,
-            'restaurant': 0,
-            'laundry': 0,
-            'own_transport': 0,
-            'conference_hall': 0,
-            'parking': 0
-        }
-
-        total_hotels = len(self.hotels_data)
-
-        for hotel in self.hotels_data:
-            hotel_facilities = hotel.get('facilities', {})
-            
-            if hotel_facilities.get('wifiInternet'):
-                facilities['wifi'] += 1
-            if hotel_facilities.get('guideServices'):
-                facilities['guide_services'] += 1
-            if hotel_facilities.get('transportArrangement'):
-                facilities['transport'] += 1
-            if hotel_facilities.get('restaurantDining'):
-                facilities['restaurant'] += 1
-            if hotel_facilities.get('laundryServices'):
-                facilities['laundry'] += 1
-            if hotel.get('hasOwnTransport'):
-                facilities['own_transport'] += 1
-            
-            # Check other facilities
-            other_facilities = hotel_facilities.get('otherFacilities', '').lower()
-            if 'conference' in other_facilities:
-                facilities['conference_hall'] += 1
-            if 'parking' in other_facilities:
-                facilities['parking'] += 1
-
-        # Convert to percentages
-        facilities_percentage = {}
-        for facility, count in facilities.items():
-            facilities_percentage[facility] = {
-                'count': count,
-                'percentage': round((count / total_hotels) * 100, 2)
-            }
-
-        return facilities_percentage
-
-    def _compute_popular_places(self):
-        """Compute popular places analysis"""
-        place_counter = Counter()
-        
-        for hotel in self.hotels_data:
-            places = hotel.get('mostPopularPlaces', [])
-            for place in places:
-                place_counter[place] += 1
-        
-        return dict(place_counter.most_common())
-
-    def _compute_geographic_stats(self):
-        """Compute geographic distribution"""
-        locations = {}
-        
-        for hotel in self.hotels_data:
-            location_key = hotel['fullAddress'].split(',')[-1].strip()
-            locations[location_key] = locations.get(location_key, 0) + 1
-        
-        return locations
-
-    def _compute_temporal_stats(self):
-        """Compute temporal statistics"""
-        avg_occupancy = np.mean([h.get('averageOccupancyPerDay', 0) for h in self.hotels_data])
-        avg_stay_duration = np.mean([h.get('averageStayDurationDays', 0) for h in self.hotels_data])
-        
-        return {
-            'avg_occupancy': round(avg_occupancy, 2),
-            'avg_stay_duration': round(avg_stay_duration, 2)
-        }
+        return self.get_slice(filters)['facilities']
 
     def _get_summary_stats(self):
         """Get summary statistics"""
-        total_hotels = len(self.hotels_data)
-        total_rooms = sum(h.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0) for h in self.hotels_data)
+        total_hotels = self.overall.hotels
+        total_rooms = self.overall.totals['rooms']
         total_tourists = self.analytics_cache['demographics']['total_tourists']
         
         return {
@@ -209,27 +232,53 @@ class AnalyticsEngine:
 
     def _analyze_seasonal_trends(self):
         """Analyze seasonal tourism trends"""
-        # This would typically use historical data
-        # For now, we'll provide estimated trends
+        profile = self.occupancy_store.monthly_profile() if self.occupancy_store is not None else None
+        if profile:
+            return self._observed_seasonal_trends(profile)
+
+        # Without recorded observations, fall back to estimated trends
         return {
             'peak_season': {'months': ['May', 'June', 'July', 'August', 'September'], 'factor': 1.8},
             'shoulder_season': {'months': ['April', 'October'], 'factor': 1.2},
-            'off_season': {'months': ['November', 'December', 'January', 'February', 'March'], 'factor': 0.6}
+            'off_season': {'months': ['November', 'December', 'January', 'February', 'March'], 'factor': 0.6},
+            'source': 'estimated'
+        }
+
+    def _observed_seasonal_trends(self, profile):
+        """Seasons from observed occupancy per calendar month relative to the yearly mean"""
+        observed = {month: values['occupancy'] for month, values in profile.items() if values['occupancy'] is not None}
+        mean_occupancy = np.mean(list(observed.values()))
+        factors = {month: occupancy / mean_occupancy if mean_occupancy else 1.0 for month, occupancy in observed.items()}
+
+        seasons = {'peak_season': [], 'shoulder_season': [], 'off_season': []}
+        for month, factor in factors.items():
+            season = 'peak_season' if factor >= 1.2 else 'shoulder_season' if factor >= 0.9 else 'off_season'
+            seasons[season].append(month)
+
+        return {
+            **{
+                season: {
+                    'months': months,
+                    'factor': round(float(np.mean([factors[month] for month in months])), 2) if months else None
+                }
+                for season, months in seasons.items()
+            },
+            'monthly': {
+                month: {**values, 'factor': round(float(factors[month]), 2) if month in factors else None}
+                for month, values in profile.items()
+            },
+            'source': 'observations'
         }
 
     def _competitor_analysis(self):
         """Perform competitor analysis"""
-        hotels_by_size = {
-            'small': [h for h in self.hotels_data if h.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0) < 10],
-            'medium': [h for h in self.hotels_data if 10 <= h.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0) < 30],
-            'large': [h for h in self.hotels_data if h.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0) >= 30]
-        }
+        total_hotels = self.overall.hotels
         
         return {
-            'size_distribution': {size: len(hotels) for size, hotels in hotels_by_size.items()},
+            'size_distribution': dict(self.overall.size_counts),
             'market_share_by_size': {
-                size: round(len(hotels) / len(self.hotels_data) * 100, 2)
-                for size, hotels in hotels_by_size.items()
+                size: round(count / total_hotels * 100, 2) if total_hotels else 0
+                for size, count in self.overall.size_counts.items()
             }
         }
 
@@ -255,7 +304,8 @@ class AnalyticsEngine:
         opportunities = []
         
         # Foreign tourist opportunities
-        foreign_percentage = (demographics['foreign_tourists'] / demographics['total_tourists']) * 100
+        foreign_percentage = (demographics['foreign_tourists'] / demographics['total_tourists']) * 100 \
+            if demographics['total_tourists'] else 0
         if foreign_percentage < 20:
             opportunities.append("Increase foreign tourist focus (currently {:.1f}%)".format(foreign_percentage))
         
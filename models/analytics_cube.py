@@ -0,0 +1,329 @@
+from collections import Counter
+
+from models.gazetteer import DISTRICTS, GAZETTEER, OTHER_DISTRICT, district_of, place_ids
+from utils.helpers import categorize_budget
+
+FACILITY_KEYS = [
+    'wifi', 'guide_services', 'transport', 'restaurant', 'laundry', 'own_transport', 'conference_hall', 'parking'
+]
+
+TOTAL_KEYS = [
+    'hotels', 'rooms', 'total_tourists', 'pakistani_tourists', 'foreign_tourists', 'local', 'non_local',
+    'occupancy', 'stay_duration'
+]
+
+SIZE_CLASSES = ('small', 'medium', 'large')
+
+# Cube dimensions and the values a slice may ask for
+CUBE_DIMENSIONS = ('location', 'type', 'budget', 'size')
+DIMENSION_VALUES = {
+    'location': tuple(district for district, _ in DISTRICTS) + (OTHER_DISTRICT,),
+    'type': ('hotel', 'guest_house', 'hotel_guest_house', 'other'),
+    'budget': ('low', 'medium', 'high'),
+    'size': SIZE_CLASSES
+}
+# "hotel" / "guest_house" also match places registered as both
+DIMENSION_ALIASES = {
+    'type': {'hotel': ('hotel', 'hotel_guest_house'), 'guest_house': ('guest_house', 'hotel_guest_house')}
+}
+
+
+def to_number(value):
+    """Numeric field value; anything unparseable counts as 0, as pd.to_numeric(errors='coerce') then fillna(0)"""
+    if isinstance(value, bool):
+        return int(value)
+    if not isinstance(value, (int, float)):
+        try:
+            value = float(str(value).strip())
+        except ValueError:
+            return 0
+        if value.is_integer():
+            return int(value)
+    return 0 if value != value else value
+
+
+def size_class(rooms):
+    return 'small' if rooms < 10 else 'medium' if rooms < 30 else 'large'
+
+
+def hotel_location(hotel):
+    return hotel.get('fullAddress', '').split(',')[-1].strip()
+
+
+def hotel_type(hotel):
+    types = hotel.get('type') or {}
+    if types.get('hotel') and types.get('guestHouse'):
+        return 'hotel_guest_house'
+    if types.get('hotel'):
+        return 'hotel'
+    if types.get('guestHouse'):
+        return 'guest_house'
+    return 'other'
+
+
+def hotel_cell(hotel):
+    """Cube coordinates (location, type, budget, size) of a hotel
+
+    The location is the address's district, so the number of cells stays
+    bounded however many hotels there are.
+    """
+    rooms = to_number(hotel.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0))
+    return (district_of(hotel.get('fullAddress')), hotel_type(hotel), categorize_budget(hotel), size_class(rooms))
+
+
+def hotel_facilities(hotel):
+    hotel_facilities = hotel.get('facilities', {})
+    other_facilities = (hotel_facilities.get('otherFacilities') or '').lower()
+    flags = {
+        'wifi': hotel_facilities.get('wifiInternet'),
+        'guide_services': hotel_facilities.get('guideServices'),
+        'transport': hotel_facilities.get('transportArrangement'),
+        'restaurant': hotel_facilities.get('restaurantDining'),
+        'laundry': hotel_facilities.get('laundryServices'),
+        'own_transport': hotel.get('hasOwnTransport'),
+        'conference_hall': 'conference' in other_facilities,
+        'parking': 'parking' in other_facilities
+    }
+    return [facility for facility, present in flags.items() if present]
+
+
+def hotel_delta(hotel):
+    """One hotel's contribution to every accumulator of a HotelAggregate"""
+    demo = hotel.get('touristDemographics', {})
+    pak_tourists = demo.get('pakistaniTourists', {})
+    rooms = to_number(hotel.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0))
+    return {
+        'totals': {
+            'hotels': 1,
+            'rooms': rooms,
+            'total_tourists': to_number(demo.get('totalTouristsRecorded', 0)),
+            'pakistani_tourists': to_number(pak_tourists.get('count', 0)),
+            'foreign_tourists': to_number(demo.get('foreignTourists', 0)),
+            'local': to_number(pak_tourists.get('local', 0)),
+            'non_local': to_number(pak_tourists.get('nonLocal', 0)),
+            'occupancy': to_number(hotel.get('averageOccupancyPerDay', 0)),
+            'stay_duration': to_number(hotel.get('averageStayDurationDays', 0))
+        },
+        # Same coercion as flatten_hotels, so incremental totals match a recompute
+        'origins': [(origin.get('origin', 'Unknown'), to_number(origin.get('count', 0)))
+                    for origin in pak_tourists.get('breakdownByOrigin', [])],
+        'foreign_countries': [(country.get('country', 'Unknown'), to_number(country.get('count', 0)))
+                              for country in demo.get('breakdownByForeignCountry', [])],
+        'facilities': hotel_facilities(hotel),
+        'places': place_ids(hotel),
+        'location': hotel_location(hotel),
+        'size': size_class(rooms)
+    }
+
+
+class KeyedTotals:
+    """Per-key sums that also count contributing records
+
+    A key disappears exactly when its last contributing record is removed,
+    so a breakdown built by adds and removes matches a full recompute.
+    """
+
+    def __init__(self, totals=None):
+        """``totals`` is {key: (sum, records)} as produced by a groupby"""
+        self.values = {}
+        self.refs = Counter()
+        for key, (value, refs) in (totals or {}).items():
+            self.values[key] = value
+            self.refs[key] = refs
+
+    def add(self, key, amount=1, sign=1):
+        if sign > 0:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.refs[key] += 1
+            return
+        self.values[key] -= amount
+        self.refs[key] -= 1
+        if self.refs[key] <= 0:
+            del self.values[key]
+            del self.refs[key]
+
+    def merge(self, other):
+        for key, value in other.values.items():
+            self.values[key] = self.values.get(key, 0) + value
+        self.refs.update(other.refs)
+
+
+class HotelAggregate:
+    """Mergeable sums and keyed counts over a set of hotels
+
+    ``apply`` adds or subtracts one record's delta, ``merge`` folds another
+    aggregate in, and the section methods render the same shapes as the
+    analytics endpoints.
+    """
+
+    def __init__(self, aggregates=None):
+        aggregates = aggregates or {}
+        self.totals = {key: 0 for key in TOTAL_KEYS}
+        self.totals.update(aggregates.get('totals', {}))
+        self.origins = KeyedTotals(aggregates.get('origins'))
+        self.foreign_countries = KeyedTotals(aggregates.get('foreign_countries'))
+        self.facility_counts = Counter({facility: 0 for facility in FACILITY_KEYS})
+        self.facility_counts.update(aggregates.get('facilities', {}))
+        self.place_counts = KeyedTotals(aggregates.get('places'))
+        self.location_counts = KeyedTotals(aggregates.get('locations'))
+        self.size_counts = Counter({size: 0 for size in SIZE_CLASSES})
+        self.size_counts.update(aggregates.get('sizes', {}))
+
+    def apply(self, delta, sign=1):
+        """Add (sign=1) or subtract (sign=-1) one hotel's contribution"""
+        for key, value in delta['totals'].items():
+            self.totals[key] += sign * value
+        for name, count in delta['origins']:
+            self.origins.add(name, count, sign)
+        for name, count in delta['foreign_countries']:
+            self.foreign_countries.add(name, count, sign)
+        for facility in delta['facilities']:
+            self.facility_counts[facility] += sign
+        for place in delta['places']:
+            self.place_counts.add(place, 1, sign)
+        self.location_counts.add(delta['location'], 1, sign)
+        self.size_counts[delta['size']] += sign
+
+    def merge(self, other):
+        for key, value in other.totals.items():
+            self.totals[key] += value
+        self.origins.merge(other.origins)
+        self.foreign_countries.merge(other.foreign_countries)
+        self.facility_counts.update(other.facility_counts)
+        self.place_counts.merge(other.place_counts)
+        self.location_counts.merge(other.location_counts)
+        self.size_counts.update(other.size_counts)
+
+    @property
+    def hotels(self):
+        return self.totals['hotels']
+
+    def demographics(self):
+        return {
+            'total_tourists': self.totals['total_tourists'],
+            'pakistani_tourists': self.totals['pakistani_tourists'],
+            'foreign_tourists': self.totals['foreign_tourists'],
+            'breakdown_by_origin': dict(self.origins.values),
+            'breakdown_by_foreign_country': dict(self.foreign_countries.values),
+            'local_vs_nonlocal': {'local': self.totals['local'], 'non_local': self.totals['non_local']}
+        }
+
+    def facilities(self):
+        total_hotels = self.hotels
+        return {
+            facility: {
+                'count': self.facility_counts[facility],
+                'percentage': round((self.facility_counts[facility] / total_hotels) * 100, 2) if total_hotels else 0
+            }
+            for facility in FACILITY_KEYS
+        }
+
+    def popular_places(self):
+        return {
+            GAZETTEER.name(place_id): count
+            for place_id, count in Counter(self.place_counts.values).most_common()
+        }
+
+    def geographic(self):
+        return dict(self.location_counts.values)
+
+    def temporal(self):
+        total_hotels = self.hotels
+        return {
+            'avg_occupancy': round(self.totals['occupancy'] / total_hotels, 2) if total_hotels else 0,
+            'avg_stay_duration': round(self.totals['stay_duration'] / total_hotels, 2) if total_hotels else 0
+        }
+
+
+# Exportable tables and their columns: one row per cube cell, or one row per
+# cell and breakdown key
+EXPORT_TABLES = {
+    'cells': list(CUBE_DIMENSIONS) + TOTAL_KEYS + FACILITY_KEYS,
+    'origins': list(CUBE_DIMENSIONS) + ['name', 'tourists', 'hotels'],
+    'foreign_countries': list(CUBE_DIMENSIONS) + ['name', 'tourists', 'hotels'],
+    'places': list(CUBE_DIMENSIONS) + ['name', 'hotels']
+}
+
+
+def cell_rows(cell, aggregate, table):
+    """Flat export rows of one cube cell for an EXPORT_TABLES table"""
+    dimensions = dict(zip(CUBE_DIMENSIONS, cell))
+    if table == 'cells':
+        return [{**dimensions, **aggregate.totals, **{key: aggregate.facility_counts[key] for key in FACILITY_KEYS}}]
+    if table == 'places':
+        return [
+            {**dimensions, 'name': GAZETTEER.name(place_id), 'hotels': count}
+            for place_id, count in aggregate.place_counts.values.items()
+        ]
+    breakdown = aggregate.origins if table == 'origins' else aggregate.foreign_countries
+    return [
+        {**dimensions, 'name': name, 'tourists': total, 'hotels': breakdown.refs[name]}
+        for name, total in breakdown.values.items()
+    ]
+
+
+def parse_slice(args):
+    """Cube filters from request args, e.g. ``budget=low&type=guest_house,hotel``
+
+    Returns {dimension: set of values}; raises ValueError for a value a
+    fixed dimension does not have.
+    """
+    filters = {}
+    for dimension in CUBE_DIMENSIONS:
+        raw = args.get(dimension)
+        if not raw:
+            continue
+        values = set()
+        for value in str(raw).split(','):
+            value = value.strip().lower().replace(' ', '_')
+            if not value:
+                continue
+            allowed = DIMENSION_VALUES.get(dimension)
+            if allowed is not None and value not in allowed:
+                raise ValueError(f"Unknown {dimension} '{value}'; expected one of {', '.join(allowed)}")
+            values.update(DIMENSION_ALIASES.get(dimension, {}).get(value, (value,)))
+        if values:
+            filters[dimension] = values
+    return filters
+
+
+def cell_matches(cell, filters):
+    """Whether cube coordinates fall inside a parse_slice filter"""
+    return all(cell[CUBE_DIMENSIONS.index(dimension)] in values for dimension, values in filters.items())
+
+
+class AggregationCube:
+    """HotelAggregates per (location, type, budget, size) cell
+
+    A slice or roll-up merges the matching cells, so its cost depends on the
+    number of non-empty cells and never on the number of hotels.
+    """
+
+    def __init__(self, cells=None):
+        self.cells = dict(cells or {})
+
+    def apply(self, cell, delta, sign=1):
+        aggregate = self.cells.get(cell)
+        if aggregate is None:
+            aggregate = self.cells[cell] = HotelAggregate()
+        aggregate.apply(delta, sign)
+        if aggregate.hotels <= 0:
+            del self.cells[cell]
+
+    def matching_cells(self, filters):
+        """Keys of the cells matching ``filters`` ({dimension: values})"""
+        return [cell for cell in self.cells if cell_matches(cell, filters)]
+
+    def slice(self, filters):
+        """Merged aggregate of every cell matching ``filters``"""
+        merged = HotelAggregate()
+        for cell in self.matching_cells(filters):
+            merged.merge(self.cells[cell])
+        return merged
+
+    def dimension_values(self):
+        """Values present in the cube for each dimension"""
+        return {
+            dimension: sorted({cell[position] for cell in self.cells})
+            for position, dimension in enumerate(CUBE_DIMENSIONS)
+        }
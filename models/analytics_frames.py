@@ -0,0 +1,201 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from models.analytics_cube import hotel_cell
+from models.gazetteer import place_ids
+
+# Flattened views of the hotel records: one row per hotel, and one row per
+# origin / foreign country / popular place entry with the hotel's position.
+# Places are gazetteer ids, so counting them is a bincount.
+HotelFrames = namedtuple('HotelFrames', ['hotels', 'origins', 'countries', 'places'])
+
+DISTRIBUTION_COLUMNS = {
+    'rooms': 'Rooms per hotel',
+    'occupancy': 'Average guests per day',
+    'stay_duration': 'Average stay (days)'
+}
+
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+
+def _numeric(values):
+    # Same result per value as analytics_cube.to_number, without a Python call per value
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0)
+
+
+def flatten_hotels(hotels_data):
+    """Flatten hotel records into DataFrames in a single pass"""
+    rows = []
+    origins = ([], [], [])
+    countries = ([], [], [])
+    places = ([], [])
+
+    for position, hotel in enumerate(hotels_data):
+        demo = hotel.get('touristDemographics', {})
+        pak_tourists = demo.get('pakistaniTourists', {})
+        facilities = hotel.get('facilities', {})
+        other_facilities = (facilities.get('otherFacilities') or '').lower()
+        rows.append((
+            facilities.get('rooms', {}).get('numberOfRooms', 0),
+            demo.get('totalTouristsRecorded', 0),
+            pak_tourists.get('count', 0),
+            demo.get('foreignTourists', 0),
+            pak_tourists.get('local', 0),
+            pak_tourists.get('nonLocal', 0),
+            hotel.get('averageOccupancyPerDay', 0),
+            hotel.get('averageStayDurationDays', 0),
+            hotel.get('fullAddress', '').split(',')[-1].strip(),
+            bool(facilities.get('wifiInternet')),
+            bool(facilities.get('guideServices')),
+            bool(facilities.get('transportArrangement')),
+            bool(facilities.get('restaurantDining')),
+            bool(facilities.get('laundryServices')),
+            bool(hotel.get('hasOwnTransport')),
+            'conference' in other_facilities,
+            'parking' in other_facilities,
+            hotel_cell(hotel)
+        ))
+        for origin in pak_tourists.get('breakdownByOrigin', []):
+            origins[0].append(position)
+            origins[1].append(origin.get('origin', 'Unknown'))
+            origins[2].append(origin.get('count', 0))
+        for country in demo.get('breakdownByForeignCountry', []):
+            countries[0].append(position)
+            countries[1].append(country.get('country', 'Unknown'))
+            countries[2].append(country.get('count', 0))
+        for place_id in place_ids(hotel):
+            places[0].append(position)
+            places[1].append(place_id)
+
+    hotels = pd.DataFrame.from_records(rows, columns=[
+        'rooms', 'total_tourists', 'pakistani_tourists', 'foreign_tourists', 'local', 'non_local',
+        'occupancy', 'stay_duration', 'location', 'wifi', 'guide_services', 'transport', 'restaurant',
+        'laundry', 'own_transport', 'conference_hall', 'parking', 'cell'
+    ])
+    for column in ('rooms', 'total_tourists', 'pakistani_tourists', 'foreign_tourists', 'local', 'non_local',
+                   'occupancy', 'stay_duration'):
+        hotels[column] = _numeric(hotels[column])
+
+    return HotelFrames(
+        hotels=hotels,
+        origins=pd.DataFrame({'hotel': origins[0], 'name': origins[1], 'count': _numeric(origins[2])}),
+        countries=pd.DataFrame({'hotel': countries[0], 'name': countries[1], 'count': _numeric(countries[2])}),
+        places=pd.DataFrame({'hotel': places[0], 'name': np.asarray(places[1], dtype=np.int64)})
+    )
+
+
+def _python(value):
+    """numpy scalar -> int/float so the result stays JSON serializable"""
+    value = value.item() if hasattr(value, 'item') else value
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def keyed_totals(frame, value_column=None):
+    """{key: (sum, rows)} per name, keys in order of first appearance"""
+    return grouped_keyed_totals(frame.assign(group=0), value_column).get(0, {})
+
+
+def grouped_keyed_totals(frame, value_column=None):
+    """{group: {key: (sum, rows)}} per group and name of an exploded table"""
+    if frame.empty:
+        return {}
+    grouped = frame.groupby(['group', 'name'], sort=False)
+    rows = grouped.size()
+    sums = grouped[value_column].sum() if value_column else rows
+    totals = {}
+    for (group, name), total, count in zip(sums.index.tolist(), sums.tolist(), rows.tolist()):
+        totals.setdefault(group, {})[_python(name)] = (_python(total), int(count))
+    return totals
+
+
+def grouped_place_totals(frame):
+    """{group: {place_id: (hotels, hotels)}} with a single bincount over group x place"""
+    if frame.empty:
+        return {}
+    groups = frame['group'].to_numpy(dtype=np.int64)
+    ids = frame['name'].to_numpy(dtype=np.int64)
+    width = int(ids.max()) + 1
+    counts = np.bincount(groups * width + ids, minlength=(int(groups.max()) + 1) * width).reshape(-1, width)
+    totals = {}
+    for group, place_id in zip(*np.nonzero(counts)):
+        count = int(counts[group, place_id])
+        totals.setdefault(int(group), {})[int(place_id)] = (count, count)
+    return totals
+
+
+def aggregate_frames(frames, facility_keys, by=None):
+    """Every accumulator of a HotelAggregate, computed with vectorized ops
+
+    With ``by`` (a column of the hotels frame, e.g. 'cell') the result is
+    {value: aggregates} with one entry per distinct value of that column.
+    """
+    hotels = frames.hotels
+    if by is None:
+        keys = [None]
+        codes = np.zeros(len(hotels), dtype=np.int64)
+    else:
+        # Group on small integer codes; the column may hold tuples
+        index = {}
+        codes = np.fromiter((index.setdefault(value, len(index)) for value in hotels[by]),
+                            dtype=np.int64, count=len(hotels))
+        keys = list(index)
+
+    def with_group(frame):
+        return frame.assign(group=codes[frame['hotel'].to_numpy()] if len(frame) else [])
+
+    sum_columns = ['rooms', 'total_tourists', 'pakistani_tourists', 'foreign_tourists', 'local', 'non_local',
+                   'occupancy', 'stay_duration']
+    grouped = hotels.assign(group=codes).groupby('group', sort=False)
+    sums = grouped[sum_columns + facility_keys].sum()
+    counts = grouped.size()
+    sizes = hotels.assign(group=codes, size=np.select(
+        [hotels['rooms'] < 10, hotels['rooms'] < 30], ['small', 'medium'], default='large'
+    )).groupby(['group', 'size']).size()
+    locations = grouped_keyed_totals(pd.DataFrame({'group': codes, 'name': hotels['location']}))
+    origins = grouped_keyed_totals(with_group(frames.origins), 'count')
+    countries = grouped_keyed_totals(with_group(frames.countries), 'count')
+    places = grouped_place_totals(with_group(frames.places))
+
+    aggregates = {}
+    for code, row in zip(sums.index.tolist(), sums.to_dict('records')):
+        aggregates[keys[code]] = {
+            'totals': {'hotels': int(counts[code]), **{key: _python(row[key]) for key in sum_columns}},
+            'origins': origins.get(code, {}),
+            'foreign_countries': countries.get(code, {}),
+            'places': places.get(code, {}),
+            'locations': locations.get(code, {}),
+            'facilities': {facility: int(row[facility]) for facility in facility_keys},
+            'sizes': {size: int(count) for size, count in sizes.loc[code].items()}
+        }
+    if by is None:
+        return aggregates.get(None, {})
+    return aggregates
+
+
+def distribution_stats(hotels, bins=10):
+    """Histogram and percentiles of rooms, occupancy and stay duration"""
+    stats = {}
+    for column, label in DISTRIBUTION_COLUMNS.items():
+        values = hotels[column].to_numpy(dtype=float)
+        if values.size == 0:
+            stats[column] = {'label': label, 'count': 0}
+            continue
+        counts, edges = np.histogram(values, bins=bins)
+        stats[column] = {
+            'label': label,
+            'count': int(values.size),
+            'mean': round(float(values.mean()), 2),
+            'std': round(float(values.std()), 2),
+            'min': round(float(values.min()), 2),
+            'max': round(float(values.max()), 2),
+            'percentiles': {
+                f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+            },
+            'histogram': {
+                'counts': counts.tolist(),
+                'edges': [round(float(edge), 2) for edge in edges]
+            }
+        }
+    return stats
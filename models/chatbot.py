@@ -365,28 +365,108 @@
 #                             self.context['interests'].append(interest)
 
 
+import logging
 import re
 import random
+import threading
+import time
+import traceback
+from collections import deque
 from datetime import datetime
 
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from sentence_transformers import SentenceTransformer
-import torch
+from models.conversation_store import ConversationStore
+from models.gazetteer import GAZETTEER, place_ids
+from models.intent_matcher import CONTEXT_MATCHER, INTENT_MATCHER, KeywordMatcher, resolve_intent
+from models.model_server import ModelServerError
+from models.rankers import latency_percentiles
+from models.retrieval import HashingEmbedder, RetrievalIndex, SentenceTransformerEmbedder, content_tokens
+from models.structured_query import QUERY_MATCHER, StructuredQueryEngine
+from utils.cache import LRUCache
+from utils.sketches import TrendTracker
+
+logger = logging.getLogger(__name__)
+
+
+# Cosine score a retrieval hit needs before it is used as an answer
+DEFAULT_RETRIEVAL_MIN_SCORES = {'sentence_transformer': 0.45, 'hashing': 0.25}
+
+# Intents whose reply depends only on the normalized message (and, for
+# weather, the month), so it can be served from the response cache
+CACHEABLE_INTENTS = {
+    'budget_inquiry', 'place_recommendation', 'facility_inquiry', 'weather_inquiry', 'general_inquiry'
+}
+
+# Structured-query facility names folded onto the conversational ones for trends
+TREND_FACILITY_ALIASES = {'guide_services': 'guide', 'own_transport': 'transport'}
 
 
 class TourismChatbot:
-    def __init__(self, hotels_data):
+    def __init__(self, hotels_data, model_loading='background', max_sessions=1000,
+                 session_ttl=1800, history_token_window=256, max_new_tokens=128,
+                 batch_max_size=8, batch_max_wait_ms=5, embedding_backend='sentence_transformer',
+                 retrieval_index_dir=None, retrieval_min_score=None, inference_mode='fp32',
+                 torch_threads=None, response_cache_size=1024, response_cache_ttl=3600,
+                 model_server=None, latency_budget_ms=None, kv_cache_sessions=0, analytics_engine=None,
+                 trends_bucket_seconds=3600, trends_buckets=24, trends_top_k=64):
         self.hotels_data = hotels_data
-        self.context = {}
+        # Counting/listing questions are answered from indexes, never the models
+        self.structured_queries = StructuredQueryEngine(hotels_data, analytics_engine)
+        # What travellers ask about, in fixed memory however much traffic arrives
+        self.chat_trends = TrendTracker(
+            bucket_seconds=trends_bucket_seconds, num_buckets=trends_buckets, top_k=trends_top_k
+        )
+        # Default wall-clock budget for a reply; None leaves generation unbounded
+        self.latency_budget_ms = latency_budget_ms or None
+        # With a ModelServerClient the models live in the model server process
+        # and this instance only answers rule-based fallbacks locally
+        self.model_server = model_server
+        self.remote_fallbacks = 0
+        self.max_new_tokens = max_new_tokens
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.embedding_backend = embedding_backend
+        self.inference_mode = inference_mode
+        self.torch_threads = torch_threads
+        self.retrieval_index_dir = retrieval_index_dir
+        if retrieval_min_score is None:
+            retrieval_min_score = DEFAULT_RETRIEVAL_MIN_SCORES.get(embedding_backend, 0.45)
+        self.retrieval_min_score = retrieval_min_score
 
-        # DialoGPT-small for dialog generation
-        self.dialogpt_tokenizer = AutoTokenizer.from_pretrained("microsoft/DialoGPT-small")
-        self.dialogpt_model = AutoModelForCausalLM.from_pretrained("microsoft/DialoGPT-small")
+        # Conversation state (context + DialoGPT history) is kept per session
+        self.conversations = ConversationStore(
+            max_sessions=max_sessions, ttl_seconds=session_ttl, max_history_tokens=history_token_window
+        )
 
-        # all-MiniLM-L6-v2 for semantic embeddings
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # DialoGPT key/value caches of recently active sessions, so a turn only
+        # runs the model over its new tokens; each holds up to the full window.
+        # Cached sessions skip the batch scheduler, so this is off by default
+        self.kv_caches = None
+        if kv_cache_sessions > 0:
+            self.kv_caches = LRUCache(max_size=kv_cache_sessions, ttl_seconds=session_ttl)
 
-        self.chat_history_ids = None
+        # Canned intent replies keyed by (intent, normalized message[, month])
+        self.response_cache = None
+        if response_cache_size > 0:
+            self.response_cache = LRUCache(max_size=response_cache_size, ttl_seconds=response_cache_ttl)
+
+        # Transformer models are loaded off the import path (see _load_models);
+        # until they are ready /api/chat is answered by the intent handlers
+        self.dialogpt_tokenizer = None
+        self.dialogpt_model = None
+        self.embedding_model = None
+        self.generation_scheduler = None
+        self.sentence_end_ids = None
+        self.retrieval_index = None
+        self.generation_stats = {
+            'generations': 0, 'deadline_fallbacks': 0, 'sentence_stops': 0, 'ms_per_token': None
+        }
+        self._generation_latencies = deque(maxlen=1000)
+        # Generation runs on request and scheduler threads
+        self._stats_lock = threading.Lock()
+        self.models_ready = threading.Event()
+        self.model_error = None
+        self._loader_thread = None
+        self._loader_lock = threading.Lock()
 
         # Existing conversational templates
         self.greetings = [
@@ -399,8 +479,208 @@ class TourismChatbot:
             "Have a wonderful journey in Skardu!",
             "Safe travels! Don't forget to visit Deosai Plains!"
         ]
+        self.place_blurbs = [
+            "Deosai Plains - The world's second highest plateau",
+            "Shangrila Resort - Stunning lake resort",
+            "Kachura Lake - Crystal clear lake",
+            "Manthoka Waterfall - Majestic waterfall",
+            "Kharpocho Fort - Historical fort overlooking Skardu"
+        ]
+        self.general_facts = {
+            'culture': "Skardu has rich Balti culture with Tibetan influences and warm hospitality.",
+            'safety': "Skardu is generally safe but always take precautions in remote areas.",
+            'food': "Local specialties include Chapshuro, Balti soups, and dried fruits.",
+            'how to reach': "You can reach Skardu by flights from Islamabad or by road via the Karakoram Highway."
+        }
 
         self.knowledge_base = self._build_knowledge_base()
+        self.entity_matcher = self._build_entity_matcher()
+
+        # The hashing embedder needs no model, so its index is ready at startup
+        if embedding_backend == 'hashing':
+            self._build_retrieval_index(HashingEmbedder())
+
+        if model_loading == 'eager':
+            self._load_models()
+        elif model_loading == 'background':
+            self.start_model_loading()
+
+
+    @classmethod
+    def from_config(cls, hotels_data, config, **overrides):
+        """Build a chatbot from the CHAT_* settings in config.py"""
+        options = dict(
+            model_loading=config['CHATBOT_MODEL_LOADING'],
+            max_sessions=config['CHAT_MAX_SESSIONS'],
+            session_ttl=config['CHAT_SESSION_TTL'],
+            history_token_window=config['CHAT_HISTORY_TOKEN_WINDOW'],
+            max_new_tokens=config['CHAT_MAX_NEW_TOKENS'],
+            batch_max_size=config['CHAT_BATCH_MAX_SIZE'],
+            batch_max_wait_ms=config['CHAT_BATCH_MAX_WAIT_MS'],
+            embedding_backend=config['CHAT_EMBEDDING_BACKEND'],
+            retrieval_index_dir=config['CHAT_RETRIEVAL_INDEX_DIR'],
+            retrieval_min_score=config['CHAT_RETRIEVAL_MIN_SCORE'],
+            inference_mode=config['CHAT_INFERENCE_MODE'],
+            torch_threads=config['CHAT_TORCH_THREADS'],
+            response_cache_size=config['CHAT_RESPONSE_CACHE_SIZE'],
+            response_cache_ttl=config['CHAT_RESPONSE_CACHE_TTL'],
+            latency_budget_ms=config['CHAT_LATENCY_BUDGET_MS'],
+            kv_cache_sessions=config['CHAT_KV_CACHE_SESSIONS'],
+            trends_bucket_seconds=config['CHAT_TRENDS_BUCKET_SECONDS'],
+            trends_buckets=config['CHAT_TRENDS_BUCKETS'],
+            trends_top_k=config['CHAT_TRENDS_TOP_K']
+        )
+        options.update(overrides)
+        return cls(hotels_data, **options)
+
+
+    def start_model_loading(self):
+        """Load the generative and embedding models on a background thread"""
+        with self._loader_lock:
+            if self.model_server is not None:
+                return
+            if self.models_ready.is_set() or self._loader_thread is not None:
+                return
+            self._loader_thread = threading.Thread(
+                target=self._load_models, name='chatbot-model-loader', daemon=True
+            )
+            self._loader_thread.start()
+
+
+    def _load_models(self):
+        try:
+            # Imported here so that importing the app does not pay for torch/transformers
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            from models.inference import configure_torch_threads, prepare_model
+            from models.stopping import sentence_end_token_ids
+
+            configure_torch_threads(self.torch_threads)
+
+            # DialoGPT-small for dialog generation (optionally int8-quantized)
+            self.dialogpt_tokenizer = AutoTokenizer.from_pretrained("microsoft/DialoGPT-small")
+            self.dialogpt_model = prepare_model(
+                AutoModelForCausalLM.from_pretrained("microsoft/DialoGPT-small"), self.inference_mode
+            )
+            self.sentence_end_ids = sentence_end_token_ids(self.dialogpt_tokenizer)
+
+            # all-MiniLM-L6-v2 for semantic embeddings
+            if self.embedding_backend == 'sentence_transformer':
+                from sentence_transformers import SentenceTransformer
+                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+                self._build_retrieval_index(SentenceTransformerEmbedder(self.embedding_model))
+                # Replies cached before the index existed may lack a grounded answer
+                if self.response_cache is not None:
+                    self.response_cache.clear()
+
+            # Coalesce concurrent chat requests into batched generate calls
+            if self.batch_max_size > 1:
+                from models.generation_scheduler import GenerationScheduler
+                self.generation_scheduler = GenerationScheduler(
+                    self.dialogpt_model,
+                    pad_token_id=self.dialogpt_tokenizer.eos_token_id,
+                    eos_token_id=self.dialogpt_tokenizer.eos_token_id,
+                    max_batch_size=self.batch_max_size,
+                    max_wait_ms=self.batch_max_wait_ms,
+                    max_new_tokens=self.max_new_tokens,
+                    sentence_end_ids=self.sentence_end_ids
+                )
+
+            self.models_ready.set()
+        except Exception as e:
+            self.model_error = f"{type(e).__name__}: {e}"
+            print("Failed to load chatbot models:\n" + traceback.format_exc())
+
+
+    def _build_entity_matcher(self):
+        return KeywordMatcher({
+            **{('place', place.lower()): [place] for place in self.knowledge_base['locations'] if place},
+            **{('place', GAZETTEER.name(place_id).lower()): aliases
+               for place_id, aliases in GAZETTEER.alias_groups().items()},
+            **{('hotel', name): [name] for name in self.knowledge_base['hotel_names']}
+        })
+
+
+    def refresh_hotels(self):
+        """Rebuild everything derived from hotels_data after a record changed"""
+        self.structured_queries.rebuild(self.hotels_data)
+        self.knowledge_base = self._build_knowledge_base()
+        self.entity_matcher = self._build_entity_matcher()
+        if self.retrieval_index is not None:
+            self._build_retrieval_index(self.retrieval_index.embedder)
+        if self.response_cache is not None:
+            self.response_cache.clear()
+
+
+    def _build_retrieval_index(self, embedder):
+        """Embed hotels, FAQ answers and place blurbs for grounding replies"""
+        documents = []
+        for hotel in self.hotels_data:
+            facilities = self._get_hotel_facilities(hotel)
+            places = [GAZETTEER.name(place_id) for place_id in place_ids(hotel)]
+            meals = [m for m in hotel.get('interestingMeals', []) if isinstance(m, str)]
+            text = ' '.join([
+                hotel.get('hotelGuestHouseName', ''),
+                hotel.get('fullAddress', ''),
+                ' '.join(facilities),
+                ' '.join(places),
+                ' '.join(meals)
+            ])
+            answer = f"{hotel.get('hotelGuestHouseName', 'This hotel')} ({hotel.get('fullAddress', 'Skardu')})"
+            if facilities:
+                answer += f" offers {', '.join(facilities)}"
+            if places:
+                answer += f". Guests often visit {', '.join(places[:3])}"
+            documents.append({'id': hotel.get('id', answer), 'kind': 'hotel', 'text': text, 'answer': answer + '.'})
+
+        for key, answer in self.general_facts.items():
+            documents.append({'id': f'faq:{key}', 'kind': 'faq', 'text': f"{key} {answer}", 'answer': answer})
+
+        for i, blurb in enumerate(self.place_blurbs):
+            documents.append({'id': f'place:{i}', 'kind': 'place', 'text': blurb, 'answer': blurb})
+
+        self.retrieval_index = RetrievalIndex(embedder, index_dir=self.retrieval_index_dir).build(documents)
+
+
+    def _grounded_answer(self, message):
+        """Best knowledge-base answer for a message, if it is a confident match"""
+        if self.retrieval_index is None:
+            return None
+        hits = self.retrieval_index.search(message, k=1)
+        if not hits or hits[0][1] < self.retrieval_min_score:
+            return None
+        document = hits[0][0]
+        if self.retrieval_index.embedder.lexical and \
+                not set(content_tokens(message)) & set(content_tokens(document['text'])):
+            return None
+        return document['answer']
+
+
+    def get_status(self):
+        """Model readiness for health checks"""
+        ready = self.models_ready.is_set()
+        return {
+            'models_ready': ready,
+            'loading': not ready and self.model_error is None and self._loader_thread is not None,
+            'error': self.model_error,
+            'mode': 'generative' if ready else 'rule_based',
+            'inference_mode': self.inference_mode,
+            'sessions': self.conversations.stats(),
+            'kv_caches': self.kv_caches.stats() if self.kv_caches else None,
+            'response_cache': self.response_cache.stats() if self.response_cache else None,
+            'generation': self.generation_scheduler.get_stats() if self.generation_scheduler else None,
+            'latency': self._latency_status(),
+            'model_server': self._model_server_status() if self.model_server else None,
+            'chat_trends': self.chat_trends.stats()
+        }
+
+
+    def _model_server_status(self):
+        status = {'address': self.model_server.address, 'fallbacks': self.remote_fallbacks}
+        try:
+            status['server'] = self.model_server.call('status')
+        except ModelServerError as e:
+            status['error'] = str(e)
+        return status
 
 
     def _build_knowledge_base(self):
@@ -420,9 +700,8 @@ class TourismChatbot:
             if full_address:
                 location = full_address.split(',')[-1].strip()
                 knowledge['locations'].add(location)
-            for place in hotel.get('mostPopularPlaces', []):
-                if isinstance(place, str):
-                    knowledge['places'].add(place.lower())
+            for place_id in place_ids(hotel):
+                knowledge['places'].add(GAZETTEER.name(place_id).lower())
             facilities = hotel.get('facilities', {})
             if facilities.get('wifiInternet'):
                 knowledge['facilities'].add('wifi')
@@ -437,65 +716,373 @@ class TourismChatbot:
         return knowledge
 
 
-    def get_response(self, user_message, chat_history=None):
+    def get_response(self, user_message, chat_history=None, session_id=None, latency_budget_ms=None):
         if chat_history is None:
             chat_history = []
 
-        # Update context with recent chat history
-        self._update_context(chat_history)
+        self._track_message(user_message)
 
-        # Use semantic embeddings to enrich understanding (optional extension)
-        query_embedding = self.embedding_model.encode(user_message)
+        structured = self.structured_queries.answer(user_message)
+        if structured:
+            return structured
 
-        # Use DialoGPT-small to generate response
-        new_input_ids = self.dialogpt_tokenizer.encode(user_message + self.dialogpt_tokenizer.eos_token, return_tensors='pt')
+        if self.model_server is not None:
+            try:
+                return self.model_server.call(
+                    'respond', user_message=user_message, chat_history=chat_history,
+                    session_id=session_id, latency_budget_ms=latency_budget_ms
+                )
+            except ModelServerError as e:
+                self._note_remote_fallback(e)
 
-        if self.chat_history_ids is not None:
-            bot_input_ids = torch.cat([self.chat_history_ids, new_input_ids], dim=-1)
-        else:
-            bot_input_ids = new_input_ids
+        deadline = self._deadline(latency_budget_ms)
+        conversation = self.conversations.get(session_id)
+        with conversation.lock:
+            return self._respond(conversation, user_message, chat_history, deadline)
 
-        self.chat_history_ids = self.dialogpt_model.generate(
-            bot_input_ids, max_length=1000, pad_token_id=self.dialogpt_tokenizer.eos_token_id
-        )
 
-        bot_response = self.dialogpt_tokenizer.decode(
-            self.chat_history_ids[:, bot_input_ids.shape[-1]:][0], skip_special_tokens=True
-        )
+    def _deadline(self, latency_budget_ms=None):
+        """Monotonic deadline for a request arriving now, or None if unbounded"""
+        budget = latency_budget_ms or self.latency_budget_ms
+        return time.monotonic() + budget / 1000.0 if budget else None
+
+
+    def _token_budget(self, deadline):
+        """New tokens that fit before the deadline at the observed generation speed"""
+        if deadline is None:
+            return self.max_new_tokens
+        remaining_ms = (deadline - time.monotonic()) * 1000
+        with self._stats_lock:
+            ms_per_token = self.generation_stats['ms_per_token']
+        if remaining_ms <= 0:
+            return 0
+        if not ms_per_token:
+            return self.max_new_tokens
+        return min(self.max_new_tokens, int(remaining_ms / ms_per_token))
+
 
-        # Optionally mix with intent based canned replies or override
+    def _respond(self, conversation, user_message, chat_history, deadline=None):
+        # Fold the new chat history messages into this session's context
+        self._update_context(conversation, chat_history)
 
-        # Your existing fallback intent classification for specific queries
         intent = self._classify_intent(user_message)
+
+        # Recognised intents are answered by their handlers (cached where the
+        # reply is deterministic); only open-ended messages reach the models
         if intent != 'general_response':
-            intent_response = self._generate_response(intent, user_message)
-            # You can choose to combine or prioritize either response here
-            # For example:
-            return intent_response
+            return self._intent_response(intent, user_message)
+
+        # Ground open-ended messages in the knowledge base before free generation
+        grounded = self._grounded_answer(user_message)
+        if grounded:
+            return grounded
+
+        # Answer from the rule-based handler until the models are up
+        if not self.models_ready.is_set():
+            self.start_model_loading()
+            return self._generate_response(intent, user_message)
+
+        max_new_tokens = self._token_budget(deadline)
+        if max_new_tokens <= 0:
+            self._record_generation(0, 0.0, 'deadline', deadline)
+            return self._generate_response(intent, user_message)
 
+        # Use DialoGPT-small to generate response
+        start = time.monotonic()
+        bot_input_ids = self._build_prompt(conversation, user_message)
+        new_tokens, reason, cache = self._generate(conversation, bot_input_ids, max_new_tokens, deadline)
+        self._record_generation(len(new_tokens), (time.monotonic() - start) * 1000, reason, deadline)
+
+        # A reply cut off mid-sentence reads worse than the intent answer
+        if reason == 'deadline':
+            history_length = conversation.history_ids.shape[-1] if conversation.history_ids is not None else 0
+            self._store_kv_cache(conversation, cache, history_length)
+            return self._generate_response(intent, user_message)
+
+        bot_response = self.dialogpt_tokenizer.decode(new_tokens, skip_special_tokens=True)
+        self._finish_turn(conversation, bot_input_ids, new_tokens, reason, cache)
         return bot_response
 
 
+    def _finish_turn(self, conversation, bot_input_ids, new_tokens, reason, cache=None):
+        """Append the reply to the session history, closing the turn with EOS"""
+        import torch
+
+        eos_token_id = self.dialogpt_tokenizer.eos_token_id
+        if reason != 'eos':
+            new_tokens = list(new_tokens) + [eos_token_id]
+        output_ids = torch.cat([bot_input_ids, torch.tensor([new_tokens], dtype=torch.long)], dim=-1)
+
+        # Keep only a bounded window of past turns for the next generation.
+        # Cached sessions slide down to half the window: GPT-2 positions are
+        # absolute, so a slide invalidates the cache and the next turn
+        # re-encodes the window; the slack keeps that to every few turns
+        target_tokens = self.conversations.max_history_tokens // 2 if self._uses_kv_cache(conversation) else None
+        conversation.history_ids = self.conversations.trim_history(output_ids, eos_token_id, target_tokens)
+        conversation.turns += 1
+
+        if conversation.history_ids.shape[-1] == output_ids.shape[-1]:
+            self._store_kv_cache(conversation, cache, output_ids.shape[-1])
+
+
+    def _uses_kv_cache(self, conversation):
+        return self.kv_caches is not None and not conversation.ephemeral
+
+
+    def _store_kv_cache(self, conversation, cache, history_length):
+        """Keep a session's cache, cropped to the history tokens it covers"""
+        if cache is None or not self._uses_kv_cache(conversation) or history_length == 0:
+            return
+        # Legacy tuple caches (transformers < 4.38) cannot be cropped; skip reuse for them
+        if not (hasattr(cache, 'get_seq_length') and hasattr(cache, 'crop')):
+            return
+        extra = cache.get_seq_length() - history_length
+        if extra > 0:
+            cache.crop(-extra)
+        self.kv_caches.set(conversation.session_id, (conversation, cache))
+
+
+    def _take_kv_cache(self, conversation):
+        """Remove and return the session's cache (a failed run must not leave it half-updated)"""
+        entry = self.kv_caches.pop(conversation.session_id)
+        # The session may have expired and been recreated since the cache was stored
+        if entry is None or entry[0] is not conversation:
+            return None
+        return entry[1]
+
+
+    def _latency_status(self):
+        with self._stats_lock:
+            return {
+                **self.generation_stats,
+                'budget_ms': self.latency_budget_ms,
+                'generation_ms': latency_percentiles(list(self._generation_latencies))
+            }
+
+
+    def _record_generation(self, tokens, elapsed_ms, reason, deadline):
+        with self._stats_lock:
+            stats = self.generation_stats
+            stats['generations'] += 1
+            if reason == 'deadline':
+                stats['deadline_fallbacks'] += 1
+            elif reason == 'sentence_end':
+                stats['sentence_stops'] += 1
+            if tokens:
+                # Smoothed cost per token (prefill included) sizes the next token budget
+                ms_per_token = elapsed_ms / tokens
+                previous = stats['ms_per_token']
+                stats['ms_per_token'] = ms_per_token if previous is None else 0.8 * previous + 0.2 * ms_per_token
+                self._generation_latencies.append(elapsed_ms)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            slack = f"{(deadline - time.monotonic()) * 1000:.0f}ms" if deadline is not None else 'unbounded'
+            logger.debug("Chat generation: %s tokens in %.0fms, stop=%s, slack=%s", tokens, elapsed_ms, reason, slack)
+
+
+    def stream_response(self, user_message, chat_history=None, session_id=None, latency_budget_ms=None):
+        """Yield response events as they are produced
+
+        Intent answers (and answers while the models are loading) arrive as a
+        single ``message`` event; generated replies as a series of ``token``
+        events.
+        """
+        if chat_history is None:
+            chat_history = []
+
+        self._track_message(user_message)
+        structured = self.structured_queries.answer(user_message)
+        if structured:
+            yield {'type': 'message', 'text': structured}
+            return
+
+        if self.model_server is not None:
+            events = self.model_server.stream(
+                'stream', user_message=user_message, chat_history=chat_history,
+                session_id=session_id, latency_budget_ms=latency_budget_ms
+            )
+            try:
+                first = next(events, None)
+            except ModelServerError as e:
+                self._note_remote_fallback(e)
+            else:
+                if first is not None:
+                    yield first
+                yield from events
+                return
+
+        deadline = self._deadline(latency_budget_ms)
+        conversation = self.conversations.get(session_id)
+        with conversation.lock:
+            self._update_context(conversation, chat_history)
+
+            intent = self._classify_intent(user_message)
+            if intent != 'general_response':
+                yield {'type': 'message', 'text': self._intent_response(intent, user_message)}
+                return
+
+            grounded = self._grounded_answer(user_message)
+            if grounded:
+                yield {'type': 'message', 'text': grounded}
+                return
+
+            if not self.models_ready.is_set():
+                self.start_model_loading()
+                yield {'type': 'message', 'text': self._generate_response(intent, user_message)}
+                return
+
+            max_new_tokens = self._token_budget(deadline)
+            if max_new_tokens <= 0:
+                self._record_generation(0, 0.0, 'deadline', deadline)
+                yield {'type': 'message', 'text': self._generate_response(intent, user_message)}
+                return
+
+            yield from self._stream_generation(conversation, user_message, max_new_tokens, deadline)
+
+
+    def _track_message(self, message):
+        """Feed the intent and mentioned places, hotels and facilities into the trend sketches"""
+        entities = {('intent', self._classify_intent(message))}
+        entities.update(match.label for match in self.entity_matcher.find_all(message))
+        for kind, value in CONTEXT_MATCHER.labels(message) | QUERY_MATCHER.labels(message):
+            if kind in ('facility', 'interest'):
+                entities.add((kind, TREND_FACILITY_ALIASES.get(value, value)))
+        for category, item in entities:
+            self.chat_trends.record(category, item)
+
+
+    def get_chat_trends(self, category=None, limit=10, window_buckets=1, order='score'):
+        """Trending chat topics per category (intent, place, hotel, facility, interest)"""
+        categories = [category] if category else sorted(self.chat_trends.totals)
+        return {
+            'trends': {
+                name: self.chat_trends.trends(name, limit=limit, window_buckets=window_buckets, order=order)
+                for name in categories
+            },
+            'stats': self.chat_trends.stats()
+        }
+
+
+    def _note_remote_fallback(self, error):
+        self.remote_fallbacks += 1
+        logger.warning("Model server unavailable, answering locally: %s", error)
+
+
+    def _stream_generation(self, conversation, user_message, max_new_tokens, deadline):
+        from transformers import TextIteratorStreamer
+
+        start = time.monotonic()
+        bot_input_ids = self._build_prompt(conversation, user_message)
+        past_key_values = self._take_kv_cache(conversation) if self._uses_kv_cache(conversation) else None
+        streamer = TextIteratorStreamer(
+            self.dialogpt_tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=30
+        )
+        result = {}
+
+        def run():
+            try:
+                result['tokens'], result['reason'], result['cache'] = self._model_generate(
+                    bot_input_ids, max_new_tokens, deadline, past_key_values=past_key_values, streamer=streamer
+                )
+            except Exception as e:
+                result['error'] = e
+                streamer.end()
+
+        # A streamer needs batch size 1, so streaming bypasses the batch scheduler
+        worker = threading.Thread(target=run, name='chat-stream', daemon=True)
+        worker.start()
+        for text in streamer:
+            if text:
+                yield {'type': 'token', 'text': text}
+        worker.join()
+
+        if 'error' in result:
+            raise result['error']
+
+        # Tokens already sent cannot be withdrawn, so a deadline just ends the stream
+        new_tokens, reason = result['tokens'], result['reason']
+        self._record_generation(len(new_tokens), (time.monotonic() - start) * 1000, reason, deadline)
+        self._finish_turn(conversation, bot_input_ids, new_tokens, reason, result['cache'])
+
+
+    def _build_prompt(self, conversation, user_message):
+        """DialoGPT input ids: the session's history window plus the new message"""
+        import torch
+
+        new_input_ids = self.dialogpt_tokenizer.encode(user_message + self.dialogpt_tokenizer.eos_token, return_tensors='pt')
+        if conversation.history_ids is not None:
+            return torch.cat([conversation.history_ids, new_input_ids], dim=-1)
+        return new_input_ids
+
+
+    def _stopping_criteria(self, bot_input_ids, max_new_tokens, deadline):
+        from models.stopping import RowStoppingCriteria
+
+        return RowStoppingCriteria(
+            bot_input_ids.shape[-1], self.dialogpt_tokenizer.eos_token_id,
+            max_new_tokens=[max_new_tokens], deadlines=[deadline], sentence_end_ids=self.sentence_end_ids
+        )
+
+
+    def _generate(self, conversation, bot_input_ids, max_new_tokens, deadline=None):
+        """Run DialoGPT on a (1, n) prompt; returns (new token ids, stop reason, kv cache)
+
+        With kv_cache_sessions > 0, sessions run one at a time and only over
+        their uncached tail (the new message); otherwise, and for anonymous
+        requests, every turn goes through the batch scheduler.
+        """
+        if self._uses_kv_cache(conversation):
+            return self._model_generate(
+                bot_input_ids, max_new_tokens, deadline, past_key_values=self._take_kv_cache(conversation)
+            )
+
+        if self.generation_scheduler is not None:
+            new_tokens, reason = self.generation_scheduler.generate(
+                bot_input_ids[0].tolist(), max_new_tokens=max_new_tokens, deadline=deadline
+            )
+            return new_tokens, reason, None
+
+        new_tokens, reason, _ = self._model_generate(bot_input_ids, max_new_tokens, deadline)
+        return new_tokens, reason, None
+
+
+    def _model_generate(self, bot_input_ids, max_new_tokens, deadline, past_key_values=None, streamer=None):
+        """One generate call; tokens already in past_key_values are not recomputed"""
+        import torch
+        from transformers import StoppingCriteriaList
+
+        criteria = self._stopping_criteria(bot_input_ids, max_new_tokens, deadline)
+        with torch.inference_mode():
+            outputs = self.dialogpt_model.generate(
+                bot_input_ids, attention_mask=torch.ones_like(bot_input_ids),
+                max_new_tokens=max_new_tokens,
+                pad_token_id=self.dialogpt_tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([criteria]),
+                past_key_values=past_key_values, streamer=streamer,
+                return_dict_in_generate=True
+            )
+        new_tokens = criteria.trim(0, outputs.sequences[0, bot_input_ids.shape[-1]:].tolist())
+        return new_tokens, criteria.reason(0), outputs.past_key_values
+
+
     def _classify_intent(self, message):
-        message_lower = message.lower()
-        if any(word in message_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            return 'greeting'
-        elif any(word in message_lower for word in ['bye', 'goodbye', 'see you', 'thanks']):
-            return 'farewell'
-        elif any(word in message_lower for word in ['hotel', 'stay', 'accommodation', 'room', 'guesthouse']):
-            return 'hotel_inquiry'
-        elif any(word in message_lower for word in ['place', 'visit', 'see', 'attraction', 'destination']):
-            return 'place_recommendation'
-        elif any(word in message_lower for word in ['cost', 'price', 'budget', 'expensive', 'cheap']):
-            return 'budget_inquiry'
-        elif any(word in message_lower for word in ['wifi', 'internet', 'restaurant', 'food', 'transport']):
-            return 'facility_inquiry'
-        elif any(word in message_lower for word in ['weather', 'season', 'cold', 'warm', 'snow']):
-            return 'weather_inquiry'
-        elif any(word in message_lower for word in ['what', 'when', 'where', 'how', 'why']):
-            return 'general_inquiry'
-        else:
-            return 'general_response'
+        return resolve_intent(INTENT_MATCHER.find_all(message))
+
+
+    def _intent_response(self, intent, message):
+        """Intent handler reply, served from the response cache when deterministic"""
+        if self.response_cache is None or intent not in CACHEABLE_INTENTS:
+            return self._generate_response(intent, message)
+
+        key = (intent, ' '.join(re.findall(r'\w+', message.lower())))
+        if intent == 'weather_inquiry':
+            key += (datetime.now().month,)
+        response = self.response_cache.get(key)
+        if response is None:
+            # Computed outside the cache lock; general inquiries may hit the embedder
+            response = self._generate_response(intent, message)
+            self.response_cache.set(key, response)
+        return response
 
 
     def _generate_response(self, intent, message):
@@ -534,20 +1121,15 @@ class TourismChatbot:
 
 
     def _handle_hotel_inquiry(self, message):
-        # Your hotel inquiry logic from before
+        answer = self.structured_queries.answer(message, default_form='list')
+        if answer:
+            return answer
         return "Here are some hotels matching your criteria..."
 
 
     def _handle_place_recommendation(self, message):
-        popular_places = [
-            "Deosai Plains - The world's second highest plateau",
-            "Shangrila Resort - Stunning lake resort",
-            "Kachura Lake - Crystal clear lake",
-            "Manthoka Waterfall - Majestic waterfall",
-            "Kharpocho Fort - Historical fort overlooking Skardu"
-        ]
         response = "Here are some must-visit places in Skardu:\n\n"
-        for i, place in enumerate(popular_places, 1):
+        for i, place in enumerate(self.place_blurbs, 1):
             response += f"{i}. {place}\n"
         response += "\nWhat type of attractions interest you most? (Lakes, Mountains, History, etc.)"
         return response
@@ -570,15 +1152,12 @@ class TourismChatbot:
 
 
     def _handle_general_inquiry(self, message):
-        general_facts = {
-            'culture': "Skardu has rich Balti culture with Tibetan influences and warm hospitality.",
-            'safety': "Skardu is generally safe but always take precautions in remote areas.",
-            'food': "Local specialties include Chapshuro, Balti soups, and dried fruits.",
-            'how to reach': "You can reach Skardu by flights from Islamabad or by road via the Karakoram Highway."
-        }
-        for key, answer in general_facts.items():
-            if key in message:
+        for key, answer in self.general_facts.items():
+            if key in message.lower():
                 return answer
+        grounded = self._grounded_answer(message)
+        if grounded:
+            return grounded
         return "That's an interesting question about Skardu. Could you please specify further?"
 
 
@@ -591,21 +1170,50 @@ class TourismChatbot:
         return random.choice(responses)
 
 
-    def _update_context(self, chat_history):
-        recent_messages = chat_history[-5:]
-        for msg in recent_messages:
-            if msg.get('type') == 'user':
-                message = msg.get('content', '').lower()
-                if 'budget' in message or 'cheap' in message or 'expensive' in message:
-                    if 'cheap' in message or 'low' in message:
-                        self.context['budget'] = 'low'
-                    elif 'expensive' in message or 'luxury' in message:
-                        self.context['budget'] = 'high'
-                    else:
-                        self.context['budget'] = 'medium'
-                interests = ['lake', 'mountain', 'historical', 'trekking', 'culture']
-                for interest in interests:
-                    if interest in message:
-                        self.context.setdefault('interests', [])
-                        if interest not in self.context['interests']:
-                            self.context['interests'].append(interest)
+    def _get_hotel_facilities(self, hotel):
+        facilities = []
+        hotel_facilities = hotel.get('facilities', {})
+        if hotel_facilities.get('wifiInternet'):
+            facilities.append('WiFi')
+        if hotel_facilities.get('restaurantDining'):
+            facilities.append('Restaurant')
+        if hotel_facilities.get('guideServices'):
+            facilities.append('Guide')
+        if hotel_facilities.get('transportArrangement'):
+            facilities.append('Transport')
+        if hotel.get('hasOwnTransport'):
+            facilities.append('Own Transport')
+        return facilities
+
+
+    def _update_context(self, conversation, chat_history):
+        # Clients resend a sliding window of history; only messages after the
+        # last one already seen for this session are processed
+        new_messages = chat_history
+        if conversation.last_message is not None:
+            for i in range(len(chat_history) - 1, -1, -1):
+                msg = chat_history[i]
+                if (msg.get('type'), msg.get('content')) == conversation.last_message:
+                    new_messages = chat_history[i + 1:]
+                    break
+        if chat_history:
+            conversation.last_message = (chat_history[-1].get('type'), chat_history[-1].get('content'))
+
+        context = conversation.context
+        for msg in new_messages:
+            if msg.get('type') != 'user':
+                continue
+            budgets = set()
+            for match in CONTEXT_MATCHER.find_all(msg.get('content', '')):
+                kind, value = match.label
+                if kind == 'budget':
+                    budgets.add(value)
+                else:
+                    values = context.setdefault('facilities' if kind == 'facility' else 'interests', [])
+                    if value not in values:
+                        values.append(value)
+            # An explicit level beats a bare mention of "budget"
+            for level in ('low', 'high', 'medium'):
+                if level in budgets:
+                    context['budget'] = level
+                    break
@@ -0,0 +1,71 @@
+import threading
+import uuid
+
+from utils.cache import LRUCache
+
+
+class Conversation:
+    """Dialog state for a single chat session"""
+
+    def __init__(self, session_id, ephemeral=False):
+        self.session_id = session_id
+        # Throwaway conversations for callers without a session id
+        self.ephemeral = ephemeral
+        self.context = {}
+        # DialoGPT token ids of the previous turns, shape (1, n) or None
+        self.history_ids = None
+        # Last client chat_history message already folded into context
+        self.last_message = None
+        self.turns = 0
+        self.lock = threading.Lock()
+
+
+class ConversationStore:
+    """Per-session conversations with LRU eviction, TTL and a token window"""
+
+    def __init__(self, max_sessions=1000, ttl_seconds=1800, max_history_tokens=256):
+        self.max_history_tokens = max_history_tokens
+        self._conversations = LRUCache(max_size=max_sessions, ttl_seconds=ttl_seconds)
+
+    def get(self, session_id=None):
+        """Return the conversation for session_id, creating it if needed
+
+        Without a session id a throwaway conversation is returned so that
+        anonymous callers never share state.
+        """
+        if not session_id:
+            return Conversation(uuid.uuid4().hex, ephemeral=True)
+        return self._conversations.get_or_create(session_id, lambda: Conversation(session_id))
+
+    def drop(self, session_id):
+        self._conversations.pop(session_id)
+
+    def trim_history(self, history_ids, eos_token_id, target_tokens=None):
+        """Slide the token window, dropping whole turns from the front
+
+        The window is only cut once it exceeds ``max_history_tokens``; it is
+        then cut down to ``target_tokens`` (default: the same limit), so a
+        lower target makes slides, and cache rebuilds, less frequent.
+        """
+        length = history_ids.shape[-1]
+        if length <= self.max_history_tokens:
+            return history_ids
+
+        target_tokens = min(target_tokens or self.max_history_tokens, self.max_history_tokens)
+        overflow = length - target_tokens
+        eos_positions = (history_ids[0] == eos_token_id).nonzero().flatten().tolist()
+        # Cut just after the first turn boundary that removes enough tokens
+        for position in eos_positions:
+            if position + 1 >= overflow:
+                if position + 1 < length:
+                    return history_ids[:, position + 1:]
+                break
+
+        return history_ids[:, -target_tokens:]
+
+    def stats(self):
+        self._conversations.purge_expired()
+        return {
+            **self._conversations.stats(),
+            'max_history_tokens': self.max_history_tokens
+        }
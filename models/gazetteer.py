@@ -0,0 +1,183 @@
+import difflib
+import re
+import threading
+
+# Canonical places around Skardu: (key, display name, aliases). Aliases are
+# compared after normalize_place, so case, punctuation and camelCase differ freely.
+CANONICAL_PLACES = [
+    ('deosai_plains', 'Deosai Plains', ['deosai', 'deosai plain']),
+    ('kachura_lake', 'Kachura Lake', ['kachura', 'kachura shangrila']),
+    ('upper_kachura_lake', 'Upper Kachura Lake', ['upper kachura']),
+    ('shangrila_lake', 'Shangrila Lake', ['shangrila', 'shangrilla', 'shangralla', 'lower kachura lake']),
+    ('manthoka_waterfall', 'Manthoka Waterfall', ['manthoka', 'monthoka', 'muntokha', 'munthoka waterfall',
+                                                  'manthokha waterfall']),
+    ('kharpocho_fort', 'Kharpocho Fort', ['kharpocho', 'skardu fort']),
+    ('basho_valley', 'Basho Valley', ['basho', 'bashu valley', 'bssho']),
+    ('shigar_valley', 'Shigar Valley', ['shigar']),
+    ('shigar_fort', 'Shigar Fort', []),
+    ('khaplu_valley', 'Khaplu Valley', ['khaplu', 'khapulu']),
+    ('katpana_desert', 'Katpana Desert', ['katpana', 'katpana cold desert', 'cold desert']),
+    ('sarfaranga_desert', 'Sarfaranga Cold Desert', ['sarfaranga', 'sarfaranga desert']),
+    ('italian_k2_museum', 'Italian K2 Museum', ['k2 museum']),
+    ('k2', 'K2', ['k 2', 'k2 shigar', 'k 2 shigar']),
+    ('belamik_valley', 'Belamik Valley', ['belamik']),
+    ('satpara_lake', 'Satpara Lake', ['satpara']),
+    ('khamush_waterfall', 'Khamush Waterfall', ['khamosh waterfall']),
+    ('manthal_rock', 'Manthal Buddha Rock', ['manthal rock', 'manthal', 'buddha rock', 'budaha rock']),
+    ('qatal_gah', 'Qatal Gah', ['qatalgah']),
+    ('hoto_village', 'Hoto Village', ['hoto', 'upper hoto', 'hoto village scenic']),
+    ('skardu_bazaar', 'Skardu Bazaar', ['skardu bazar', 'skardu city bazar', 'skardu city bazaar']),
+    ('skardu_city', 'Skardu City', ['skardu city centre', 'skardu city center']),
+    ('soq_valley', 'Soq Valley', []),
+    ('blind_lake', 'Blind Lake', []),
+    ('organic_valley', 'Organic Valley', [])
+]
+
+# Placeholders that mean "no place" rather than naming one
+NULL_PLACES = {'', 'null', 'none', 'n a', 'na', 'true', 'false'}
+
+# Districts hotels are grouped by, most specific first so "Shangrila Road,
+# Kachura, Skardu" is a Kachura hotel. Aliases are whole words or word pairs
+# of the normalize_place'd address, including the survey's common misspellings.
+DISTRICTS = [
+    ('kachura', ['kachura', 'kachora', 'shangrila', 'shangrilla', 'shangrillah', 'shangrallah', 'shagrilla',
+                 'shagrillah']),
+    ('hoto', ['hoto']),
+    ('soq', ['soq', 'soq valley']),
+    ('shigar', ['shigar']),
+    ('khaplu', ['khaplu', 'khapulu']),
+    ('skardu', ['skardu', 'skd'])
+]
+
+# District of an address that names none of DISTRICTS
+OTHER_DISTRICT = 'other'
+
+_CAMEL_RE = re.compile(r'([a-z])([A-Z])')
+_PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+_QUALIFIER_RE = re.compile(r'\b(proximity to|proximity|view ?point|scenic view|for shopping)\b')
+
+
+def normalize_place(text):
+    """'manthokaWaterfall' / 'Manthoka  Waterfall!' -> 'manthoka waterfall'"""
+    text = _CAMEL_RE.sub(r'\1 \2', str(text)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def district_of(address):
+    """DISTRICTS key of a free-text address, or OTHER_DISTRICT"""
+    words = normalize_place(address or '').split()
+    terms = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    for district, aliases in DISTRICTS:
+        if terms.intersection(aliases):
+            return district
+    return OTHER_DISTRICT
+
+
+def _strip_qualifiers(text):
+    """Drop parentheticals and words like "proximity" / "viewpoint" around a place name"""
+    text = _PARENTHETICAL_RE.sub(' ', str(text))
+    return ' '.join(_QUALIFIER_RE.sub(' ', normalize_place(text)).split())
+
+
+class Gazetteer:
+    """Canonical places with integer ids and alias / fuzzy resolution
+
+    Free-text place names from survey records ("bssho", "manthokaWaterfall",
+    "Skardu Fort (Kharpocho)") resolve to one id per real place: an exact
+    alias match first, then the name without parentheticals and qualifiers,
+    then a close difflib match against the aliases. A name that resolves to
+    nothing becomes a new place of its own, so no record loses a place.
+    Resolutions are cached, so each distinct spelling is matched once.
+    """
+
+    def __init__(self, places=CANONICAL_PLACES, cutoff=0.85):
+        self.cutoff = cutoff
+        self.places = []
+        self.aliases = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+        for key, name, aliases in places:
+            self._add_place(key, name, aliases)
+
+    def __len__(self):
+        return len(self.places)
+
+    def _add_place(self, key, name, aliases=()):
+        place_id = len(self.places)
+        self.places.append({'id': place_id, 'key': key, 'name': name})
+        for alias in [key, name, *aliases]:
+            self.aliases.setdefault(normalize_place(alias), place_id)
+        return place_id
+
+    def _match(self, text):
+        normalized = normalize_place(text)
+        if normalized in NULL_PLACES:
+            return None, normalized
+        if normalized in self.aliases:
+            return self.aliases[normalized], normalized
+        stripped = _strip_qualifiers(text) or normalized
+        if stripped in self.aliases:
+            return self.aliases[stripped], stripped
+        close = difflib.get_close_matches(stripped, list(self.aliases), n=1, cutoff=self.cutoff)
+        if close:
+            return self.aliases[close[0]], stripped
+        return -1, stripped
+
+    def resolve(self, text):
+        """Place id for a free-text name, or None for placeholders like 'null'"""
+        if not isinstance(text, str):
+            return None
+        if text in self._resolved:
+            return self._resolved[text]
+        with self._lock:
+            if text in self._resolved:
+                return self._resolved[text]
+            place_id, normalized = self._match(text)
+            if place_id == -1:
+                place_id = self._add_place(normalized.replace(' ', '_'), normalized.title())
+            elif place_id is not None:
+                # Remember the spelling so keyword matchers recognise it too
+                self.aliases.setdefault(normalized, place_id)
+            self._resolved[text] = place_id
+            return place_id
+
+    def resolve_all(self, values):
+        """Distinct place ids of a list of names, in order of first mention"""
+        ids = []
+        for value in values or []:
+            place_id = self.resolve(value)
+            if place_id is not None and place_id not in ids:
+                ids.append(place_id)
+        return ids
+
+    def annotate(self, hotels):
+        """Store each hotel's resolved places as ``placeIds``"""
+        for hotel in hotels:
+            hotel['placeIds'] = self.resolve_all(hotel.get('mostPopularPlaces'))
+        return hotels
+
+    def name(self, place_id):
+        return self.places[place_id]['name']
+
+    def key(self, place_id):
+        return self.places[place_id]['key']
+
+    def alias_groups(self):
+        """{place_id: [normalized aliases]} for keyword matchers"""
+        groups = {}
+        for alias, place_id in list(self.aliases.items()):
+            groups.setdefault(place_id, []).append(alias)
+        return groups
+
+
+# Shared by the data loader, analytics, recommendations and chat so place
+# ids mean the same thing in every engine
+GAZETTEER = Gazetteer()
+
+
+def place_ids(hotel):
+    """A hotel's place ids, resolving on the fly for records loaded without them"""
+    ids = hotel.get('placeIds')
+    if ids is None:
+        ids = GAZETTEER.resolve_all(hotel.get('mostPopularPlaces'))
+    return ids
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+
+import torch
+from transformers import StoppingCriteriaList
+
+from models.stopping import RowStoppingCriteria
+
+
+class _PendingGeneration:
+    """A single caller waiting for its share of a batched generate call"""
+
+    def __init__(self, input_ids, max_new_tokens, deadline):
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.output_ids = None
+        self.stop_reason = None
+        self.error = None
+
+
+class GenerationScheduler:
+    """Coalesces concurrent DialoGPT generate calls into left-padded batches
+
+    Callers block in ``generate`` while a single worker thread collects
+    requests for up to ``max_wait_ms`` (or until ``max_batch_size`` are
+    queued), runs one batched ``model.generate`` and hands each caller its
+    own continuation. Every row keeps its own token limit and deadline.
+    """
+
+    def __init__(self, model, pad_token_id, eos_token_id, max_batch_size=8, max_wait_ms=5,
+                 max_new_tokens=128, sentence_end_ids=None):
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.eos_token_id = eos_token_id
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_new_tokens = max_new_tokens
+        self.sentence_end_ids = sentence_end_ids
+
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0}
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='generation-scheduler', daemon=True)
+        self._worker.start()
+
+    def generate(self, input_ids, timeout=None, max_new_tokens=None, deadline=None):
+        """Generate a continuation for one sequence
+
+        Returns ``(new_token_ids, stop_reason)``; ``deadline`` is a
+        ``time.monotonic()`` timestamp.
+        """
+        pending = _PendingGeneration(list(input_ids), max_new_tokens or self.max_new_tokens, deadline)
+        self._queue.put(pending)
+
+        if not pending.done.wait(timeout):
+            raise TimeoutError('Timed out waiting for batched generation')
+        if pending.error is not None:
+            raise pending.error
+        return pending.output_ids, pending.stop_reason
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._generate_batch(batch)
+
+    def _generate_batch(self, batch):
+        try:
+            # Left-pad so every prompt ends at the same position
+            width = max(len(pending.input_ids) for pending in batch)
+            input_ids = torch.full((len(batch), width), self.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, pending in enumerate(batch):
+                length = len(pending.input_ids)
+                input_ids[row, width - length:] = torch.tensor(pending.input_ids, dtype=torch.long)
+                attention_mask[row, width - length:] = 1
+
+            criteria = RowStoppingCriteria(
+                width, self.eos_token_id,
+                max_new_tokens=[pending.max_new_tokens for pending in batch],
+                deadlines=[pending.deadline for pending in batch],
+                sentence_end_ids=self.sentence_end_ids,
+                on_stop=lambda row, tokens, reason: self._deliver(batch[row], tokens, reason)
+            )
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    input_ids,
+                    attention_mask=attention_mask,
+                    max_new_tokens=max(criteria.max_new_tokens),
+                    pad_token_id=self.pad_token_id,
+                    stopping_criteria=StoppingCriteriaList([criteria])
+                )
+
+            for row, (pending, tokens) in enumerate(zip(batch, outputs[:, width:].tolist())):
+                # Finished rows are padded until the longest row stops
+                if not pending.done.is_set():
+                    self._deliver(pending, criteria.trim(row, tokens), criteria.reason(row))
+
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+        except Exception as e:
+            for pending in batch:
+                if not pending.done.is_set():
+                    pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    def _deliver(self, pending, tokens, reason):
+        """Hand a finished row back to its caller without waiting for the batch"""
+        pending.output_ids = tokens
+        pending.stop_reason = reason
+        pending.done.set()
+
+    def get_stats(self):
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'mean_batch_size': round(self.stats['requests'] / batches, 2) if batches else None,
+            'queued': self._queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
@@ -0,0 +1,58 @@
+import torch
+from torch import nn
+
+
+INFERENCE_MODES = ('fp32', 'int8')
+
+
+def configure_torch_threads(num_threads=None):
+    """Pin torch intra-op threads for this worker process (None/0 keeps the default)"""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    return torch.get_num_threads()
+
+
+def _conv1d_to_linear(module):
+    """Swap GPT-2 style Conv1D layers for equivalent nn.Linear layers in place
+
+    Dynamic quantization only rewrites nn.Linear, and DialoGPT (GPT-2) builds
+    its attention and MLP projections from transformers' Conv1D, which stores
+    the weight transposed.
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data.clone()
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+    return module
+
+
+def prepare_model(model, mode='fp32'):
+    """Put a causal LM into eval mode, optionally with int8 dynamic quantization"""
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode '{mode}'. Available: {', '.join(INFERENCE_MODES)}")
+
+    model.eval()
+    if mode == 'int8':
+        _conv1d_to_linear(model)
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _tensor_bytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+def model_size_bytes(model):
+    """In-memory size of a model's weights, including packed int8 parameters"""
+    return sum(_tensor_bytes(value) for value in model.state_dict().values())
@@ -0,0 +1,121 @@
+import re
+from collections import namedtuple
+
+
+KeywordMatch = namedtuple('KeywordMatch', ['label', 'phrase', 'start', 'end'])
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def _normalize_token(token):
+    """Lowercase and fold simple plurals so 'hotels' matches 'hotel'"""
+    token = token.lower()
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+class KeywordMatcher:
+    """Whole-word multi-keyword matcher compiled into a token trie
+
+    Keywords (single words or phrases) are tokenised the same way as the
+    message, so matches always fall on word boundaries ("hi" never matches
+    "this"). A message is scanned once; the work per token is bounded by the
+    longest phrase, so matching stays linear in message length no matter how
+    many keywords are registered.
+    """
+
+    def __init__(self, keyword_groups):
+        self._root = {}
+        self.max_phrase_tokens = 0
+        for label, phrases in keyword_groups.items():
+            for phrase in phrases:
+                self.add(label, phrase)
+
+    def add(self, label, phrase):
+        tokens = [_normalize_token(t) for t in _TOKEN_RE.findall(phrase)]
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(None, []).append((label, phrase))
+        self.max_phrase_tokens = max(self.max_phrase_tokens, len(tokens))
+
+    def find_all(self, text):
+        """Every keyword occurrence in text as KeywordMatch(label, phrase, start, end)"""
+        tokens = [(m.start(), m.end(), _normalize_token(m.group())) for m in _TOKEN_RE.finditer(text)]
+        matches = []
+        for i, (start, _, _) in enumerate(tokens):
+            node = self._root
+            for _, end, token in tokens[i:i + self.max_phrase_tokens]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for label, phrase in node.get(None, ()):
+                    matches.append(KeywordMatch(label, phrase, start, end))
+        return matches
+
+    def labels(self, text):
+        """Set of labels with at least one match in text"""
+        return {match.label for match in self.find_all(text)}
+
+
+# Includes common Urdu transliterations used by local travellers
+INTENT_KEYWORDS = {
+    'greeting': ['hello', 'hi', 'hey', 'greetings', 'salam', 'salaam', 'assalam o alaikum',
+                 'assalamualaikum', 'aoa', 'adab'],
+    'farewell': ['bye', 'goodbye', 'see you', 'thanks', 'thank you', 'khuda hafiz', 'allah hafiz',
+                 'shukriya', 'shukria'],
+    'hotel_inquiry': ['hotel', 'stay', 'accommodation', 'room', 'guesthouse', 'guest house', 'lodge',
+                      'kamra', 'kamray', 'rehaish', 'hotal'],
+    'place_recommendation': ['place', 'visit', 'see', 'attraction', 'destination', 'sightseeing',
+                             'jagah', 'jaga', 'ghoomna', 'sair'],
+    'budget_inquiry': ['cost', 'price', 'budget', 'expensive', 'cheap', 'kitna', 'kitne', 'qeemat',
+                       'kiraya', 'sasta', 'mehnga', 'paisay'],
+    'facility_inquiry': ['wifi', 'wi fi', 'internet', 'restaurant', 'food', 'transport', 'khana', 'gari'],
+    'weather_inquiry': ['weather', 'season', 'cold', 'warm', 'snow', 'mausam', 'sardi', 'garmi', 'barf'],
+    'general_inquiry': ['what', 'when', 'where', 'how', 'why', 'kya', 'kab', 'kahan', 'kaise', 'kyun']
+}
+
+# Tie-break order (earlier wins), matching the historical if/elif chain
+INTENT_PRIORITY = list(INTENT_KEYWORDS)
+
+# Small talk and question words are weak evidence next to topical keywords,
+# so "hi, which hotels have wifi?" is a hotel question rather than a greeting
+INTENT_WEIGHTS = {
+    'greeting': 0.5,
+    'farewell': 0.5,
+    'general_inquiry': 0.25
+}
+
+INTENT_MATCHER = KeywordMatcher(INTENT_KEYWORDS)
+
+
+def resolve_intent(matches):
+    """Pick one intent from keyword matches by weighted count, then priority"""
+    scores = {}
+    for match in matches:
+        scores[match.label] = scores.get(match.label, 0) + INTENT_WEIGHTS.get(match.label, 1.0)
+    if not scores:
+        return 'general_response'
+    return max(scores, key=lambda intent: (scores[intent], -INTENT_PRIORITY.index(intent)))
+
+
+CONTEXT_KEYWORDS = {
+    ('budget', 'low'): ['cheap', 'low budget', 'low cost', 'affordable', 'economy', 'sasta'],
+    ('budget', 'high'): ['expensive', 'luxury', 'premium', 'deluxe', 'high end', 'mehnga'],
+    ('budget', 'medium'): ['budget', 'moderate', 'medium', 'standard', 'mid range'],
+    ('facility', 'wifi'): ['wifi', 'wi fi', 'internet'],
+    ('facility', 'restaurant'): ['restaurant', 'dining', 'food', 'khana'],
+    ('facility', 'transport'): ['transport', 'car', 'vehicle', 'jeep', 'gari'],
+    ('facility', 'guide'): ['guide', 'tour guide'],
+    ('facility', 'laundry'): ['laundry'],
+    ('interest', 'lake'): ['lake', 'jheel'],
+    ('interest', 'mountain'): ['mountain', 'peak', 'pahar'],
+    ('interest', 'historical'): ['historical', 'history', 'fort'],
+    ('interest', 'trekking'): ['trekking', 'trek', 'hiking'],
+    ('interest', 'culture'): ['culture', 'cultural']
+}
+
+CONTEXT_MATCHER = KeywordMatcher(CONTEXT_KEYWORDS)
@@ -0,0 +1,269 @@
+"""Local model server shared by every web worker on a host
+
+The server process owns the DialoGPT / sentence-transformer models and the
+chat sessions; web workers talk to it through ``ModelServerClient`` over a
+Unix socket (the default) or a TCP port and fall back to rule-based replies
+when it is busy or unreachable. Requests are pickled, so TCP is only allowed
+with CHAT_MODEL_SERVER_AUTHKEY set; Unix sockets are created owner-only.
+
+    CHAT_MODEL_SERVER=unix:/tmp/skardu-models.sock python -m models.model_server
+"""
+import argparse
+import logging
+import os
+import queue
+import stat
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerError(Exception):
+    """The model server could not answer (unreachable, timed out or failed)"""
+
+
+class ModelServerBusy(ModelServerError):
+    """The model server's request queue is full"""
+
+
+# Used by ``python -m models.model_server`` when CHAT_MODEL_SERVER is not set
+DEFAULT_ADDRESS = 'unix:instance/model-server.sock'
+
+
+def parse_address(value):
+    """'unix:/path.sock' or a bare path -> socket path, 'host:port' -> (host, port)"""
+    if value.startswith('unix:'):
+        return value[len('unix:'):]
+    if value.startswith('/') or value.startswith('.') or ':' not in value:
+        return value
+    host, _, port = value.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+def check_address(address, authkey):
+    """Refuse TCP without an authkey: any peer that can connect could send a pickle"""
+    if isinstance(address, tuple) and not authkey:
+        raise ValueError(
+            f"Model server TCP address {address[0]}:{address[1]} requires CHAT_MODEL_SERVER_AUTHKEY; "
+            "use a unix: socket path for an unauthenticated local server"
+        )
+    return address
+
+
+def _authkey(value):
+    return value.encode('utf-8') if value else None
+
+
+class ModelServerClient:
+    """Pooled connections to a model server with per-call timeouts"""
+
+    def __init__(self, address, authkey=None, timeout=10.0):
+        self.authkey = _authkey(authkey) if isinstance(authkey, str) else authkey
+        self.address = check_address(parse_address(address) if isinstance(address, str) else address, self.authkey)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+
+    def call(self, op, **args):
+        """Send one request and wait up to ``timeout`` seconds for the reply"""
+        conn = self._acquire()
+        try:
+            conn.send({'op': op, 'args': args})
+            reply = self._receive(conn)
+        except BaseException:
+            # The reply may still arrive later, so the connection can't be reused
+            conn.close()
+            raise
+        self._pool.put(conn)
+        return self._unwrap(reply)
+
+    def stream(self, op, **args):
+        """Send one request and yield each event the server streams back"""
+        conn = self._acquire()
+        finished = False
+        try:
+            conn.send({'op': op, 'args': args})
+            while True:
+                reply = self._receive(conn)
+                if 'event' not in reply:
+                    finished = True
+                    self._unwrap(reply)
+                    return
+                yield reply['event']
+        finally:
+            if finished:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise ModelServerError(f"Model server unreachable at {self.address}: {e}") from e
+
+    def _receive(self, conn):
+        try:
+            if not conn.poll(self.timeout):
+                raise ModelServerError(f"Model server did not answer within {self.timeout}s")
+            return conn.recv()
+        except (OSError, EOFError) as e:
+            raise ModelServerError(f"Model server connection lost: {e}") from e
+
+    def _unwrap(self, reply):
+        if reply.get('ok'):
+            return reply.get('result')
+        if reply.get('error') == 'busy':
+            raise ModelServerBusy('Model server is busy')
+        raise ModelServerError(reply.get('error', 'Model server request failed'))
+
+
+class ModelServer:
+    """Serves a TourismChatbot to ModelServerClient connections
+
+    Each connection is handled on its own thread so that concurrent requests
+    reach the chatbot's generation scheduler together and get batched. At most
+    ``max_pending`` requests are in flight; beyond that callers are told the
+    server is busy instead of queueing without bound.
+    """
+
+    def __init__(self, chatbot, address, authkey=None, max_pending=32):
+        self.chatbot = chatbot
+        self.authkey = _authkey(authkey) if isinstance(authkey, str) else authkey
+        self.address = check_address(parse_address(address) if isinstance(address, str) else address, self.authkey)
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'busy': 0, 'errors': 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def serve_forever(self):
+        self._remove_stale_socket()
+        if isinstance(self.address, str) and os.path.dirname(self.address):
+            os.makedirs(os.path.dirname(self.address), exist_ok=True)
+        # Only the server's user may connect to a Unix socket, from the moment it exists
+        umask = os.umask(0o177) if isinstance(self.address, str) else None
+        try:
+            listener = Listener(self.address, authkey=self.authkey)
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        with listener:
+            logger.info("Model server listening on %s", self.address)
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    # Failed handshakes (wrong authkey, dropped clients) must not stop the server
+                    logger.exception("Rejected model server connection")
+                    continue
+                self._count('connections')
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), name='model-server-conn', daemon=True
+                ).start()
+
+    def _remove_stale_socket(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    self._handle(conn, request)
+                except (EOFError, OSError):
+                    return
+
+    def _handle(self, conn, request):
+        if not self._slots.acquire(blocking=False):
+            self._count('busy')
+            conn.send({'ok': False, 'error': 'busy'})
+            return
+
+        self._count('requests')
+        try:
+            op = request.get('op')
+            args = request.get('args', {})
+            if op == 'respond':
+                conn.send({'ok': True, 'result': self.chatbot.get_response(**args)})
+            elif op == 'stream':
+                for event in self.chatbot.stream_response(**args):
+                    conn.send({'event': event})
+                conn.send({'ok': True})
+            elif op == 'status':
+                conn.send({'ok': True, 'result': self.get_status()})
+            else:
+                conn.send({'ok': False, 'error': f"Unknown operation '{op}'"})
+        except (EOFError, OSError):
+            raise
+        except Exception as e:
+            self._count('errors')
+            logger.exception("Model server request failed")
+            conn.send({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+        finally:
+            self._slots.release()
+
+    def get_status(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'max_pending': self.max_pending,
+            'pid': os.getpid(),
+            'chatbot': self.chatbot.get_status()
+        }
+
+
+def main():
+    from flask import Config
+
+    from models.analytics import AnalyticsEngine
+    from models.chatbot import TourismChatbot
+    from utils.data_loader import DataLoader
+
+    config = Config(os.getcwd())
+    config.from_pyfile('config.py')
+
+    parser = argparse.ArgumentParser(description='Serve the chatbot models to local web workers')
+    parser.add_argument('--address', default=config['CHAT_MODEL_SERVER'] or DEFAULT_ADDRESS,
+                        help='unix:/path.sock or host:port (needs an authkey); defaults to CHAT_MODEL_SERVER, '
+                             f'else {DEFAULT_ADDRESS}')
+    parser.add_argument('--max-pending', type=int, default=config['CHAT_MODEL_SERVER_MAX_PENDING'],
+                        help='In-flight requests before callers are told the server is busy')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        check_address(parse_address(args.address), config['CHAT_MODEL_SERVER_AUTHKEY'])
+    except ValueError as e:
+        parser.error(str(e))
+
+    hotels_data = DataLoader().load_data()
+    # Load before listening so clients use their fallback until models are ready
+    chatbot = TourismChatbot.from_config(
+        hotels_data, config, model_loading='eager', analytics_engine=AnalyticsEngine(hotels_data)
+    )
+    ModelServer(chatbot, args.address, config['CHAT_MODEL_SERVER_AUTHKEY'], args.max_pending).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""Append-only store of dated occupancy / arrival observations per hotel
+
+Raw observations are appended to one binary partition per month
+(``raw/YYYY-MM.bin``, fixed-size numpy records) and folded into day, week
+and month rollups as they arrive. Each rollup level is split into blocks of
+PARTITION_PERIODS periods (``rollups/<level>/<block>.npz``), and an ingest
+rewrites only the blocks its observations fall in. Overall range queries read
+a single rollup level; per-hotel queries read only the monthly partitions the
+range covers.
+
+    python -m models.occupancy_store observations.csv
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+RECORD_DTYPE = np.dtype([('hotel', '<i4'), ('day', '<i4'), ('occupancy', '<f4'), ('arrivals', '<f4')])
+
+LEVELS = ('day', 'week', 'month')
+
+# Periods per rollup partition file of each level
+PARTITION_PERIODS = {'day': 366, 'week': 104, 'month': 120}
+
+ROLLUP_KEYS = ('occupancy', 'arrivals', 'hotel_days')
+
+# Observation dates accepted around today; anything outside is rejected
+HISTORY_DAYS = 20 * 366
+FUTURE_DAYS = 366
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+               'October', 'November', 'December']
+
+
+def _month_of(days):
+    """Months since 1970-01 for an array of date ordinals"""
+    return (np.asarray(days, dtype=np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]') \
+        .astype('datetime64[M]').astype(np.int64)
+
+
+def period_of(level, days):
+    """Rollup period numbers of an array of date ordinals"""
+    days = np.asarray(days, dtype=np.int64)
+    if level == 'day':
+        return days
+    if level == 'week':
+        # date.fromordinal(1) is a Monday, so weeks run Monday to Sunday
+        return (days - 1) // 7
+    return _month_of(days)
+
+
+def period_label(level, period):
+    if level == 'day':
+        return date.fromordinal(int(period)).isoformat()
+    if level == 'week':
+        return date.fromordinal(int(period) * 7 + 1).isoformat()
+    year, month = divmod(int(period), 12)
+    return f"{1970 + year}-{month + 1:02d}"
+
+
+def choose_level(start_day, end_day):
+    """Coarsest level that still gives a useful number of points for a range"""
+    span = end_day - start_day
+    if span > 2 * 366:
+        return 'month'
+    if span > 120:
+        return 'week'
+    return 'day'
+
+
+class OccupancyStore:
+    """Day/week/month rollups over an append-only observation log"""
+
+    def __init__(self, root_dir, history_days=HISTORY_DAYS, future_days=FUTURE_DAYS):
+        self.root_dir = root_dir
+        self.history_days = history_days
+        self.future_days = future_days
+        self.raw_dir = os.path.join(root_dir, 'raw')
+        self.rollup_dir = os.path.join(root_dir, 'rollups')
+        self.hotels_path = os.path.join(root_dir, 'hotels.json')
+        self.stamp_path = os.path.join(self.rollup_dir, 'stamp')
+        self.lock_path = os.path.join(root_dir, '.lock')
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.hotel_codes = {}
+        self.rollups = {}
+        self._load()
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        """flock on the store directory, shared between worker processes"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        self.hotel_codes = {}
+        if os.path.exists(self.hotels_path):
+            with open(self.hotels_path, 'r', encoding='utf-8') as f:
+                self.hotel_codes = {hotel_id: code for code, hotel_id in enumerate(json.load(f))}
+
+        # {level: {block: {key: array of PARTITION_PERIODS[level] periods}}}
+        self.rollups = {}
+        for level in LEVELS:
+            partitions = self.rollups[level] = {}
+            level_dir = os.path.join(self.rollup_dir, level)
+            if not os.path.isdir(level_dir):
+                continue
+            for name in os.listdir(level_dir):
+                if name.endswith('.npz'):
+                    with np.load(os.path.join(level_dir, name)) as data:
+                        partitions[int(name[:-4])] = {key: data[key] for key in ROLLUP_KEYS}
+        self._loaded_at = self._stamp()
+
+    def _stamp(self):
+        """Token rewritten by every ingest, so other processes can tell their state is stale"""
+        if not os.path.exists(self.stamp_path):
+            return None
+        with open(self.stamp_path, 'rb') as f:
+            return f.read()
+
+    def _reload_if_changed(self):
+        # Another process may have ingested since this one loaded
+        if self._stamp() != self._loaded_at:
+            with self._file_lock(exclusive=False):
+                self._load()
+
+    def date_range(self):
+        """(first, last) date ordinals ingest accepts"""
+        today = date.today().toordinal()
+        return today - self.history_days, today + self.future_days
+
+    def is_empty(self):
+        with self._lock:
+            self._reload_if_changed()
+            return not self.rollups['month']
+
+    def ingest(self, observations):
+        """Append observations ({hotel_id, date, occupancy, arrivals}) and update rollups
+
+        Observations are additive: sending a day twice counts it twice.
+        Returns how many were stored.
+        """
+        first_day, last_day = self.date_range()
+        records = []
+        for observation in observations:
+            if not isinstance(observation, dict):
+                raise ValueError('each observation must be an object')
+            hotel_id = str(observation['hotel_id'])
+            day = date.fromisoformat(str(observation['date'])[:10]).toordinal()
+            if not first_day <= day <= last_day:
+                raise ValueError(f"Date {observation['date']} for {hotel_id} is outside "
+                                 f"{date.fromordinal(first_day)} to {date.fromordinal(last_day)}")
+            occupancy = float(observation.get('occupancy') or 0)
+            arrivals = float(observation.get('arrivals') or 0)
+            if not (math.isfinite(occupancy) and math.isfinite(arrivals)):
+                raise ValueError(f"Non-finite occupancy or arrivals for {hotel_id} on {observation['date']}")
+            if occupancy < 0 or arrivals < 0:
+                raise ValueError(f"Negative occupancy or arrivals for {hotel_id} on {observation['date']}")
+            records.append((hotel_id, day, occupancy, arrivals))
+        if not records:
+            return 0
+
+        # Load, merge and save under the file lock so concurrent workers neither
+        # drop each other's totals nor hand out the same hotel code twice
+        with self._lock, self._file_lock():
+            if self._stamp() != self._loaded_at:
+                self._load()
+            new_ids = [hotel_id for hotel_id, _, _, _ in records if hotel_id not in self.hotel_codes]
+            for hotel_id in dict.fromkeys(new_ids):
+                self.hotel_codes[hotel_id] = len(self.hotel_codes)
+
+            batch = np.array(
+                [(self.hotel_codes[hotel_id], day, occupancy, arrivals) for hotel_id, day, occupancy, arrivals in records],
+                dtype=RECORD_DTYPE
+            )
+            self._append_raw(batch)
+            touched = {level: self._fold(level, batch) for level in LEVELS}
+            self._save(bool(new_ids), touched)
+        return len(records)
+
+    def _append_raw(self, batch):
+        os.makedirs(self.raw_dir, exist_ok=True)
+        months = _month_of(batch['day'])
+        for month in np.unique(months):
+            with open(os.path.join(self.raw_dir, f"{period_label('month', month)}.bin"), 'ab') as f:
+                batch[months == month].tofile(f)
+
+    def _fold(self, level, batch):
+        """Add a batch to a level's partitions; returns the blocks it touched"""
+        size = PARTITION_PERIODS[level]
+        periods = period_of(level, batch['day'])
+        blocks = periods // size
+        partitions = self.rollups[level]
+        touched = [int(block) for block in np.unique(blocks)]
+        for block in touched:
+            rows = blocks == block
+            partition = partitions.get(block)
+            if partition is None:
+                partition = partitions[block] = {
+                    'occupancy': np.zeros(size), 'arrivals': np.zeros(size),
+                    'hotel_days': np.zeros(size, dtype=np.int64)
+                }
+            offsets = periods[rows] - block * size
+            np.add.at(partition['occupancy'], offsets, batch['occupancy'][rows])
+            np.add.at(partition['arrivals'], offsets, batch['arrivals'][rows])
+            np.add.at(partition['hotel_days'], offsets, 1)
+        return touched
+
+    def _save(self, hotels_changed, touched):
+        os.makedirs(self.rollup_dir, exist_ok=True)
+        if hotels_changed:
+            self._write_atomic(self.hotels_path, lambda f: f.write(json.dumps(list(self.hotel_codes)).encode('utf-8')))
+        for level, blocks in touched.items():
+            level_dir = os.path.join(self.rollup_dir, level)
+            os.makedirs(level_dir, exist_ok=True)
+            for block in blocks:
+                self._write_atomic(os.path.join(level_dir, f'{block}.npz'),
+                                   lambda f, partition=self.rollups[level][block]: np.savez(f, **partition))
+        # Stamp last: a new token tells other processes a new ingest is complete
+        stamp = uuid.uuid4().hex.encode('ascii')
+        self._write_atomic(self.stamp_path, lambda f: f.write(stamp))
+        self._loaded_at = stamp
+
+    def _write_atomic(self, path, write):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def series(self, start, end, level='auto', hotel_id=None):
+        """Occupancy per hotel-day and total arrivals per period between two dates
+
+        Without ``hotel_id`` only the chosen rollup level is read; with it,
+        only the raw monthly partitions overlapping the range.
+        """
+        start_day = date.fromisoformat(str(start)[:10]).toordinal()
+        end_day = date.fromisoformat(str(end)[:10]).toordinal()
+        if end_day < start_day:
+            raise ValueError('end must not be before start')
+        if level == 'auto':
+            level = choose_level(start_day, end_day)
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of auto, {', '.join(LEVELS)}")
+
+        first, last = int(period_of(level, [start_day])[0]), int(period_of(level, [end_day])[0])
+        # Nothing is stored outside the accepted dates, so never size the result beyond them
+        window = self.date_range()
+        start_day, end_day = max(start_day, window[0]), min(end_day, window[1])
+        accepted = period_of(level, list(window))
+        first, last = max(first, int(accepted[0])), min(last, int(accepted[1]))
+        if first > last:
+            return {'level': level, 'start': str(start)[:10], 'end': str(end)[:10], 'periods': []}
+        with self._lock:
+            self._reload_if_changed()
+            if hotel_id is None:
+                totals = self._rollup_range(level, first, last)
+            else:
+                totals = self._hotel_range(level, first, last, start_day, end_day, hotel_id)
+
+        periods = []
+        for offset, (occupancy, arrivals, hotel_days) in enumerate(zip(*totals)):
+            if hotel_days:
+                periods.append({
+                    'period': period_label(level, first + offset),
+                    'occupancy': round(float(occupancy) / int(hotel_days), 2),
+                    'arrivals': int(arrivals),
+                    'hotel_days': int(hotel_days)
+                })
+        return {'level': level, 'start': str(start)[:10], 'end': str(end)[:10], 'periods': periods}
+
+    def _rollup_range(self, level, first, last):
+        length = last - first + 1
+        out = [np.zeros(length), np.zeros(length), np.zeros(length, dtype=np.int64)]
+        size = PARTITION_PERIODS[level]
+        for block in range(first // size, last // size + 1):
+            partition = self.rollups[level].get(block)
+            if partition is None:
+                continue
+            start = block * size
+            lo, hi = max(first, start), min(last, start + size - 1)
+            for target, key in zip(out, ROLLUP_KEYS):
+                target[lo - first:hi - first + 1] = partition[key][lo - start:hi - start + 1]
+        return out
+
+    def _hotel_range(self, level, first, last, start_day, end_day, hotel_id):
+        length = last - first + 1
+        out = [np.zeros(length), np.zeros(length), np.zeros(length, dtype=np.int64)]
+        code = self.hotel_codes.get(str(hotel_id))
+        if code is None:
+            return out
+        for month in range(int(_month_of([start_day])[0]), int(_month_of([end_day])[0]) + 1):
+            path = os.path.join(self.raw_dir, f"{period_label('month', month)}.bin")
+            if not os.path.exists(path):
+                continue
+            records = np.fromfile(path, dtype=RECORD_DTYPE)
+            records = records[(records['hotel'] == code) & (records['day'] >= start_day) & (records['day'] <= end_day)]
+            offsets = period_of(level, records['day']) - first
+            np.add.at(out[0], offsets, records['occupancy'])
+            np.add.at(out[1], offsets, records['arrivals'])
+            np.add.at(out[2], offsets, 1)
+        return out
+
+    def monthly_profile(self):
+        """Average occupancy per hotel-day and arrivals per calendar month, over all years"""
+        with self._lock:
+            self._reload_if_changed()
+            partitions = self.rollups['month']
+            if not partitions:
+                return None
+            size = PARTITION_PERIODS['month']
+            occupancy, arrivals, hotel_days = np.zeros(12), np.zeros(12), np.zeros(12)
+            for block, partition in partitions.items():
+                calendar_month = (block * size + np.arange(size)) % 12
+                occupancy += np.bincount(calendar_month, weights=partition['occupancy'], minlength=12)
+                arrivals += np.bincount(calendar_month, weights=partition['arrivals'], minlength=12)
+                hotel_days += np.bincount(calendar_month, weights=partition['hotel_days'], minlength=12)
+        return {
+            MONTH_NAMES[month]: {
+                'occupancy': round(float(occupancy[month] / hotel_days[month]), 2) if hotel_days[month] else None,
+                'arrivals': int(arrivals[month]),
+                'hotel_days': int(hotel_days[month])
+            }
+            for month in range(12)
+        }
+
+    def stats(self):
+        with self._lock:
+            self._reload_if_changed()
+            size = PARTITION_PERIODS['day']
+            observed = [block * size + np.flatnonzero(partition['hotel_days'])
+                        for block, partition in sorted(self.rollups['day'].items())]
+            observed = [days for days in observed if len(days)]
+            return {
+                'hotels': len(self.hotel_codes),
+                'observations': int(sum(partition['hotel_days'].sum() for partition in self.rollups['day'].values())),
+                'first_day': period_label('day', int(observed[0][0])) if observed else None,
+                'last_day': period_label('day', int(observed[-1][-1])) if observed else None
+            }
+
+
+def read_csv(text):
+    """Observations from CSV text with hotel_id,date,occupancy,arrivals columns"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {'hotel_id', 'date'} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    return list(reader)
+
+
+def main():
+    from flask import Config
+
+    config = Config(os.getcwd())
+    config.from_pyfile('config.py')
+
+    parser = argparse.ArgumentParser(description='Import occupancy observations from CSV files')
+    parser.add_argument('files', nargs='+', help='CSV files with hotel_id,date,occupancy,arrivals columns')
+    parser.add_argument('--store', default=config['OCCUPANCY_STORE_DIR'])
+    args = parser.parse_args()
+
+    store = OccupancyStore(args.store)
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            print(f"{path}: {store.ingest(read_csv(f.read()))} observations")
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.metrics.pairwise import linear_kernel
+from sklearn.neighbors import NearestNeighbors
+
+
+class BaseRanker:
+    """Candidate retrieval backend used by the recommendation engine"""
+    name = 'base'
+
+    def fit(self, feature_matrix):
+        raise NotImplementedError
+
+    def query(self, user_vector, n_candidates):
+        """Return (indices, similarities) of the best matching hotels"""
+        raise NotImplementedError
+
+
+class TfidfKnnRanker(BaseRanker):
+    """Default backend: cosine KNN over the TF-IDF hotel features"""
+    name = 'tfidf_knn'
+
+    def fit(self, feature_matrix):
+        self.n_hotels = feature_matrix.shape[0]
+        self.knn_model = NearestNeighbors(n_neighbors=min(10, self.n_hotels), metric='cosine')
+        self.knn_model.fit(feature_matrix)
+
+    def query(self, user_vector, n_candidates):
+        distances, indices = self.knn_model.kneighbors(
+            user_vector, n_neighbors=min(n_candidates, self.n_hotels)
+        )
+        return indices[0], 1 - distances[0]
+
+
+class CosineScanRanker(BaseRanker):
+    """Exact top-k by a single sparse dot product over the full matrix"""
+    name = 'cosine_scan'
+
+    def fit(self, feature_matrix):
+        # TF-IDF rows are already L2 normalised, so the dot product is the cosine
+        self.feature_matrix = feature_matrix
+
+    def query(self, user_vector, n_candidates):
+        scores = linear_kernel(user_vector, self.feature_matrix)[0]
+        k = min(n_candidates, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top, scores[top]
+
+
+RANKERS = {
+    TfidfKnnRanker.name: TfidfKnnRanker,
+    CosineScanRanker.name: CosineScanRanker,
+}
+
+
+def create_ranker(name):
+    """Instantiate a ranker backend by its registered name"""
+    if name not in RANKERS:
+        raise ValueError(f"Unknown ranker '{name}'. Available: {', '.join(sorted(RANKERS))}")
+    return RANKERS[name]()
+
+
+def compare_rankings(primary, candidate, k=8):
+    """Compare two ranked lists of (hotel_index, score) pairs"""
+    primary_scores = dict(primary[:k])
+    candidate_scores = dict(candidate[:k])
+    shared = set(primary_scores) & set(candidate_scores)
+    denominator = min(k, max(len(primary_scores), len(candidate_scores))) or 1
+
+    return {
+        'overlap_at_k': round(len(shared) / denominator, 3),
+        'score_mae': round(
+            float(np.mean([abs(primary_scores[i] - candidate_scores[i]) for i in shared])), 4
+        ) if shared else None,
+        'top1_match': bool(primary and candidate and primary[0][0] == candidate[0][0])
+    }
+
+
+class ShadowRanker:
+    """Replays a sample of live recommendation queries against a candidate ranker
+
+    Work runs on a single background thread so the request thread only pays
+    for a queue append. The same thread also appends every query to the
+    optional query log used by the offline replay harness.
+    """
+
+    def __init__(self, engine, candidate=None, sample_rate=0.0, query_log_path=None, max_pending=64):
+        self.engine = engine
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.query_log_path = query_log_path
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ranker-shadow')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {
+            'sampled': 0,
+            'dropped': 0,
+            'errors': 0,
+            'overlap_sum': 0.0,
+            'score_mae_sum': 0.0,
+            'score_mae_count': 0,
+            'top1_matches': 0,
+            'latencies_ms': []
+        }
+
+    def observe(self, query, primary):
+        """Schedule logging and (sampled) shadow evaluation of a live query"""
+        sampled = self.candidate is not None and random.random() < self.sample_rate
+        if not sampled and not self.query_log_path:
+            return
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats['dropped'] += 1
+                return
+            self._pending += 1
+
+        self._executor.submit(self._run, dict(query), list(primary), sampled)
+
+    def _run(self, query, primary, sampled):
+        try:
+            if self.query_log_path:
+                with open(self.query_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(query) + '\n')
+
+            if sampled:
+                start = time.perf_counter()
+                candidate = self.engine.rank_hotels(ranker=self.candidate, **query)
+                latency_ms = (time.perf_counter() - start) * 1000
+                comparison = compare_rankings(primary, candidate, k=self.engine.top_k)
+                self._record(comparison, latency_ms)
+        except Exception:
+            with self._lock:
+                self.stats['errors'] += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _record(self, comparison, latency_ms):
+        with self._lock:
+            stats = self.stats
+            stats['sampled'] += 1
+            stats['overlap_sum'] += comparison['overlap_at_k']
+            if comparison['score_mae'] is not None:
+                stats['score_mae_sum'] += comparison['score_mae']
+                stats['score_mae_count'] += 1
+            if comparison['top1_match']:
+                stats['top1_matches'] += 1
+            stats['latencies_ms'].append(latency_ms)
+            # Keep a bounded window of recent latencies for the percentiles
+            if len(stats['latencies_ms']) > 1000:
+                del stats['latencies_ms'][:-1000]
+
+    def get_stats(self):
+        """Summarise shadow comparisons collected so far"""
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = list(self.stats['latencies_ms'])
+
+        sampled = stats['sampled']
+        return {
+            'candidate': self.candidate.name if self.candidate else None,
+            'sample_rate': self.sample_rate,
+            'sampled': sampled,
+            'dropped': stats['dropped'],
+            'errors': stats['errors'],
+            'mean_overlap_at_k': round(stats['overlap_sum'] / sampled, 3) if sampled else None,
+            'mean_score_mae': round(stats['score_mae_sum'] / stats['score_mae_count'], 4)
+            if stats['score_mae_count'] else None,
+            'top1_agreement': round(stats['top1_matches'] / sampled, 3) if sampled else None,
+            'latency_ms': latency_percentiles(latencies)
+        }
+
+
+def latency_percentiles(latencies_ms):
+    """p50/p99 summary of a list of latencies in milliseconds"""
+    if not latencies_ms:
+        return {'p50': None, 'p99': None}
+    return {
+        'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p99': round(float(np.percentile(latencies_ms, 99)), 3)
+    }
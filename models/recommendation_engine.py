@@ -2,16 +2,23 @@ import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
 import re
 from geopy.distance import geodesic
 from datetime import datetime, timedelta
 import json
 
+from models.gazetteer import GAZETTEER, place_ids
+from models.rankers import create_ranker, ShadowRanker
+from utils.helpers import HOTEL_SUMMARY_FIELDS, categorize_budget, project_fields
+
 class RecommendationEngine:
-    def __init__(self, hotels_data):
+    def __init__(self, hotels_data, ranker='tfidf_knn', shadow_ranker=None,
+                 shadow_sample_rate=0.0, query_log_path=None):
         self.hotels_data = hotels_data
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        self.top_k = 8
+        self.n_candidates = 10
+        self.ranker = create_ranker(ranker)
         self._build_models()
         self._precompute_features()
         
@@ -36,6 +43,17 @@ class RecommendationEngine:
             'italian_k2_museum': {'name': 'Italian K2 Museum', 'type': 'museum', 'duration_hours': 2, 'cost': 300, 'best_time': 'day'}
         }
 
+        # Optional shadow evaluation of a candidate ranker on live traffic
+        self.shadow = None
+        if shadow_ranker or query_log_path:
+            candidate = None
+            if shadow_ranker:
+                candidate = create_ranker(shadow_ranker)
+                candidate.fit(self.feature_matrix)
+            self.shadow = ShadowRanker(
+                self, candidate=candidate, sample_rate=shadow_sample_rate, query_log_path=query_log_path
+            )
+
     def _build_models(self):
         """Build AI models for recommendations"""
         # Prepare features for content-based filtering
@@ -47,9 +65,8 @@ class RecommendationEngine:
         # Train TF-IDF vectorizer
         self.feature_matrix = self.vectorizer.fit_transform(features)
         
-        # Build KNN model for similar hotels
-        self.knn_model = NearestNeighbors(n_neighbors=10, metric='cosine')
-        self.knn_model.fit(self.feature_matrix)
+        # Fit the candidate retrieval backend (KNN by default)
+        self.ranker.fit(self.feature_matrix)
 
     def _precompute_features(self):
         """Precompute hotel features for faster recommendations"""
@@ -63,6 +80,13 @@ class RecommendationEngine:
                 'rating_score': self._calculate_rating_score(hotel)
             }
 
+    def refresh(self):
+        """Refit features and rankers after hotels_data changed in place"""
+        self._build_models()
+        self._precompute_features()
+        if self.shadow is not None and self.shadow.candidate is not None:
+            self.shadow.candidate.fit(self.feature_matrix)
+
     def _extract_hotel_features(self, hotel):
         """Extract text features from hotel data"""
         features = []
@@ -103,9 +127,9 @@ class RecommendationEngine:
             if value:
                 features.append(interest)
         
-        # Popular places
-        for place in hotel.get('mostPopularPlaces', []):
-            features.append(place.lower().replace(' ', '_'))
+        # Popular places, as canonical keys so spellings share one feature
+        for place_id in place_ids(hotel):
+            features.append(GAZETTEER.key(place_id))
         
         # Meals
         for meal in hotel.get('interestingMeals', []):
@@ -116,56 +140,70 @@ class RecommendationEngine:
 
     def _categorize_budget(self, hotel):
         """Categorize hotel budget level based on features"""
-        score = 0
-        
-        # Room-based scoring
-        rooms = hotel.get('facilities', {}).get('rooms', {})
-        num_rooms = rooms.get('numberOfRooms', 0)
-        if num_rooms > 20:
-            score += 2
-        elif num_rooms > 10:
-            score += 1
-        
-        # Facilities scoring
-        facilities = hotel.get('facilities', {})
-        if facilities.get('wifiInternet'):
-            score += 1
-        if facilities.get('restaurantDining'):
-            score += 1
-        if facilities.get('laundryServices'):
-            score += 1
-        if hotel.get('hasOwnTransport'):
-            score += 2
-        
-        # Determine budget category
-        if score >= 5:
-            return 'high'
-        elif score >= 3:
-            return 'medium'
-        else:
-            return 'low'
+        return categorize_budget(hotel)
 
-    def recommend_hotels(self, budget='medium', interests=None, facilities=None, group_size=2, duration=3):
-        """AI-powered hotel recommendations"""
+    def recommend_hotels(self, budget='medium', interests=None, facilities=None, group_size=2, duration=3,
+                         fields=HOTEL_SUMMARY_FIELDS):
+        """AI-powered hotel recommendations
+
+        ``fields`` selects which hotel fields are embedded (``None`` for the full record).
+        """
         if interests is None:
             interests = []
         if facilities is None:
             facilities = []
         
+        query = {
+            'budget': budget,
+            'interests': interests,
+            'facilities': facilities,
+            'group_size': group_size,
+            'duration': duration
+        }
+        candidates = self._score_candidates(self.ranker, **query)
+        
+        if self.shadow is not None:
+            self.shadow.observe(query, [(c['index'], c['score']) for c in candidates])
+        
+        recommendations = []
+        for candidate in candidates:
+            hotel = self.hotels_data[candidate['index']]
+            recommendations.append({
+                'hotel_id': hotel['id'],
+                'hotel': project_fields(hotel, fields),
+                'score': candidate['score'],
+                'similarity_score': candidate['similarity_score'],
+                'suitability_score': candidate['suitability_score'],
+                'budget_category': candidate['budget_category'],
+                'cost_estimate': self._estimate_hotel_cost(hotel, duration, group_size),
+                'match_reasons': self._get_match_reasons(hotel, interests, facilities)
+            })
+        
+        return recommendations
+
+    def rank_hotels(self, ranker=None, budget='medium', interests=None, facilities=None, group_size=2, duration=3):
+        """Ranked (hotel_index, score) pairs for a query using the given ranker"""
+        candidates = self._score_candidates(
+            ranker or self.ranker, budget, interests or [], facilities or [], group_size, duration
+        )
+        return [(c['index'], c['score']) for c in candidates]
+
+    def _score_candidates(self, ranker, budget, interests, facilities, group_size, duration):
+        """Retrieve candidates from the ranker and apply budget and suitability scoring"""
         # Prepare user preference vector
         user_features = ' '.join(interests + facilities + [budget])
         user_vector = self.vectorizer.transform([user_features])
         
         # Find similar hotels
-        distances, indices = self.knn_model.kneighbors(user_vector)
+        indices, similarities = ranker.query(user_vector, self.n_candidates)
         
-        recommendations = []
-        for idx, distance in zip(indices[0], distances[0]):
+        candidates = []
+        for idx, similarity_score in zip(indices, similarities):
+            idx = int(idx)
             hotel = self.hotels_data[idx]
-            similarity_score = 1 - distance
             
             # Filter by budget
-            hotel_budget = self._categorize_budget(hotel)
+            hotel_budget = self.hotel_features[idx]['budget_category']
             if budget != 'any' and hotel_budget != budget:
                 continue
             
@@ -177,22 +215,17 @@ class RecommendationEngine:
             # Combined score
             final_score = (similarity_score * 0.6) + (suitability_score * 0.4)
             
-            # Estimate cost
-            cost_estimate = self._estimate_hotel_cost(hotel, duration, group_size)
-            
-            recommendations.append({
-                'hotel': hotel,
-                'score': round(final_score, 3),
-                'similarity_score': round(similarity_score, 3),
+            candidates.append({
+                'index': idx,
+                'score': round(float(final_score), 3),
+                'similarity_score': round(float(similarity_score), 3),
                 'suitability_score': round(suitability_score, 3),
-                'budget_category': hotel_budget,
-                'cost_estimate': cost_estimate,
-                'match_reasons': self._get_match_reasons(hotel, interests, facilities)
+                'budget_category': hotel_budget
             })
         
         # Sort by score and return top recommendations
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        return recommendations[:8]
+        candidates.sort(key=lambda x: x['score'], reverse=True)
+        return candidates[:self.top_k]
 
     def _calculate_suitability_score(self, hotel, interests, facilities, group_size):
         """Calculate how suitable a hotel is for the user"""
@@ -241,7 +274,8 @@ class RecommendationEngine:
             'per_person': round(total_cost / group_size) if group_size > 0 else 0
         }
 
-    def create_itinerary(self, duration=5, budget='medium', interests=None, pace='moderate'):
+    def create_itinerary(self, duration=5, budget='medium', interests=None, pace='moderate',
+                         fields=HOTEL_SUMMARY_FIELDS):
         """Create AI-powered travel itinerary"""
         if interests is None:
             interests = []
@@ -307,7 +341,9 @@ class RecommendationEngine:
         
         # Calculate total costs
         total_itinerary_cost = sum(day['total_cost'] for day in itinerary)
-        hotel_recommendations = self.recommend_hotels(budget=budget, interests=interests, duration=duration)
+        hotel_recommendations = self.recommend_hotels(
+            budget=budget, interests=interests, duration=duration, fields=fields
+        )
         
         return {
             'duration_days': duration,
@@ -380,7 +416,7 @@ class RecommendationEngine:
             reasons.append(f"Offers facilities: {', '.join(matched_facilities)}")
         
         # Popular places nearby
-        popular_places = hotel.get('mostPopularPlaces', [])
+        popular_places = [GAZETTEER.name(place_id) for place_id in place_ids(hotel)]
         if popular_places:
             reasons.append(f"Near popular places: {', '.join(popular_places[:2])}")
         
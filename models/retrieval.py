@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'can', 'do', 'does', 'for', 'from', 'have', 'how', 'i', 'in', 'is',
+    'it', 'me', 'my', 'of', 'on', 'or', 'the', 'there', 'to', 'what', 'where', 'which', 'with',
+    'you', 'your'
+}
+
+
+def content_tokens(text):
+    """Lowercased words of a text without stopwords"""
+    return [t for t in re.findall(r'\w+', text.lower()) if t not in _STOPWORDS]
+
+
+class HashingEmbedder:
+    """Dependency-free embedder hashing word unigrams and bigrams into a fixed space"""
+    name = 'hashing'
+    # Scores come only from shared words, so a hit without one is a hash collision
+    lexical = True
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = content_tokens(text)
+            # Binary features, so repeated words do not dominate long documents
+            features = set(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+            for feature in features:
+                h = zlib.crc32(feature.encode('utf-8'))
+                matrix[row, h % self.dim] += 1.0 if (h // self.dim) % 2 == 0 else -1.0
+
+        return matrix[0] if single else matrix
+
+
+class SentenceTransformerEmbedder:
+    """Adapter for a loaded sentence-transformers model"""
+    lexical = False
+
+    def __init__(self, model, name='all-MiniLM-L6-v2'):
+        self.model = model
+        self.name = name
+
+    def encode(self, texts):
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class RetrievalIndex:
+    """Top-k cosine search over a normalised float32 embedding matrix
+
+    With an ``index_dir`` the matrix is persisted as ``embeddings.npy`` and
+    memory-mapped on the next start when the documents and embedder match.
+    """
+
+    def __init__(self, embedder, index_dir=None):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self.documents = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def build(self, documents):
+        fingerprint = self._fingerprint(documents)
+        if self.index_dir and self._load(fingerprint):
+            return self
+
+        self.documents = documents
+        self.matrix = _normalize(self.embedder.encode([doc['text'] for doc in documents]))
+        if self.index_dir:
+            self._save(fingerprint)
+        return self
+
+    def search(self, query, k=3):
+        """Return the k best (document, score) pairs for a query"""
+        if not self.documents:
+            return []
+
+        query_vector = _normalize(np.asarray(self.embedder.encode(query), dtype=np.float32))
+        scores = self.matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def _fingerprint(self, documents):
+        digest = hashlib.sha1(self.embedder.name.encode('utf-8'))
+        for doc in documents:
+            digest.update(doc['id'].encode('utf-8'))
+            digest.update(doc['text'].encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load(self, fingerprint):
+        meta_path = os.path.join(self.index_dir, 'documents.json')
+        matrix_path = os.path.join(self.index_dir, 'embeddings.npy')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return False
+            self.matrix = np.load(matrix_path, mmap_mode='r')
+            self.documents = meta['documents']
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _save(self, fingerprint):
+        os.makedirs(self.index_dir, exist_ok=True)
+        matrix_path = os.path.join(self.index_dir, 'embeddings.npy')
+        meta_path = os.path.join(self.index_dir, 'documents.json')
+
+        # Write to temporary files first so readers never see a partial index
+        with open(matrix_path + '.tmp', 'wb') as f:
+            np.save(f, self.matrix)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprint': fingerprint,
+                'embedder': self.embedder.name,
+                'documents': self.documents
+            }, f)
+        os.replace(matrix_path + '.tmp', matrix_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        self.matrix = np.load(matrix_path, mmap_mode='r')
@@ -0,0 +1,197 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+from models.gazetteer import GAZETTEER, place_ids
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Indexed text per hotel and the weight a term occurrence there carries
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'places': 1.5,
+    'address': 1.0,
+    'meals': 1.0,
+    'facilities': 1.0
+}
+
+# Dropped from queries (never from the index) so "hotels in skardu" ANDs the useful terms
+QUERY_STOPWORDS = {'a', 'an', 'the', 'in', 'at', 'of', 'and', 'or', 'to', 'for', 'with'}
+
+# Upper bound on vocabulary terms a trailing prefix expands to
+MAX_PREFIX_TERMS = 50
+
+
+def _rank(item):
+    """Sort key for (hotel id, score): best score first, ties by id"""
+    return -item[1], item[0]
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def hotel_fields(hotel):
+    """Searchable text of a hotel per FIELD_WEIGHTS field"""
+    places = [place for place in hotel.get('mostPopularPlaces') or [] if isinstance(place, str)]
+    places += [GAZETTEER.name(place_id) for place_id in place_ids(hotel)]
+    meals = [meal for meal in hotel.get('interestingMeals') or []
+             if isinstance(meal, str) and meal.lower() != 'true']
+    return {
+        'name': hotel.get('hotelGuestHouseName') or '',
+        'places': ' '.join(places),
+        'address': hotel.get('fullAddress') or '',
+        'meals': ' '.join(meals),
+        'facilities': (hotel.get('facilities') or {}).get('otherFacilities') or ''
+    }
+
+
+def parse_query(query, op='and'):
+    """(terms, op) of a query; an uppercase OR between words switches to 'or'"""
+    words = str(query).split()
+    if 'OR' in words:
+        op = 'or'
+    terms = []
+    for term in tokenize(query):
+        if term not in QUERY_STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms, op
+
+
+class HotelSearchIndex:
+    """Token-level inverted index over hotel text with BM25 ranking
+
+    Each term maps to a posting dict {hotel id: weighted term frequency},
+    where an occurrence counts FIELD_WEIGHTS[field] times. An AND query walks
+    the shortest posting list and probes the others, an OR query merges them,
+    so the work follows the posting list sizes rather than the number of
+    hotels. The last query term also matches as a prefix ("skar" finds
+    "skardu"), mirroring the substring search it replaces.
+    """
+
+    def __init__(self, hotels_data, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0.0
+        self._vocabulary = None
+        self._lock = threading.Lock()
+        for hotel in hotels_data:
+            self.add_hotel(hotel)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add_hotel(self, hotel):
+        hotel_id = hotel.get('id')
+        if hotel_id is None:
+            return
+        frequencies = {}
+        for field, text in hotel_fields(hotel).items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        with self._lock:
+            self._remove(hotel_id)
+            for term, frequency in frequencies.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = {}
+                    self._vocabulary = None
+                postings[hotel_id] = frequency
+            length = sum(frequencies.values())
+            self.doc_terms[hotel_id] = list(frequencies)
+            self.doc_lengths[hotel_id] = length
+            self.total_length += length
+
+    def remove_hotel(self, hotel):
+        with self._lock:
+            self._remove(hotel.get('id'))
+
+    def update_hotel(self, old_hotel, new_hotel):
+        self.remove_hotel(old_hotel)
+        self.add_hotel(new_hotel)
+
+    def _remove(self, hotel_id):
+        terms = self.doc_terms.pop(hotel_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            del postings[hotel_id]
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+        self.total_length -= self.doc_lengths.pop(hotel_id)
+
+    def _prefix_terms(self, prefix):
+        """Indexed terms starting with prefix, from a lazily re-sorted vocabulary"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _term_postings(self, term, prefix=False):
+        """[(term, postings)] for a query term; a prefix term may expand to several"""
+        if not prefix:
+            postings = self.postings.get(term)
+            return [(term, postings)] if postings else []
+        return [(match, self.postings[match]) for match in self._prefix_terms(term)]
+
+    def search(self, query, op='and', limit=None):
+        """[(hotel id, score)] best first; AND needs every term, OR any of them"""
+        terms, op = parse_query(query, op)
+        if not terms:
+            return []
+        with self._lock:
+            # Each query term is a group of (term, postings); a hotel matches a group through any of them
+            groups = [self._term_postings(term, prefix=position == len(terms) - 1)
+                      for position, term in enumerate(terms)]
+            if op == 'and':
+                if not all(groups):
+                    return []
+                ordered = sorted(groups, key=lambda group: sum(len(postings) for _, postings in group))
+                candidates = set()
+                for _, postings in ordered[0]:
+                    candidates.update(postings)
+                for group in ordered[1:]:
+                    candidates = {hotel_id for hotel_id in candidates
+                                  if any(hotel_id in postings for _, postings in group)}
+                    if not candidates:
+                        return []
+            else:
+                candidates = set()
+                for group in groups:
+                    for _, postings in group:
+                        candidates.update(postings)
+
+            count = len(self.doc_lengths)
+            average_length = self.total_length / count if count else 0.0
+            scores = dict.fromkeys(candidates, 0.0)
+            for group in groups:
+                for _, postings in group:
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for hotel_id in postings.keys() & candidates:
+                        frequency = postings[hotel_id]
+                        norm = 1 - self.b + self.b * self.doc_lengths[hotel_id] / average_length
+                        scores[hotel_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+
+        if limit:
+            return heapq.nsmallest(limit, scores.items(), key=_rank)
+        return sorted(scores.items(), key=_rank)
+
+    def get_stats(self):
+        return {
+            'hotels': len(self.doc_lengths),
+            'terms': len(self.postings),
+            'postings': sum(len(postings) for postings in self.postings.values())
+        }
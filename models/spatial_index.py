@@ -0,0 +1,174 @@
+import math
+
+# Grid cells per 256px map tile edge: clusters are roughly 64px apart on screen
+CELLS_PER_TILE = 4
+
+
+def location_record(hotel):
+    """Map marker for a hotel, or None if it has no usable coordinates"""
+    location = hotel.get('location') or {}
+    try:
+        lat = float(location.get('latitude'))
+        lng = float(location.get('longitude'))
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lng):
+        return None
+
+    facilities = hotel.get('facilities', {})
+    hotel_type = hotel.get('type') or {}
+    return {
+        'id': hotel.get('id'),
+        'name': hotel.get('hotelGuestHouseName', ''),
+        'lat': lat,
+        'lng': lng,
+        'address': hotel.get('fullAddress', ''),
+        'type': 'hotel' if hotel_type.get('hotel') else 'guest_house',
+        'rooms': facilities.get('rooms', {}).get('numberOfRooms', 0),
+        'tourists': hotel.get('touristDemographics', {}).get('totalTouristsRecorded', 0),
+        'has_wifi': facilities.get('wifiInternet'),
+        'has_restaurant': facilities.get('restaurantDining'),
+        'has_transport': facilities.get('transportArrangement') or hotel.get('hasOwnTransport', False),
+        'phone_numbers': hotel.get('phoneNumbers', [])
+    }
+
+
+def parse_bbox(value):
+    """'west,south,east,north' -> (west, south, east, north); raises ValueError"""
+    parts = [float(part) for part in str(value).split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must be 'west,south,east,north'")
+    west, south, east, north = parts
+    if south > north or west > east:
+        raise ValueError("bbox must be 'west,south,east,north' with west <= east and south <= north")
+    return west, south, east, north
+
+
+class HotelMapIndex:
+    """Grid index of hotel markers with clusters precomputed per zoom level
+
+    Each zoom level z splits the map into cells of ``360 / (2**z * 4)``
+    degrees; a cell keeps its hotel ids and running sums for the centroid,
+    room count and facility mix. A viewport query only visits the cells
+    inside the bounding box, so its cost and payload follow the viewport
+    and not the dataset. Above ``max_cluster_zoom`` individual markers are
+    returned from the finest grid.
+    """
+
+    def __init__(self, hotels_data, max_cluster_zoom=14, max_points=500):
+        self.max_cluster_zoom = max_cluster_zoom
+        self.max_points = max_points
+        self.records = {}
+        self.grids = [{} for _ in range(max_cluster_zoom + 1)]
+        for hotel in hotels_data:
+            self.add_hotel(hotel)
+
+    def _cell_size(self, zoom):
+        return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+    def _cell(self, zoom, lat, lng):
+        size = self._cell_size(zoom)
+        return (math.floor(lng / size), math.floor(lat / size))
+
+    def add_hotel(self, hotel):
+        record = location_record(hotel)
+        if record is None or record['id'] is None:
+            return
+        self.records[record['id']] = record
+        for zoom, grid in enumerate(self.grids):
+            cell = grid.setdefault(self._cell(zoom, record['lat'], record['lng']), {
+                'ids': set(), 'lat_sum': 0.0, 'lng_sum': 0.0, 'rooms': 0, 'tourists': 0,
+                'hotels': 0, 'guest_houses': 0, 'wifi': 0, 'restaurant': 0, 'transport': 0
+            })
+            self._apply(cell, record, 1)
+
+    def remove_hotel(self, hotel):
+        record = self.records.pop(hotel.get('id'), None)
+        if record is None:
+            return
+        for zoom, grid in enumerate(self.grids):
+            key = self._cell(zoom, record['lat'], record['lng'])
+            cell = grid[key]
+            self._apply(cell, record, -1)
+            if not cell['ids']:
+                del grid[key]
+
+    def update_hotel(self, old_hotel, new_hotel):
+        self.remove_hotel(old_hotel)
+        self.add_hotel(new_hotel)
+
+    def _apply(self, cell, record, sign):
+        if sign > 0:
+            cell['ids'].add(record['id'])
+        else:
+            cell['ids'].discard(record['id'])
+        cell['lat_sum'] += sign * record['lat']
+        cell['lng_sum'] += sign * record['lng']
+        cell['rooms'] += sign * (record['rooms'] if isinstance(record['rooms'], (int, float)) else 0)
+        cell['tourists'] += sign * (record['tourists'] if isinstance(record['tourists'], (int, float)) else 0)
+        cell['hotels' if record['type'] == 'hotel' else 'guest_houses'] += sign
+        cell['wifi'] += sign * bool(record['has_wifi'])
+        cell['restaurant'] += sign * bool(record['has_restaurant'])
+        cell['transport'] += sign * bool(record['has_transport'])
+
+    def all_locations(self):
+        return list(self.records.values())
+
+    def _visible_cells(self, zoom, bbox):
+        """(key, cell) pairs of a zoom level's grid that intersect bbox"""
+        grid = self.grids[min(zoom, self.max_cluster_zoom)]
+        level = min(zoom, self.max_cluster_zoom)
+        west, south, east, north = bbox
+        x0, y0 = self._cell(level, south, west)
+        x1, y1 = self._cell(level, north, east)
+        span = (x1 - x0 + 1) * (y1 - y0 + 1)
+        # Scan whichever is smaller: the cells under the viewport or the non-empty cells
+        if span <= len(grid):
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cell = grid.get((x, y))
+                    if cell is not None:
+                        yield cell
+        else:
+            for (x, y), cell in grid.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    yield cell
+
+    def query(self, bbox, zoom):
+        """Clusters and single markers visible in bbox at a zoom level"""
+        west, south, east, north = bbox
+        clusters = []
+        locations = []
+        truncated = False
+        for cell in self._visible_cells(zoom, bbox):
+            count = len(cell['ids'])
+            if count > 1 and zoom <= self.max_cluster_zoom:
+                clusters.append({
+                    'lat': round(cell['lat_sum'] / count, 6),
+                    'lng': round(cell['lng_sum'] / count, 6),
+                    'count': count,
+                    'rooms': cell['rooms'],
+                    'tourists': cell['tourists'],
+                    'types': {'hotel': cell['hotels'], 'guest_house': cell['guest_houses']},
+                    'facilities': {
+                        'wifi': cell['wifi'], 'restaurant': cell['restaurant'], 'transport': cell['transport']
+                    }
+                })
+                continue
+            for hotel_id in cell['ids']:
+                record = self.records[hotel_id]
+                # Cells on the viewport edge may hold markers just outside it
+                if not (south <= record['lat'] <= north and west <= record['lng'] <= east):
+                    continue
+                if len(locations) >= self.max_points:
+                    truncated = True
+                    break
+                locations.append(record)
+
+        return {
+            'zoom': zoom,
+            'bbox': [west, south, east, north],
+            'clusters': clusters,
+            'locations': locations,
+            'truncated': truncated
+        }
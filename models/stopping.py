@@ -0,0 +1,82 @@
+import time
+
+import torch
+import transformers
+from packaging import version
+from transformers import StoppingCriteria
+
+SENTENCE_END = ('.', '!', '?')
+
+# Stopping criteria may return one flag per batch row from transformers 4.39;
+# older releases expect a single bool for the whole batch
+PER_ROW_STOPPING = version.parse(transformers.__version__) >= version.parse('4.39.0')
+
+
+def sentence_end_token_ids(tokenizer):
+    """Ids of vocabulary tokens that finish a sentence ('.', '!', '?', '."', ...)"""
+    ids = []
+    for token_id, token in enumerate(tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))):
+        if token and token.rstrip('"\')').endswith(SENTENCE_END):
+            ids.append(token_id)
+    return set(ids)
+
+
+class RowStoppingCriteria(StoppingCriteria):
+    """Stops each row of a batch at its own deadline, token limit or sentence end
+
+    ``reasons[row]`` records why a row stopped ('eos', 'length',
+    'sentence_end' or 'deadline') and ``lengths[row]`` how many new tokens
+    it had by then, so rows padded after finishing can be trimmed exactly.
+    ``on_stop(row, new_tokens, reason)`` is called as soon as a row stops,
+    while the rest of the batch keeps generating.
+    """
+
+    def __init__(self, prompt_width, eos_token_id, max_new_tokens, deadlines=None,
+                 sentence_end_ids=None, min_sentence_tokens=8, on_stop=None):
+        self.prompt_width = prompt_width
+        self.eos_token_id = eos_token_id
+        self.max_new_tokens = list(max_new_tokens)
+        self.deadlines = list(deadlines) if deadlines is not None else [None] * len(self.max_new_tokens)
+        self.sentence_end_ids = sentence_end_ids or set()
+        self.min_sentence_tokens = min_sentence_tokens
+        self.on_stop = on_stop
+        self.reasons = [None] * len(self.max_new_tokens)
+        self.lengths = [None] * len(self.max_new_tokens)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        now = time.monotonic()
+        generated = input_ids.shape[-1] - self.prompt_width
+        last_tokens = input_ids[:, -1].tolist()
+
+        for row, token in enumerate(last_tokens):
+            if self.reasons[row] is not None:
+                continue
+            if token == self.eos_token_id:
+                reason = 'eos'
+            elif generated >= self.max_new_tokens[row]:
+                reason = 'length'
+            elif generated >= self.min_sentence_tokens and token in self.sentence_end_ids:
+                reason = 'sentence_end'
+            elif self.deadlines[row] is not None and now >= self.deadlines[row]:
+                reason = 'deadline'
+            else:
+                continue
+            self.reasons[row] = reason
+            self.lengths[row] = generated
+            if self.on_stop is not None:
+                self.on_stop(row, input_ids[row, self.prompt_width:].tolist(), reason)
+
+        done = [reason is not None for reason in self.reasons]
+        if not PER_ROW_STOPPING:
+            # Finished rows keep generating padding; trim() cuts them back
+            return all(done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def trim(self, row, tokens):
+        """New tokens of a row up to where it stopped"""
+        if self.lengths[row] is not None:
+            return tokens[:self.lengths[row]]
+        return tokens
+
+    def reason(self, row):
+        return self.reasons[row] or 'length'
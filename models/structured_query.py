@@ -0,0 +1,299 @@
+import re
+
+from models.intent_matcher import KeywordMatcher
+
+
+# Query facets recognised in a message; labels are (kind, value) tuples
+QUERY_KEYWORDS = {
+    ('form', 'count'): ['how many', 'number of', 'count', 'kitne', 'kitna'],
+    ('form', 'list'): ['which', 'list', 'show me', 'name', 'names', 'konsa', 'konse'],
+    ('type', 'hotel'): ['hotel', 'hotal'],
+    ('type', 'guest_house'): ['guest house', 'guesthouse'],
+    ('facility', 'wifi'): ['wifi', 'wi fi', 'internet'],
+    ('facility', 'restaurant'): ['restaurant', 'dining'],
+    ('facility', 'guide_services'): ['guide', 'tour guide', 'guided tour'],
+    ('facility', 'transport'): ['transport', 'pick up', 'pickup'],
+    ('facility', 'laundry'): ['laundry'],
+    ('facility', 'parking'): ['parking'],
+    ('facility', 'conference_hall'): ['conference', 'conference hall'],
+    ('facility', 'own_transport'): ['own transport', 'own vehicle'],
+    ('tourists', 'all'): ['tourist', 'visitor', 'traveler', 'traveller'],
+    ('tourists', 'foreign'): ['foreign', 'foreigner', 'international', 'overseas'],
+    ('tourists', 'domestic'): ['pakistani', 'domestic', 'local'],
+    ('origin', 'source'): ['come from', 'comes from', 'coming from', 'where from', 'origin', 'country',
+                           'countries', 'city', 'cities'],
+    ('metric', 'stay'): ['stay duration', 'length of stay', 'average stay', 'stay on average',
+                         'long do tourists stay', 'long do visitors stay', 'long do travelers stay',
+                         'long do travellers stay'],
+    ('metric', 'occupancy'): ['occupancy'],
+    ('metric', 'rooms'): ['room', 'kamra', 'kamray'],
+    ('aggregate', 'average'): ['average', 'avg', 'on average', 'typical', 'typically', 'usually', 'mean']
+}
+
+QUERY_MATCHER = KeywordMatcher(QUERY_KEYWORDS)
+
+FACILITY_LABELS = {
+    'wifi': 'WiFi',
+    'restaurant': 'a restaurant',
+    'guide_services': 'guide services',
+    'transport': 'transport arrangement',
+    'laundry': 'laundry',
+    'parking': 'parking',
+    'conference_hall': 'a conference hall',
+    'own_transport': 'their own transport'
+}
+
+_ROOM_CONDITION_RE = re.compile(
+    r'(more than|over|above|greater than|at least|minimum|less than|fewer than|under|below|at most|maximum)'
+    r'\s+(\d+)\s+(?:rooms?|kamr[ae]y?)'
+)
+_ROOM_PLUS_RE = re.compile(r'(\d+)\s*\+\s*(?:rooms?|kamr[ae]y?)')
+_LOCATION_RE = re.compile(r'\b(?:in|at|near|around|of)\s+(?:(?:the|a|an)\s+)?([a-z]+)', re.IGNORECASE)
+
+# Address words that say nothing about where in the region a hotel is
+_GENERIC_ADDRESS_WORDS = {
+    'near', 'road', 'the', 'and', 'hotel', 'guest', 'house', 'pakistan', 'gilgit', 'baltistan', 'gb',
+    'district', 'city', 'town', 'main', 'chowk', 'chok', 'bazar', 'bazaar', 'colony', 'opposite', 'upper',
+    'lower', 'new', 'old'
+}
+
+LIST_LIMIT = 10
+
+
+def _bit_count(mask):
+    return bin(mask).count('1')
+
+
+class StructuredQueryEngine:
+    """Answers count/list/aggregate questions without a generative model
+
+    Hotels are indexed once into integer bitsets per facility, type and
+    address word, so a filter such as "guest houses in Kachura with WiFi" is
+    a couple of bitwise ANDs. Demographic and temporal questions are read
+    from the analytics engine's precomputed ``analytics_cache``.
+    """
+
+    def __init__(self, hotels_data, analytics_engine=None):
+        self.analytics_engine = analytics_engine
+        self.rebuild(hotels_data)
+
+    def rebuild(self, hotels_data):
+        self.hotels = list(hotels_data)
+        self.all_mask = (1 << len(self.hotels)) - 1
+        self.facility_masks = {facility: 0 for facility in FACILITY_LABELS}
+        self.type_masks = {'hotel': 0, 'guest_house': 0}
+        self.location_masks = {}
+        self.rooms = []
+
+        for position, hotel in enumerate(self.hotels):
+            bit = 1 << position
+            for facility in self._hotel_facilities(hotel):
+                self.facility_masks[facility] |= bit
+
+            hotel_type = hotel.get('type') or {}
+            if hotel_type.get('hotel'):
+                self.type_masks['hotel'] |= bit
+            if hotel_type.get('guestHouse'):
+                self.type_masks['guest_house'] |= bit
+
+            for word in set(re.findall(r'[a-z]+', hotel.get('fullAddress', '').lower())):
+                if len(word) > 2 and word not in _GENERIC_ADDRESS_WORDS:
+                    self.location_masks[word] = self.location_masks.get(word, 0) | bit
+
+            rooms = hotel.get('facilities', {}).get('rooms', {}).get('numberOfRooms', 0)
+            self.rooms.append(rooms if isinstance(rooms, (int, float)) else 0)
+
+    def _hotel_facilities(self, hotel):
+        facilities = hotel.get('facilities', {})
+        other = str(facilities.get('otherFacilities') or '').lower()
+        flags = {
+            'wifi': facilities.get('wifiInternet'),
+            'restaurant': facilities.get('restaurantDining'),
+            'guide_services': facilities.get('guideServices'),
+            'transport': facilities.get('transportArrangement'),
+            'laundry': facilities.get('laundryServices'),
+            'parking': 'parking' in other,
+            'conference_hall': 'conference' in other,
+            'own_transport': hotel.get('hasOwnTransport')
+        }
+        return [facility for facility, present in flags.items() if present]
+
+    def answer(self, message, default_form=None):
+        """Answer a structured question, or None if the message is not one
+
+        ``default_form`` ('count' or 'list') answers hotel filters that carry
+        no explicit question word, e.g. "guest houses with parking".
+        """
+        text = message.lower()
+        facets = {}
+        for label in QUERY_MATCHER.labels(text):
+            kind, value = label
+            facets.setdefault(kind, set()).add(value)
+
+        # Stay and occupancy figures need an explicit tourist or aggregate word, so
+        # "I have 5 days in Skardu" stays ordinary chat
+        asks_average = bool(facets.get('metric', set()) & {'stay', 'occupancy'}) and (
+            'tourists' in facets or 'aggregate' in facets
+        )
+        if 'tourists' in facets or asks_average:
+            answer = self._answer_demographics(facets, asks_average)
+            if answer:
+                return answer
+
+        forms = facets.get('form', set())
+        form = 'count' if 'count' in forms else 'list' if 'list' in forms else default_form
+        if form is None:
+            return None
+
+        query = self._parse_hotel_filter(message, facets)
+        if query is None:
+            return None
+        return self._answer_hotels(form, *query)
+
+    def _parse_hotel_filter(self, message, facets):
+        text = message.lower()
+        types = facets.get('type', set())
+        room_condition = self._room_condition(text)
+        # Keep the words as written for the reply; the masks are keyed in lowercase
+        locations = [word for word in _LOCATION_RE.findall(message)
+                     if word.lower() not in _GENERIC_ADDRESS_WORDS and word.lower() in self.location_masks]
+        facilities = sorted(facets.get('facility', ()))
+
+        # A question about something other than hotels is not ours to answer
+        if not (types or facilities or room_condition):
+            return None
+
+        mask = self.all_mask
+        # "hotels" on its own means any accommodation; only guest houses narrow it
+        if 'guest_house' in types and 'hotel' not in types:
+            mask &= self.type_masks['guest_house']
+        for facility in facilities:
+            mask &= self.facility_masks[facility]
+        for location in locations:
+            mask &= self.location_masks[location.lower()]
+        if room_condition:
+            mask = self._apply_room_condition(mask, room_condition)
+
+        noun = 'guest houses' if 'guest_house' in types and 'hotel' not in types else 'hotels and guest houses'
+        return mask, noun, locations, facilities, room_condition
+
+    def _room_condition(self, text):
+        match = _ROOM_CONDITION_RE.search(text)
+        if match:
+            op = match.group(1)
+            value = int(match.group(2))
+            if op in ('more than', 'over', 'above', 'greater than'):
+                return ('>', value)
+            if op in ('at least', 'minimum'):
+                return ('>=', value)
+            if op in ('less than', 'fewer than', 'under', 'below'):
+                return ('<', value)
+            return ('<=', value)
+        match = _ROOM_PLUS_RE.search(text)
+        if match:
+            return ('>=', int(match.group(1)))
+        return None
+
+    def _apply_room_condition(self, mask, condition):
+        op, value = condition
+        tests = {
+            '>': lambda rooms: rooms > value,
+            '>=': lambda rooms: rooms >= value,
+            '<': lambda rooms: rooms < value,
+            '<=': lambda rooms: rooms <= value
+        }
+        test = tests[op]
+        result = 0
+        for position in self._positions(mask):
+            if test(self.rooms[position]):
+                result |= 1 << position
+        return result
+
+    def _positions(self, mask):
+        position = 0
+        while mask:
+            if mask & 1:
+                yield position
+            mask >>= 1
+            position += 1
+
+    def _describe(self, noun, locations, facilities, room_condition):
+        description = noun
+        if locations:
+            description += ' in ' + ' / '.join(locations)
+        if facilities:
+            labels = [FACILITY_LABELS[facility] for facility in facilities]
+            description += ' with ' + (', '.join(labels[:-1]) + ' and ' + labels[-1] if len(labels) > 1 else labels[0])
+        if room_condition:
+            words = {'>': 'more than', '>=': 'at least', '<': 'fewer than', '<=': 'at most'}
+            description += f"{' and' if facilities else ' with'} {words[room_condition[0]]} {room_condition[1]} rooms"
+        return description
+
+    def _answer_hotels(self, form, mask, noun, locations, facilities, room_condition):
+        description = self._describe(noun, locations, facilities, room_condition)
+        count = _bit_count(mask)
+        if count == 0:
+            return f"I couldn't find any {description} in our data."
+
+        response = f"There are {count} {description} in our data."
+        if form == 'count' and count > 5:
+            return response + " Ask me which ones if you'd like the list."
+
+        positions = sorted(self._positions(mask), key=lambda p: self.hotels[p].get('hotelGuestHouseName', ''))
+        lines = []
+        for position in positions[:LIST_LIMIT]:
+            hotel = self.hotels[position]
+            line = f"• {hotel.get('hotelGuestHouseName', 'Unnamed')} - {hotel.get('fullAddress', '')}"
+            if self.rooms[position]:
+                line += f" ({self.rooms[position]} rooms)"
+            lines.append(line)
+        if count > LIST_LIMIT:
+            lines.append(f"...and {count - LIST_LIMIT} more.")
+        return response + "\n\n" + "\n".join(lines)
+
+    def _answer_demographics(self, facets, asks_average=False):
+        if self.analytics_engine is None:
+            return None
+        cache = self.analytics_engine.analytics_cache
+        demographics = cache['demographics']
+        tourists = facets.get('tourists', set())
+        metrics = facets.get('metric', set())
+
+        if 'origin' in facets:
+            if 'foreign' in tourists:
+                return self._top_sources(demographics['breakdown_by_foreign_country'], 'foreign tourists', 'countries')
+            return self._top_sources(demographics['breakdown_by_origin'], 'Pakistani tourists', 'places')
+
+        if 'stay' in metrics and asks_average:
+            return f"Tourists stay {cache['temporal']['avg_stay_duration']} days on average."
+        if 'occupancy' in metrics and asks_average:
+            return f"Hotels host {cache['temporal']['avg_occupancy']} guests per day on average."
+
+        if 'count' in facets.get('form', ()):
+            if 'foreign' in tourists:
+                return f"Our hotels have recorded {demographics['foreign_tourists']:,} foreign tourists."
+            if 'domestic' in tourists:
+                return f"Our hotels have recorded {demographics['pakistani_tourists']:,} Pakistani tourists."
+            return (f"Our hotels have recorded {demographics['total_tourists']:,} tourists: "
+                    f"{demographics['pakistani_tourists']:,} Pakistani and "
+                    f"{demographics['foreign_tourists']:,} foreign.")
+        return None
+
+    def _top_sources(self, breakdown, who, kind, limit=5):
+        # Origins are free text ("punjab", "Punjab "), so merge them case-insensitively and
+        # show the most common spelling as recorded ("USA" stays "USA")
+        merged = {}
+        spellings = {}
+        for name, count in breakdown.items():
+            spelling = str(name).strip(' [],')
+            key = spelling.lower()
+            if key:
+                merged[key] = merged.get(key, 0) + count
+                if count > spellings.get(key, (None, -1))[1]:
+                    spellings[key] = (spelling, count)
+        top = [(spellings[key][0], count) for key, count in sorted(merged.items(), key=lambda item: -item[1])[:limit]]
+        top = [(name, count) for name, count in top if count > 0]
+        if not top:
+            return f"We have no recorded origins for {who} yet."
+        listing = ', '.join(f"{name} ({count:,})" for name, count in top)
+        return f"Most {who} come from these {kind}: {listing}."
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports ``models`` and ``utils`` as top-level packages from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,120 @@
+import copy
+import json
+
+import pytest
+
+from models.analytics import AnalyticsEngine
+from models.analytics_cube import CUBE_DIMENSIONS, EXPORT_TABLES
+
+
+def make_hotel(hotel_id, address, rooms, tourists, origins=(), countries=(), places=(), **facilities):
+    return {
+        'id': hotel_id,
+        'hotelGuestHouseName': hotel_id.title(),
+        'fullAddress': address,
+        'type': {'hotel': rooms >= 10, 'guestHouse': rooms < 20},
+        'facilities': {'rooms': {'numberOfRooms': rooms}, **facilities},
+        'hasOwnTransport': rooms > 25,
+        'touristDemographics': {
+            'totalTouristsRecorded': tourists,
+            'foreignTourists': sum(count for _, count in countries),
+            'pakistaniTourists': {
+                'count': sum(count for _, count in origins),
+                'local': tourists // 2,
+                'nonLocal': tourists - tourists // 2,
+                'breakdownByOrigin': [{'origin': name, 'count': count} for name, count in origins]
+            },
+            'breakdownByForeignCountry': [{'country': name, 'count': count} for name, count in countries]
+        },
+        'averageOccupancyPerDay': rooms // 2,
+        'averageStayDurationDays': 2,
+        'mostPopularPlaces': list(places)
+    }
+
+
+HOTELS = [
+    make_hotel('alpha', 'Yadgar Chowk, Skardu', 8, 120, [('Lahore', 40), ('Karachi', 20)], [('China', 5)],
+               ['Deosai', 'Kachura Lake'], wifiInternet=True),
+    make_hotel('bravo', 'Shangrila Road, Kachura', 24, 300, [('Lahore', 100)], [('Japan', 12), ('China', 3)],
+               ['shangrila'], wifiInternet=True, restaurantDining=True),
+    make_hotel('charlie', 'Hoto Village, Skardu', 12, 80, [('Islamabad', 30)], [], ['hoto'],
+               laundryServices=True),
+    make_hotel('delta', 'College Road', 40, 500, [('Karachi', 200), ('Peshawar', 50)], [('Germany', 20)],
+               ['Deosai Plains', 'satpara'], wifiInternet=True, restaurantDining=True, laundryServices=True),
+    make_hotel('echo', 'Airport Road, Skardu', 5, 40, [('Gilgit', 10)], [], ['manthokaWaterfall']),
+    make_hotel('foxtrot', 'Upper Kachura, Skardu', 18, 150, [('Lahore', 60)], [('China', 8)], ['Upper Kachura'],
+               restaurantDining=True)
+]
+
+
+def snapshot(engine):
+    """Overall sections, every single-value slice and every export table, as comparable JSON"""
+    state = {'overall': engine.get_slice({})}
+    for dimension, values in engine.get_cube_dimensions().items():
+        for value in values:
+            state[f'{dimension}={value}'] = engine.get_slice({dimension: {value}})
+    for table in EXPORT_TABLES:
+        rows = [json.dumps(row, sort_keys=True) for row in engine.iter_export_rows(table)]
+        state[f'export:{table}'] = sorted(rows)
+    return json.loads(json.dumps(state, sort_keys=True, default=str))
+
+
+@pytest.fixture
+def hotels():
+    return copy.deepcopy(HOTELS)
+
+
+def test_add_and_remove_match_a_recompute(hotels):
+    engine = AnalyticsEngine(hotels[:4])
+    engine.add_hotel(hotels[4])
+    engine.add_hotel(hotels[5])
+    engine.remove_hotel(hotels[1])
+
+    expected = AnalyticsEngine([hotels[0], hotels[2], hotels[3], hotels[4], hotels[5]])
+    assert snapshot(engine) == snapshot(expected)
+
+
+def test_update_matches_a_recompute(hotels):
+    engine = AnalyticsEngine(hotels)
+    edited = copy.deepcopy(hotels[2])
+    edited['fullAddress'] = 'Kachura Lake Road, Skardu'
+    edited['facilities']['wifiInternet'] = True
+    edited['mostPopularPlaces'] = ['Shigar Fort']
+    # String and junk numbers are coerced the same way by deltas and the frames
+    edited['averageOccupancyPerDay'] = '9'
+    edited['touristDemographics']['foreignTourists'] = 'unknown'
+    edited['touristDemographics']['pakistaniTourists']['breakdownByOrigin'] = [{'origin': 'Quetta', 'count': '7'}]
+    engine.update_hotel(hotels[2], edited)
+
+    expected = AnalyticsEngine([hotels[0], hotels[1], edited, hotels[3], hotels[4], hotels[5]])
+    assert snapshot(engine) == snapshot(expected)
+
+
+def test_removing_every_hotel_of_a_cell_drops_its_keys(hotels):
+    engine = AnalyticsEngine(hotels)
+    for hotel in hotels[1:]:
+        engine.remove_hotel(hotel)
+
+    overall = engine.get_slice({})
+    assert overall['demographics']['breakdown_by_origin'] == {'Lahore': 40, 'Karachi': 20}
+    assert overall['demographics']['breakdown_by_foreign_country'] == {'China': 5}
+    assert snapshot(engine) == snapshot(AnalyticsEngine(hotels[:1]))
+
+
+def test_failed_update_leaves_the_aggregates_untouched(hotels):
+    engine = AnalyticsEngine(hotels)
+    before = snapshot(engine)
+    broken = copy.deepcopy(hotels[0])
+    broken['touristDemographics']['pakistaniTourists']['breakdownByOrigin'] = None
+
+    with pytest.raises(TypeError):
+        engine.update_hotel(hotels[0], broken)
+    assert snapshot(engine) == before
+
+
+def test_location_slices_use_districts(hotels):
+    engine = AnalyticsEngine(hotels)
+    dimensions = engine.get_cube_dimensions()
+    assert set(dimensions) == set(CUBE_DIMENSIONS)
+    assert dimensions['location'] == ['hoto', 'kachura', 'other', 'skardu']
+    assert engine.get_slice({'location': {'kachura'}})['hotels'] == 2
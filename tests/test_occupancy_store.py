@@ -0,0 +1,123 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from models.occupancy_store import PARTITION_PERIODS, OccupancyStore, period_label, period_of, read_csv
+
+TODAY = date.today()
+
+
+def day(offset):
+    return (TODAY - timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OccupancyStore(str(tmp_path))
+
+
+@pytest.mark.parametrize('observation, message', [
+    ('not an object', 'must be an object'),
+    ({'hotel_id': 'h1', 'date': day(1), 'arrivals': 'inf'}, 'Non-finite'),
+    ({'hotel_id': 'h1', 'date': day(1), 'occupancy': 'nan'}, 'Non-finite'),
+    ({'hotel_id': 'h1', 'date': day(1), 'arrivals': -1}, 'Negative'),
+    ({'hotel_id': 'h1', 'date': '0001-01-01'}, 'outside'),
+    ({'hotel_id': 'h1', 'date': '9999-12-31'}, 'outside'),
+    ({'hotel_id': 'h1', 'date': 'yesterday'}, 'Invalid isoformat'),
+    ({'hotel_id': 'h1', 'date': day(1), 'arrivals': 'many'}, 'could not convert')
+])
+def test_ingest_rejects_invalid_observations(store, observation, message):
+    with pytest.raises(ValueError, match=message):
+        store.ingest([{'hotel_id': 'h1', 'date': day(2), 'arrivals': 1}, observation])
+    # A batch is all or nothing
+    assert store.stats()['observations'] == 0
+    assert store.is_empty()
+
+
+def test_ingest_requires_hotel_and_date(store):
+    with pytest.raises(KeyError):
+        store.ingest([{'date': day(1)}])
+    with pytest.raises(KeyError):
+        store.ingest([{'hotel_id': 'h1'}])
+
+
+def test_rollups_match_a_recompute(tmp_path):
+    rng = np.random.default_rng(7)
+    observations = [
+        {'hotel_id': f'h{rng.integers(4)}', 'date': day(int(rng.integers(0, 1500))),
+         'occupancy': int(rng.integers(0, 40)), 'arrivals': int(rng.integers(0, 10))}
+        for _ in range(600)
+    ]
+    store = OccupancyStore(str(tmp_path))
+    for start in range(0, len(observations), 150):
+        store.ingest(observations[start:start + 150])
+
+    # A fresh instance reads what was saved
+    reloaded = OccupancyStore(str(tmp_path))
+    for level in ('day', 'week', 'month'):
+        expected = defaultdict(lambda: [0, 0, 0])
+        for observation in observations:
+            ordinal = date.fromisoformat(observation['date']).toordinal()
+            totals = expected[period_label(level, period_of(level, [ordinal])[0])]
+            totals[0] += observation['occupancy']
+            totals[1] += observation['arrivals']
+            totals[2] += 1
+        periods = reloaded.series(day(2000), day(0), level=level)['periods']
+        assert {p['period'] for p in periods} == set(expected)
+        for p in periods:
+            occupancy, arrivals, hotel_days = expected[p['period']]
+            assert (p['arrivals'], p['hotel_days']) == (arrivals, hotel_days)
+            assert p['occupancy'] == round(occupancy / hotel_days, 2)
+
+    stats = reloaded.stats()
+    assert stats['hotels'] == len({o['hotel_id'] for o in observations})
+    assert stats['observations'] == len(observations)
+    assert stats['first_day'] == min(o['date'] for o in observations)
+    assert stats['last_day'] == max(o['date'] for o in observations)
+
+
+def test_hotel_series_reads_only_that_hotel(store):
+    store.ingest([
+        {'hotel_id': 'h1', 'date': day(3), 'occupancy': 10, 'arrivals': 2},
+        {'hotel_id': 'h2', 'date': day(3), 'occupancy': 30, 'arrivals': 5},
+        {'hotel_id': 'h1', 'date': day(2), 'occupancy': 20, 'arrivals': 4}
+    ])
+    periods = store.series(day(10), day(0), level='day', hotel_id='h1')['periods']
+    assert [(p['period'], p['occupancy'], p['arrivals']) for p in periods] == [(day(3), 10.0, 2), (day(2), 20.0, 4)]
+    assert store.series(day(10), day(0), hotel_id='unknown')['periods'] == []
+
+
+def test_ingest_rewrites_only_touched_partitions(store, tmp_path):
+    size = PARTITION_PERIODS['day']
+    store.ingest([{'hotel_id': 'h1', 'date': day(0)}, {'hotel_id': 'h1', 'date': day(3 * size)}])
+    day_dir = tmp_path / 'rollups' / 'day'
+    mtimes = {path.name: path.stat().st_mtime_ns for path in day_dir.iterdir()}
+    assert len(mtimes) == 2
+
+    store.ingest([{'hotel_id': 'h1', 'date': day(0)}])
+    rewritten = [path.name for path in day_dir.iterdir() if path.stat().st_mtime_ns != mtimes[path.name]]
+    assert len(rewritten) == 1
+
+
+def test_series_beyond_the_accepted_window_stays_bounded(store):
+    store.ingest([{'hotel_id': 'h1', 'date': day(5), 'arrivals': 1}])
+    series = store.series('0001-01-01', '9999-12-31', level='day')
+    assert [p['period'] for p in series['periods']] == [day(5)]
+
+
+def test_other_instances_see_new_ingests(tmp_path):
+    first, second = OccupancyStore(str(tmp_path)), OccupancyStore(str(tmp_path))
+    first.ingest([{'hotel_id': 'h1', 'date': day(1)}])
+    second.ingest([{'hotel_id': 'h2', 'date': day(1)}])
+    assert first.stats()['hotels'] == 2
+    assert first.stats()['observations'] == 2
+
+
+def test_read_csv_requires_columns():
+    assert read_csv('hotel_id,date,arrivals\nh1,2024-01-01,3\n') == [
+        {'hotel_id': 'h1', 'date': '2024-01-01', 'arrivals': '3'}
+    ]
+    with pytest.raises(ValueError, match='date'):
+        read_csv('hotel_id,arrivals\nh1,3\n')
@@ -0,0 +1,92 @@
+import pytest
+
+from models.search_index import MAX_PREFIX_TERMS, HotelSearchIndex, parse_query
+
+
+def make_hotel(hotel_id, name, address='', places=(), meals=(), other=''):
+    return {
+        'id': hotel_id,
+        'hotelGuestHouseName': name,
+        'fullAddress': address,
+        'mostPopularPlaces': list(places),
+        'interestingMeals': list(meals),
+        'facilities': {'otherFacilities': other},
+        'placeIds': []
+    }
+
+
+@pytest.fixture
+def index():
+    return HotelSearchIndex([
+        make_hotel('h1', 'Skardu Inn', 'Yadgar Chowk, Skardu', ['Deosai'], ['Chapshuro']),
+        make_hotel('h2', 'Kachura Lodge', 'Shangrila Road, Kachura', ['Kachura Lake'], other='Parking, conference hall'),
+        make_hotel('h3', 'Lake View Hotel', 'Satpara Road, Skardu', ['Satpara Lake'], other='parking'),
+        make_hotel('h4', 'Karakoram Guest House', 'College Road', ['Skardu Fort'])
+    ])
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('hotels in skardu', (['hotels', 'skardu'], 'and')),
+    ('The Lake at the Fort', (['lake', 'fort'], 'and')),
+    ('lake OR fort', (['lake', 'fort'], 'or')),
+    ('lake or fort', (['lake', 'fort'], 'and')),
+    ('Skardu skardu SKARDU', (['skardu'], 'and')),
+    ("K2's best-view", (['k2', 's', 'best', 'view'], 'and')),
+    ('in the of', ([], 'and')),
+    ('', ([], 'and'))
+])
+def test_parse_query(query, expected):
+    assert parse_query(query) == expected
+
+
+def test_parse_query_keeps_the_requested_op():
+    assert parse_query('lake fort', op='or') == (['lake', 'fort'], 'or')
+
+
+def test_and_needs_every_term(index):
+    assert {hotel_id for hotel_id, _ in index.search('lake parking')} == {'h2', 'h3'}
+    assert index.search('lake deosai') == []
+
+
+def test_or_needs_any_term(index):
+    assert {hotel_id for hotel_id, _ in index.search('deosai OR fort')} == {'h1', 'h4'}
+    assert {hotel_id for hotel_id, _ in index.search('deosai fort', op='or')} == {'h1', 'h4'}
+
+
+def test_last_term_matches_as_a_prefix(index):
+    assert {hotel_id for hotel_id, _ in index.search('skar')} == {'h1', 'h3', 'h4'}
+    # Only the last term expands
+    assert index.search('skar lake') == []
+    assert {hotel_id for hotel_id, _ in index.search('lake sat')} == {'h3'}
+
+
+def test_name_matches_rank_above_address_matches(index):
+    results = index.search('skardu')
+    assert results[0][0] == 'h1'
+    assert results == sorted(results, key=lambda item: (-item[1], item[0]))
+    assert index.search('skardu', limit=2) == results[:2]
+
+
+def test_stopword_only_queries_match_nothing(index):
+    assert index.search('the') == []
+    assert index.search('') == []
+
+
+def test_update_and_remove_keep_postings_consistent(index):
+    old = make_hotel('h2', 'Kachura Lodge', 'Shangrila Road, Kachura', ['Kachura Lake'], other='Parking, conference hall')
+    new = make_hotel('h2', 'Shigar Retreat', 'Shigar')
+    index.update_hotel(old, new)
+    assert index.search('kachura') == []
+    assert [hotel_id for hotel_id, _ in index.search('shigar')] == ['h2']
+    assert {hotel_id for hotel_id, _ in index.search('parking')} == {'h3'}
+
+    index.remove_hotel(new)
+    assert index.search('shigar') == []
+    assert len(index) == 3
+    assert 'shigar' not in index.postings
+    assert index.total_length == pytest.approx(sum(index.doc_lengths.values()))
+
+
+def test_prefix_expansion_is_capped():
+    index = HotelSearchIndex([make_hotel(f'h{i}', f'term{i:03d}') for i in range(MAX_PREFIX_TERMS + 10)])
+    assert len(index.search('term')) == MAX_PREFIX_TERMS
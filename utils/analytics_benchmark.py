@@ -0,0 +1,96 @@
+"""Timing harness for the DataFrame analytics backend
+
+Builds a synthetic dataset of ``--hotels`` records whose exploded
+origin / foreign-country tables reach ``--breakdown-rows`` rows, then times
+flattening, the vectorized aggregation and the distribution stats, and the
+groupby over the exploded demographics table on its own.
+
+    python -m utils.analytics_benchmark --hotels 20000 --breakdown-rows 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+from models.analytics import FACILITY_KEYS
+from models.analytics_frames import aggregate_frames, distribution_stats, flatten_hotels, keyed_totals
+
+ORIGINS = ['Punjab', 'Sindh', 'Khyber Pakhtunkhwa', 'Balochistan', 'Islamabad', 'Gilgit', 'Azad Kashmir']
+COUNTRIES = ['China', 'USA', 'UK', 'Germany', 'France', 'Japan', 'Australia', 'Canada', 'Italy', 'Spain']
+PLACES = ['Shangrila Lake', 'Deosai', 'Shigar Fort', 'Kachura Lake', 'Cold Desert', 'Manthokha Waterfall']
+
+
+def synthetic_hotels(count, breakdown_rows, seed=0):
+    """Hotels shaped like the real records, with breakdown_rows origin + country entries in total"""
+    rng = random.Random(seed)
+    per_hotel = max(1, breakdown_rows // (2 * count))
+    hotels = []
+    for i in range(count):
+        hotels.append({
+            'id': str(i),
+            'fullAddress': f"Street {i}, {rng.choice(['Skardu', 'Shigar', 'Khaplu', 'Kharmang'])}",
+            'averageOccupancyPerDay': rng.randint(0, 60),
+            'averageStayDurationDays': round(rng.uniform(1, 7), 1),
+            'hasOwnTransport': rng.random() < 0.4,
+            'mostPopularPlaces': rng.sample(PLACES, 3),
+            'facilities': {
+                'rooms': {'numberOfRooms': rng.randint(2, 80)},
+                'wifiInternet': rng.random() < 0.9,
+                'guideServices': rng.random() < 0.5,
+                'transportArrangement': rng.random() < 0.6,
+                'restaurantDining': rng.random() < 0.8,
+                'laundryServices': rng.random() < 0.4,
+                'otherFacilities': rng.choice(['parking', 'conference hall, parking', ''])
+            },
+            'touristDemographics': {
+                'totalTouristsRecorded': rng.randint(0, 5000),
+                'foreignTourists': rng.randint(0, 500),
+                'pakistaniTourists': {
+                    'count': rng.randint(0, 4000),
+                    'local': rng.randint(0, 1000),
+                    'nonLocal': rng.randint(0, 3000),
+                    'breakdownByOrigin': [
+                        {'origin': rng.choice(ORIGINS), 'count': rng.randint(0, 100)} for _ in range(per_hotel)
+                    ]
+                },
+                'breakdownByForeignCountry': [
+                    {'country': rng.choice(COUNTRIES), 'count': rng.randint(0, 50)} for _ in range(per_hotel)
+                ]
+            }
+        })
+    return hotels
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+def run_benchmark(hotels_count, breakdown_rows):
+    hotels = synthetic_hotels(hotels_count, breakdown_rows)
+    frames, flatten_ms = _timed(flatten_hotels, hotels)
+    _, aggregate_ms = _timed(aggregate_frames, frames, FACILITY_KEYS)
+    _, distributions_ms = _timed(distribution_stats, frames.hotels)
+    _, demographics_ms = _timed(lambda: (keyed_totals(frames.origins, 'count'), keyed_totals(frames.countries, 'count')))
+    return {
+        'hotels': hotels_count,
+        'breakdown_rows': len(frames.origins) + len(frames.countries),
+        'flatten_ms': flatten_ms,
+        'aggregate_ms': aggregate_ms,
+        'demographics_groupby_ms': demographics_ms,
+        'distributions_ms': distributions_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DataFrame analytics backend')
+    parser.add_argument('--hotels', type=int, default=20000)
+    parser.add_argument('--breakdown-rows', type=int, default=1000000,
+                        help='Total exploded breakdownByOrigin + breakdownByForeignCountry rows')
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.hotels, args.breakdown_rows), indent=2))
+
+
+if __name__ == '__main__':
+    main()
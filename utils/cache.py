@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry time-to-live"""
+
+    def __init__(self, max_size=1000, ttl_seconds=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for key, creating and storing it if absent"""
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._data.move_to_end(key)
+                if self.ttl_seconds is not None:
+                    self._data[key] = (entry[0], now + self.ttl_seconds)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            value = factory()
+            expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self):
+        """Drop every expired entry and return how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class VersionedCache:
+    """Named values computed for a data version, refreshed in the background
+
+    ``get`` returns the value computed for the current ``version_fn()``. Once
+    the version moves on, the previous value keeps being served while a
+    background thread recomputes it, so only the very first read of a name
+    ever waits for its computation.
+
+    A refresh that raises is retried after ``retry_backoff`` seconds, doubling
+    per failure, and given up after ``max_retries`` failures until the version
+    changes again; the stale value is served meanwhile.
+    """
+
+    def __init__(self, version_fn, max_retries=3, retry_backoff=1.0):
+        self.version_fn = version_fn
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._entries = {}
+        self._computers = {}
+        self._refreshing = set()
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, compute):
+        with self._lock:
+            self._computers[name] = compute
+            entry = self._entries.get(name)
+            if entry is not None:
+                if entry['version'] == self.version_fn():
+                    entry['hits'] += 1
+                else:
+                    entry['stale_hits'] += 1
+                    self._schedule(name)
+                return entry['value']
+        return self._compute(name, compute)
+
+    def refresh(self):
+        """Recompute every known value whose version is out of date"""
+        with self._lock:
+            version = self.version_fn()
+            for name, entry in self._entries.items():
+                if entry['version'] != version:
+                    self._schedule(name)
+
+    def _schedule(self, name):
+        # Caller holds the lock; one refresh per name is in flight at a time
+        if name in self._refreshing:
+            return
+        failure = self._failures.get(name)
+        if failure is not None and failure['version'] == self.version_fn():
+            if failure['count'] >= self.max_retries or time.monotonic() < failure['retry_at']:
+                return
+        self._refreshing.add(name)
+        threading.Thread(
+            target=self._background_compute, args=(name,), name=f'cache-refresh-{name}', daemon=True
+        ).start()
+
+    def _background_compute(self, name):
+        version = self.version_fn()
+        try:
+            self._compute(name, self._computers[name])
+        except Exception:
+            logger.exception("Background refresh of '%s' failed", name)
+            with self._lock:
+                self._refreshing.discard(name)
+                failure = self._failures.get(name)
+                count = failure['count'] + 1 if failure and failure['version'] == version else 1
+                self._failures[name] = {
+                    'version': version,
+                    'count': count,
+                    'retry_at': time.monotonic() + self.retry_backoff * 2 ** (count - 1)
+                }
+            # No reschedule here: a later stale read retries once the backoff has passed
+            return
+        with self._lock:
+            self._refreshing.discard(name)
+            self._failures.pop(name, None)
+        # The data may have changed again while this value was computed
+        self.refresh()
+
+    def _compute(self, name, compute):
+        version = self.version_fn()
+        start = time.perf_counter()
+        value = compute()
+        compute_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            previous = self._entries.get(name)
+            if previous is None or previous['version'] <= version:
+                self._entries[name] = {
+                    'value': value,
+                    'version': version,
+                    'compute_ms': compute_ms,
+                    'computed_at': time.time(),
+                    'computations': (previous['computations'] if previous else 0) + 1,
+                    'hits': previous['hits'] if previous else 0,
+                    'stale_hits': previous['stale_hits'] if previous else 0
+                }
+        return value
+
+    def stats(self):
+        with self._lock:
+            current = self.version_fn()
+            return {
+                name: {
+                    'version': entry['version'],
+                    'stale': entry['version'] != current,
+                    'refreshing': name in self._refreshing,
+                    'failures': self._failures[name]['count'] if name in self._failures else 0,
+                    'compute_ms': round(entry['compute_ms'], 3),
+                    'computed_at': entry['computed_at'],
+                    'computations': entry['computations'],
+                    'hits': entry['hits'],
+                    'stale_hits': entry['stale_hits']
+                }
+                for name, entry in self._entries.items()
+            }
@@ -0,0 +1,108 @@
+"""Compare DialoGPT CPU inference modes before switching production over
+
+Runs the same prompts through each mode with greedy decoding and reports
+p50/p99 latency, serialized weight size, and how often the quantized output
+matches the fp32 baseline (exact replies and per-token agreement).
+
+    python -m utils.chat_benchmark --modes fp32,int8 --threads 4
+"""
+import argparse
+import copy
+import json
+import time
+
+from models.inference import INFERENCE_MODES, configure_torch_threads, model_size_bytes, prepare_model
+from models.rankers import latency_percentiles
+
+DEFAULT_PROMPTS = [
+    "Hi, I am planning a trip to Gilgit Baltistan",
+    "Which hotels in Hunza have wifi?",
+    "What is the best time to visit Skardu?",
+    "Can you suggest a cheap guest house near Attabad Lake?",
+    "Is it cold in Naltar in December?",
+    "How many days do I need for Fairy Meadows?",
+    "Thanks for the help!"
+]
+
+
+def load_prompts(path):
+    """One prompt per line; blank lines are ignored"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def token_agreement(expected, actual):
+    """Fraction of positions where two token sequences agree"""
+    length = max(len(expected), len(actual))
+    if not length:
+        return 1.0
+    return sum(a == b for a, b in zip(expected, actual)) / length
+
+
+def evaluate_modes(tokenizer, base_model, prompts, modes, max_new_tokens=64, repeat=3):
+    """Generate for every prompt under each mode and compare against fp32"""
+    import torch
+
+    outputs = {}
+    report = {}
+    for mode in modes:
+        model = prepare_model(copy.deepcopy(base_model), mode)
+        latencies = []
+        generated = []
+        for prompt in prompts:
+            input_ids = tokenizer.encode(prompt + tokenizer.eos_token, return_tensors='pt')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    output = model.generate(
+                        input_ids,
+                        max_new_tokens=max_new_tokens,
+                        do_sample=False,
+                        pad_token_id=tokenizer.eos_token_id
+                    )
+                latencies.append((time.perf_counter() - start) * 1000)
+            generated.append(output[0, input_ids.shape[-1]:].tolist())
+
+        outputs[mode] = generated
+        report[mode] = {
+            'latency_ms': latency_percentiles(latencies),
+            'model_bytes': model_size_bytes(model)
+        }
+
+    baseline = outputs.get('fp32')
+    if baseline is not None:
+        for mode in modes:
+            pairs = list(zip(baseline, outputs[mode]))
+            report[mode]['exact_match'] = round(sum(a == b for a, b in pairs) / len(pairs), 3) if pairs else None
+            report[mode]['token_agreement'] = round(
+                sum(token_agreement(a, b) for a, b in pairs) / len(pairs), 3
+            ) if pairs else None
+
+    return {'prompts': len(prompts), 'max_new_tokens': max_new_tokens, 'modes': report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DialoGPT inference modes on CPU')
+    parser.add_argument('--model', default='microsoft/DialoGPT-small', help='Model name or path')
+    parser.add_argument('--prompts', help='Text file with one prompt per line')
+    parser.add_argument('--modes', default=','.join(INFERENCE_MODES), help='Comma separated inference modes')
+    parser.add_argument('--threads', type=int, default=0, help='torch intra-op threads (0 keeps the default)')
+    parser.add_argument('--max-new-tokens', type=int, default=64, help='Tokens generated per prompt')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per prompt')
+    args = parser.parse_args()
+
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    threads = configure_torch_threads(args.threads)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model)
+    prompts = load_prompts(args.prompts) if args.prompts else DEFAULT_PROMPTS
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+
+    report = evaluate_modes(tokenizer, model, prompts, modes, args.max_new_tokens, args.repeat)
+    report['threads'] = threads
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
+import copy
 import json
 import re
 
+from models.gazetteer import GAZETTEER
+from utils.helpers import assign_hotel_ids
+
 
 class DataLoader:
     def __init__(self):
@@ -19,6 +23,9 @@ class DataLoader:
                 cleaned_hotel = self._clean_hotel_data(hotel)
                 cleaned_hotels.append(cleaned_hotel)
 
+            assign_hotel_ids(cleaned_hotels)
+            # Resolve place spellings to canonical place ids once, at load
+            GAZETTEER.annotate(cleaned_hotels)
             print(f"Successfully loaded {len(cleaned_hotels)} hotels")
             return cleaned_hotels
 
@@ -29,6 +36,77 @@ class DataLoader:
             print(f"Error decoding JSON: {e}")
             return []
 
+    def clean_record(self, record):
+        """Validate and clean a hotel record submitted through the API
+
+        Works on a copy and raises ValueError when a field has the wrong
+        shape, so a bad record never reaches the shared data.
+        """
+        if not isinstance(record, dict):
+            raise ValueError('Hotel record must be a JSON object')
+        hotel = copy.deepcopy(record)
+        self._validate_structure(hotel)
+        self._clean_hotel_data(hotel)
+        self._coerce_numeric_fields(hotel)
+        return hotel
+
+    def _validate_structure(self, hotel):
+        """Reject records whose nested objects, lists or numbers have the wrong type"""
+        def expect(container, key, types, label):
+            value = container.get(key)
+            if value is None:
+                # Explicit nulls count as missing, so cleaning fills in the defaults
+                container.pop(key, None)
+            elif not isinstance(value, types):
+                raise ValueError(f"'{label}' has the wrong type")
+
+        for key in ('type', 'location', 'constructionMaterials', 'facilities', 'touristDemographics',
+                    'mostlyTouristInterests', 'additionalNotes'):
+            expect(hotel, key, dict, key)
+        for key in ('mostPopularPlaces', 'interestingMeals', 'phoneNumbers'):
+            expect(hotel, key, (list, str), key)
+        for key in ('hotelGuestHouseName', 'fullAddress'):
+            expect(hotel, key, str, key)
+        for key in ('averageOccupancyPerDay', 'averageStayDurationDays'):
+            expect(hotel, key, (int, float, str), key)
+
+        facilities = hotel.get('facilities') or {}
+        expect(facilities, 'rooms', dict, 'facilities.rooms')
+        expect(facilities.get('rooms') or {}, 'numberOfRooms', (int, float, str), 'facilities.rooms.numberOfRooms')
+        expect(facilities, 'otherFacilities', str, 'facilities.otherFacilities')
+
+        demo = hotel.get('touristDemographics') or {}
+        for key in ('totalTouristsRecorded', 'foreignTourists'):
+            expect(demo, key, (int, float, str), f'touristDemographics.{key}')
+        expect(demo, 'pakistaniTourists', dict, 'touristDemographics.pakistaniTourists')
+        expect(demo, 'breakdownByForeignCountry', list, 'touristDemographics.breakdownByForeignCountry')
+        pak = demo.get('pakistaniTourists') or {}
+        for key in ('local', 'nonLocal', 'count'):
+            expect(pak, key, (int, float, str), f'touristDemographics.pakistaniTourists.{key}')
+        expect(pak, 'breakdownByOrigin', list, 'touristDemographics.pakistaniTourists.breakdownByOrigin')
+        for entry in (pak.get('breakdownByOrigin') or []) + (demo.get('breakdownByForeignCountry') or []):
+            if not isinstance(entry, dict):
+                raise ValueError('Tourist breakdown entries must be objects')
+            expect(entry, 'count', (int, float, str), 'breakdown count')
+
+    def _coerce_numeric_fields(self, hotel):
+        """Numbers that are still strings or null after cleaning become plain numbers"""
+        def number(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return self._extract_number(value)
+            return value
+
+        demo = hotel['touristDemographics']
+        pak = demo['pakistaniTourists']
+        for container, key in [(demo, 'totalTouristsRecorded'), (demo, 'foreignTourists'), (pak, 'local'),
+                               (pak, 'nonLocal'), (pak, 'count'), (hotel, 'averageOccupancyPerDay'),
+                               (hotel, 'averageStayDurationDays')]:
+            container[key] = number(container.get(key))
+        rooms = hotel['facilities'].setdefault('rooms', {'numberOfRooms': 0, 'available': True})
+        rooms['numberOfRooms'] = number(rooms.get('numberOfRooms'))
+        for entry in pak.setdefault('breakdownByOrigin', []) + demo['breakdownByForeignCountry']:
+            entry['count'] = number(entry.get('count'))
+
     def _clean_hotel_data(self, hotel):
         """Clean individual hotel data"""
         # Ensure all required fields exist with default values
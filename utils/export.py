@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+
+# Export format -> response mimetype
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Lines are batched into chunks of about this size before they are written
+CHUNK_BYTES = 64 * 1024
+
+
+def flatten_record(record, prefix=''):
+    """{'a': {'b': 1}, 'c': [1, 2]} -> {'a.b': 1, 'c': '[1, 2]'} for one CSV row"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, name + '.'))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, ensure_ascii=False, default=str)
+        else:
+            flat[name] = value
+    return flat
+
+
+def csv_columns(records):
+    """Flattened column names of every record, in order of first appearance
+
+    Memory follows the number of distinct columns, not the number of records.
+    """
+    columns = {}
+    for record in records:
+        for column in flatten_record(record):
+            columns.setdefault(column, None)
+    return list(columns)
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def csv_lines(records, columns):
+    """Header plus one CSV line per record, reusing a single line buffer"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(flatten_record(record))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def chunked(lines, size=CHUNK_BYTES):
+    """Join text lines into UTF-8 chunks of roughly ``size`` bytes"""
+    parts = []
+    length = 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a byte stream into a gzip member incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(records, fmt, columns=None, compress=False):
+    """Byte chunks of ``records`` as NDJSON or CSV, optionally gzipped
+
+    ``records`` is consumed lazily, so only one chunk is held in memory at a
+    time. CSV needs its ``columns`` up front.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    lines = csv_lines(records, columns or []) if fmt == 'csv' else ndjson_lines(records)
+    chunks = chunked(lines)
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,123 @@
+import hashlib
+import re
+
+
+# Compact hotel view embedded in recommendations unless ``fields`` asks for more
+HOTEL_SUMMARY_FIELDS = [
+    'id',
+    'hotelGuestHouseName',
+    'fullAddress',
+    'type',
+    'location',
+    'facilities',
+    'hasOwnTransport'
+]
+
+
+def generate_hotel_id(hotel):
+    """Stable id derived from the hotel's name, address and coordinates"""
+    name = hotel.get('hotelGuestHouseName') or 'hotel'
+    location = hotel.get('location', {})
+    fingerprint = '|'.join([
+        name.lower(),
+        hotel.get('fullAddress', '').lower(),
+        str(location.get('latitude', '')),
+        str(location.get('longitude', ''))
+    ])
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'hotel'
+    digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:6]
+    return f"{slug}-{digest}"
+
+
+def assign_hotel_ids(hotels):
+    """Give every hotel a unique stable ``id`` field"""
+    seen = {}
+    for hotel in hotels:
+        hotel_id = generate_hotel_id(hotel)
+        if hotel_id in seen:
+            seen[hotel_id] += 1
+            hotel_id = f"{hotel_id}-{seen[hotel_id]}"
+        else:
+            seen[hotel_id] = 1
+        hotel['id'] = hotel_id
+    return hotels
+
+
+def categorize_budget(hotel):
+    """Budget level (low/medium/high) of a hotel from its size and facilities"""
+    score = 0
+
+    # Room-based scoring
+    rooms = hotel.get('facilities', {}).get('rooms', {})
+    num_rooms = rooms.get('numberOfRooms', 0)
+    if num_rooms > 20:
+        score += 2
+    elif num_rooms > 10:
+        score += 1
+
+    # Facilities scoring
+    facilities = hotel.get('facilities', {})
+    if facilities.get('wifiInternet'):
+        score += 1
+    if facilities.get('restaurantDining'):
+        score += 1
+    if facilities.get('laundryServices'):
+        score += 1
+    if hotel.get('hasOwnTransport'):
+        score += 2
+
+    # Determine budget category
+    if score >= 5:
+        return 'high'
+    elif score >= 3:
+        return 'medium'
+    else:
+        return 'low'
+
+
+def build_id_index(hotels):
+    """Map hotel id to hotel record"""
+    return {hotel['id']: hotel for hotel in hotels}
+
+
+def parse_fields(value, default=None):
+    """Parse a ``fields`` parameter (comma separated string or list)
+
+    Returns ``default`` when nothing was requested and ``None`` (meaning the
+    full record) for ``*`` or ``all``.
+    """
+    if not value:
+        return default
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [field.strip() for field in value if field and field.strip()]
+    if not fields:
+        return default
+    if '*' in fields or 'all' in fields:
+        return None
+    return fields
+
+
+def project_fields(record, fields):
+    """Copy only the requested (optionally dotted) fields of a record"""
+    if fields is None:
+        return record
+
+    projected = {}
+    if 'id' in record:
+        projected['id'] = record['id']
+
+    for path in fields:
+        keys = path.split('.')
+        value = record
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = projected
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+
+    return projected
@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from models.rankers import latency_percentiles
+
+
+class InferencePoolFull(Exception):
+    """Every worker is busy and the wait queue is at its limit"""
+
+
+class InferenceTimeout(Exception):
+    """The request did not finish within its timeout"""
+
+
+class InferencePool:
+    """Bounded thread pool that keeps model inference off the web request threads
+
+    At most ``max_workers`` jobs run at once and ``max_queue`` more may wait;
+    anything beyond that is rejected immediately with ``InferencePoolFull``
+    instead of tying up another request thread. Each job has a deadline set
+    when it is submitted, so time spent queued counts against its timeout.
+    Jobs still queued when their caller gives up are cancelled before they
+    touch a model; streams stop at the next event once their reader goes away.
+    """
+
+    def __init__(self, max_workers=4, max_queue=16, timeout_seconds=15.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-inference')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._queue_waits = deque(maxlen=1000)
+        self.stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'cancelled': 0, 'errors': 0}
+
+    def deadline(self, timeout_seconds=None):
+        return time.monotonic() + (timeout_seconds or self.timeout_seconds)
+
+    def remaining_ms(self, deadline):
+        """Milliseconds left before ``deadline`` (at least 1)"""
+        return max(1, int((deadline - time.monotonic()) * 1000))
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` or raise InferencePoolFull"""
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise InferencePoolFull(
+                f"Chat is busy ({self.max_workers} running, {self.max_queue} waiting); try again shortly"
+            )
+
+        submitted_at = time.monotonic()
+        try:
+            future = self._executor.submit(self._run, submitted_at, fn, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending += 1
+            self.stats['submitted'] += 1
+        # Runs for finished and for cancelled jobs alike, so no slot is ever lost
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, deadline=None, **kwargs):
+        """Run ``fn`` on the pool and wait for it until ``deadline``"""
+        deadline = deadline or self.deadline()
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            self._count('timeouts')
+            if future.cancel():
+                self._count('cancelled')
+            raise InferenceTimeout('Chat reply timed out') from None
+
+    def stream(self, make_events, *args, deadline=None, **kwargs):
+        """Iterate ``make_events(*args, **kwargs)`` on the pool, yielding its events here
+
+        Raises InferencePoolFull before yielding anything if the pool is
+        full, and InferenceTimeout if no event arrives before ``deadline``.
+        Closing the returned generator stops the producer at its next event.
+        """
+        deadline = deadline or self.deadline()
+        events = queue.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            generator = make_events(*args, **kwargs)
+            try:
+                for event in generator:
+                    if stop.is_set():
+                        self._count('cancelled')
+                        return
+                    events.put((event, None))
+            except Exception as e:
+                events.put((done, e))
+                raise
+            finally:
+                generator.close()
+            events.put((done, None))
+
+        future = self.submit(produce)
+        return self._drain(events, done, stop, future, deadline)
+
+    def _drain(self, events, done, stop, future, deadline):
+        try:
+            while True:
+                try:
+                    event, error = events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    self._count('timeouts')
+                    raise InferenceTimeout('Chat reply timed out') from None
+                if event is done:
+                    if error is not None:
+                        raise error
+                    return
+                yield event
+        finally:
+            stop.set()
+            if future.cancel():
+                self._count('cancelled')
+
+    def _run(self, submitted_at, fn, args, kwargs):
+        wait_ms = (time.monotonic() - submitted_at) * 1000
+        with self._lock:
+            self._queue_waits.append(wait_ms)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._count('errors')
+            raise
+        self._count('completed')
+        return result
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'pending': self._pending,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'timeout_seconds': self.timeout_seconds,
+                'queue_wait_ms': latency_percentiles(list(self._queue_waits))
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
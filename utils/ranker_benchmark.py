@@ -0,0 +1,84 @@
+"""Offline replay harness for recommendation ranker backends
+
+Replays queries logged by the shadow ranker (one JSON object per line) against
+each backend and reports overlap@k and score agreement with the baseline,
+plus p50/p99 latency.
+
+    python -m utils.ranker_benchmark --queries ranker_queries.jsonl \
+        --backends tfidf_knn,cosine_scan
+"""
+import argparse
+import json
+import time
+
+from models.rankers import RANKERS, compare_rankings, create_ranker, latency_percentiles
+from models.recommendation_engine import RecommendationEngine
+from utils.data_loader import DataLoader
+
+
+def load_queries(path):
+    """Load logged recommendation queries from a JSONL file"""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def evaluate_backends(engine, queries, backends, baseline=None, repeat=1):
+    """Replay queries against each backend and compare against the baseline"""
+    baseline = baseline or engine.ranker.name
+    rankers = {}
+    for name in set(backends) | {baseline}:
+        ranker = create_ranker(name)
+        ranker.fit(engine.feature_matrix)
+        rankers[name] = ranker
+
+    baseline_results = [engine.rank_hotels(ranker=rankers[baseline], **q) for q in queries]
+
+    report = {}
+    for name in backends:
+        ranker = rankers[name]
+        latencies = []
+        comparisons = []
+        for query, expected in zip(queries, baseline_results):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                ranked = engine.rank_hotels(ranker=ranker, **query)
+                latencies.append((time.perf_counter() - start) * 1000)
+            comparisons.append(compare_rankings(expected, ranked, k=engine.top_k))
+
+        maes = [c['score_mae'] for c in comparisons if c['score_mae'] is not None]
+        report[name] = {
+            'queries': len(queries),
+            'overlap_at_k': round(sum(c['overlap_at_k'] for c in comparisons) / len(comparisons), 3)
+            if comparisons else None,
+            'score_mae': round(sum(maes) / len(maes), 4) if maes else None,
+            'top1_agreement': round(sum(c['top1_match'] for c in comparisons) / len(comparisons), 3)
+            if comparisons else None,
+            'latency_ms': latency_percentiles(latencies)
+        }
+
+    return {'baseline': baseline, 'k': engine.top_k, 'backends': report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay logged queries against ranker backends')
+    parser.add_argument('--queries', required=True, help='JSONL query log written by the shadow ranker')
+    parser.add_argument('--backends', default=','.join(sorted(RANKERS)), help='Comma separated ranker names')
+    parser.add_argument('--baseline', default='tfidf_knn', help='Ranker the others are compared against')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+    args = parser.parse_args()
+
+    hotels_data = DataLoader().load_data()
+    engine = RecommendationEngine(hotels_data, ranker=args.baseline)
+    queries = load_queries(args.queries)
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+
+    print(json.dumps(evaluate_backends(engine, queries, backends, args.baseline, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: top-k counts in O(capacity) memory
+
+    A new item arriving when the table is full replaces the current minimum
+    and inherits its count as overestimation error, so every item with true
+    frequency above total / capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, item, count=1.0):
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0.0
+            return
+
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        self.errors.pop(victim)
+        self.counts[item] = floor + count
+        self.errors[item] = floor
+
+    def decay(self, factor):
+        """Scale every count, so old traffic fades out of the top-k"""
+        for item in self.counts:
+            self.counts[item] *= factor
+            self.errors[item] *= factor
+
+    def top(self, limit=10):
+        """(item, count, error) ranked by guaranteed count, count - error"""
+        ranked = sorted(self.counts, key=lambda item: -(self.counts[item] - self.errors[item]))[:limit]
+        return [(item, self.counts[item], self.errors[item]) for item in ranked]
+
+
+class CountMinSketch:
+    """Count-Min sketch with conservative update over a fixed width x depth table"""
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.float64)
+
+    def _columns(self, key):
+        # One digest split into independent 32-bit hashes, one per row
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1.0):
+        columns = self._columns(key)
+        rows = np.arange(self.depth)
+        # Conservative update: raise only the cells that are below the new estimate
+        target = self.table[rows, columns].min() + count
+        self.table[rows, columns] = np.maximum(self.table[rows, columns], target)
+
+    def estimate(self, key):
+        return float(self.table[np.arange(self.depth), self._columns(key)].min())
+
+    def clear(self):
+        self.table.fill(0)
+
+
+class TrendTracker:
+    """Time-decayed trending items per category in constant memory
+
+    Counts go into a ring of ``num_buckets`` Count-Min sketches, one per
+    ``bucket_seconds`` interval, and into a per-category Space-Saving table
+    whose counts halve every ``half_life_seconds``. Trends compare the most
+    recent window of buckets against the window before it.
+    """
+
+    def __init__(self, bucket_seconds=3600, num_buckets=24, top_k=64, width=1024, depth=4,
+                 half_life_seconds=None):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.top_k = top_k
+        self.half_life_seconds = half_life_seconds or bucket_seconds * num_buckets / 4
+        self.buckets = [CountMinSketch(width, depth) for _ in range(num_buckets)]
+        self.heavy_hitters = {}
+        self.totals = {}
+        self._current = None
+        self._lock = threading.Lock()
+
+    def record(self, category, item, now=None):
+        with self._lock:
+            self._advance(now)
+            key = f"{category}:{item}"
+            self.buckets[self._current % self.num_buckets].add(key)
+            self.heavy_hitters.setdefault(category, SpaceSaving(self.top_k)).add(item)
+            self.totals[category] = self.totals.get(category, 0) + 1
+
+    def _advance(self, now=None):
+        bucket = int((now if now is not None else time.time()) // self.bucket_seconds)
+        if self._current is None:
+            self._current = bucket
+        if bucket <= self._current:
+            return
+        elapsed = bucket - self._current
+        # Buckets that fell out of the ring are reused for the new intervals
+        for step in range(1, min(elapsed, self.num_buckets) + 1):
+            self.buckets[(self._current + step) % self.num_buckets].clear()
+        factor = 0.5 ** (elapsed * self.bucket_seconds / self.half_life_seconds)
+        for table in self.heavy_hitters.values():
+            table.decay(factor)
+        self._current = bucket
+
+    def _window_count(self, key, start, length):
+        """Estimated count over ``length`` buckets ending ``start`` buckets ago"""
+        total = 0.0
+        for offset in range(start, min(start + length, self.num_buckets)):
+            total += self.buckets[(self._current - offset) % self.num_buckets].estimate(key)
+        return total
+
+    def trends(self, category, limit=10, window_buckets=1, order='score', now=None):
+        """Top items of a category with recent vs. previous window counts
+
+        ``order='growth'`` ranks the tracked items by how much faster they
+        are being mentioned now than in the previous window.
+        """
+        with self._lock:
+            self._advance(now)
+            table = self.heavy_hitters.get(category)
+            if table is None:
+                return []
+
+            results = []
+            for item, score, error in table.top(self.top_k):
+                key = f"{category}:{item}"
+                recent = self._window_count(key, 0, window_buckets)
+                previous = self._window_count(key, window_buckets, window_buckets)
+                results.append({
+                    'item': item,
+                    'score': round(score, 2),
+                    'max_error': round(error, 2),
+                    'recent': int(recent),
+                    'previous': int(previous),
+                    'growth': round((recent + 1) / (previous + 1), 2)
+                })
+            if order == 'growth':
+                results.sort(key=lambda entry: (-entry['growth'], -entry['recent']))
+            return results[:limit]
+
+    def stats(self):
+        return {
+            'categories': dict(self.totals),
+            'bucket_seconds': self.bucket_seconds,
+            'num_buckets': self.num_buckets,
+            'top_k': self.top_k,
+            'half_life_seconds': self.half_life_seconds,
+            'sketch_bytes': sum(bucket.table.nbytes for bucket in self.buckets)
+        }